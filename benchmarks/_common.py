@@ -0,0 +1,11 @@
+# Helpers shared by the benchmark scripts, imported from the scripts run
+# in this directory.
+
+import timeit
+
+
+def bench(func, number, repeat=3):
+    """
+    Best time of func over repeat runs of number calls [s]
+    """
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
@@ -0,0 +1,37 @@
+#! /usr/bin/python
+
+# Compare the speed of the WG00 table lookup done with the native
+# bilinear interpolator to the astropy tabular_model previously used.
+# To execute it, type "python bench_WG00_interpolation.py" in the terminal.
+
+import numpy as np
+from astropy.modeling.tabular import tabular_model
+
+from dust_attenuation.radiative_transfer import WG00
+
+from _common import bench
+
+
+if __name__ == '__main__':
+    att_model = WG00(tau_V=1.0, geometry='dusty', dust_type='mw',
+                     dust_distribution='clumpy')
+    interp = att_model.model
+
+    tab = tabular_model(2, name='2D_table')
+    tab_model = tab((interp.x_grid, interp.y_grid),
+                    lookup_table=interp.table, bounds_error=False,
+                    fill_value=None, method='linear')
+
+    print('%10s %15s %15s %10s' % ('N', 'tabular [s]', 'native [s]',
+                                   'speedup'))
+    for n_x in [1, 10, 100, 1000, 10000, 100000, 1000000]:
+        xinterp = np.random.uniform(1000., 30001., n_x)
+        tau_V = 2.2
+        number = max(1, 10000 // n_x)
+
+        t_tab = bench(lambda: tab_model(xinterp, tau_V * np.ones(n_x)),
+                      number, repeat=5)
+        t_native = bench(lambda: interp(xinterp, tau_V), number, repeat=5)
+
+        print('%10d %15.3e %15.3e %10.1f' % (n_x, t_tab, t_native,
+                                             t_tab / t_native))
@@ -0,0 +1,59 @@
+#! /usr/bin/python
+
+# Measure the size of the pickled WG00 models and the time of tasks sent to
+# multiprocessing workers with a model each, when the tables of the model
+# (arrays and interpolators) are sent with it and when only the model is
+# pickled, its parameters and configuration, the tables being taken from
+# the cache of the worker.
+# To execute it, type "python bench_WG00_pickle.py" in the terminal.
+
+import pickle
+from multiprocessing import Pool
+
+import numpy as np
+
+from dust_attenuation.radiative_transfer import WG00
+
+from _common import bench
+
+x = np.linspace(0.1, 3.0, 100)
+
+
+def task_tables(args):
+    # the tables are sent with the model, as when they were pickled with it
+    model, tables = args
+    return model(x)
+
+
+def task_model(model):
+    return model(x)
+
+
+if __name__ == '__main__':
+    models = [WG00(tau_V) for tau_V in np.linspace(0.5, 10.0, 200)]
+    # evaluate once to also build the interpolators of the tables
+    models[0](x)
+    tables = models[0]._tables
+    with_tables = [(model, tables) for model in models]
+
+    size_tables = len(pickle.dumps(with_tables[0], protocol=2))
+    size_model = len(pickle.dumps(models[0], protocol=2))
+    t_tables = bench(lambda: pickle.loads(pickle.dumps(with_tables[0])), 100)
+    t_model = bench(lambda: pickle.loads(pickle.dumps(models[0])), 100)
+
+    print('%12s %12s %18s' % ('pickled', 'size [B]', 'round trip [s]'))
+    print('%12s %12d %18.3e' % ('with tables', size_tables, t_tables))
+    print('%12s %12d %18.3e' % ('reduce', size_model, t_model))
+
+    pool = Pool(4)
+    # start the workers and fill their table cache
+    pool.map(task_model, models[:8], chunksize=1)
+    t_pool_tables = bench(lambda: pool.map(task_tables, with_tables,
+                                           chunksize=1), 3)
+    t_pool_model = bench(lambda: pool.map(task_model, models, chunksize=1),
+                         3)
+    pool.close()
+    pool.join()
+
+    print('%d tasks on 4 workers: with tables %.3e s, reduce %.3e s' % (
+        len(models), t_pool_tables, t_pool_model))
@@ -0,0 +1,61 @@
+#! /usr/bin/python
+
+# Measure the time and the peak of temporary memory needed to compute the
+# fractional attenuation of a data cube from a map of Av, with the chunked
+# cube method writing in a memory mapped file and with the full computation
+# in memory.
+# To execute it, type "python bench_attenuate_cube.py [n_side] [n_x]" in
+# the terminal (default: 100x100 spaxels, 4000 wavelengths).
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from dust_attenuation.averages import C00
+
+
+def measure(func):
+    tracemalloc.start()
+    start = time.time()
+    func()
+    elapsed = time.time() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+if __name__ == '__main__':
+    n_side = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    n_x = int(sys.argv[2]) if len(sys.argv) > 2 else 4000
+
+    x = np.linspace(0.12, 2.2, n_x)
+    Av_map = np.random.uniform(0., 3., (n_side, n_side))
+    att_model = C00()
+
+    def full():
+        # one model evaluation per spaxel would be slower still
+        return np.power(10.0, -0.4 * att_model(x) * Av_map[..., np.newaxis])
+
+    print('cube of %dx%dx%d, %.1f MB' % (n_side, n_side, n_x,
+                                         n_side**2 * n_x * 8 / 1e6))
+    elapsed, peak = measure(full)
+    print('%20s %10.3f s %10.1f MB' % ('in memory', elapsed, peak / 1e6))
+
+    tmpdir = tempfile.mkdtemp()
+    filename = os.path.join(tmpdir, 'cube.dat')
+    for chunk_size in [256, 4096]:
+        out = np.memmap(filename, dtype=np.float64, mode='w+',
+                        shape=(n_side, n_side, n_x))
+        elapsed, peak = measure(
+            lambda: att_model.attenuate_cube(x, out=out,
+                                             chunk_size=chunk_size,
+                                             Av=Av_map))
+        del out
+        print('%20s %10.3f s %10.1f MB' % ('chunks of %d' % chunk_size,
+                                           elapsed, peak / 1e6))
+    os.remove(filename)
+    os.rmdir(tmpdir)
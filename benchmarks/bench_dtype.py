@@ -0,0 +1,45 @@
+#! /usr/bin/python
+
+# Measure the throughput of the attenuation of a cube of spectra computed
+# in float64 and in float32, and the precision of the float32 results.
+# To execute it, type "python bench_dtype.py" in the terminal.
+
+import numpy as np
+
+from dust_attenuation.averages import C00, L02
+from dust_attenuation.shapes import N09, SBL18
+from dust_attenuation.radiative_transfer import WG00
+
+from _common import bench
+
+
+if __name__ == '__main__':
+    models = [(C00(), [0.12, 2.19], 'Av'),
+              (L02(), [0.097, 0.18], 'Av'),
+              (N09(ampl=2., slope=-0.4), [0.097, 2.2], 'Av'),
+              (SBL18(ampl=2., slope=-0.4), [0.097, 2.2], 'Av'),
+              (WG00(1.0), [0.1, 3.0], 'tau_V')]
+
+    n_x = 4000
+    map_shape = (64, 64)
+    rng = np.random.RandomState(1234)
+
+    print('%6s %18s %18s %12s' % ('model', 'float64 [spec/s]',
+                                  'float32 [spec/s]', 'max rel err'))
+    for model, x_range, name in models:
+        x = np.linspace(x_range[0], x_range[1], n_x)
+        values = rng.uniform(1.0, 5.0, map_shape)
+        n_spec = values.size
+
+        out64 = np.empty(map_shape + (n_x,))
+        out32 = np.empty(map_shape + (n_x,), dtype=np.float32)
+
+        t64 = bench(lambda: model.attenuate_cube(x, out=out64,
+                                                 **{name: values}), 3)
+        t32 = bench(lambda: model.attenuate_cube(x, out=out32,
+                                                 **{name: values}), 3)
+
+        err = np.max(np.abs(out32 / out64 - 1))
+
+        print('%6s %18.3e %18.3e %12.2e' % (
+            model.__class__.__name__, n_spec / t64, n_spec / t32, err))
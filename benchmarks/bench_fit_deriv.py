@@ -0,0 +1,83 @@
+#! /usr/bin/python
+
+# Measure the time needed to fit a catalog of synthetic attenuation curves
+# with the astropy Levenberg-Marquardt fitter, using the analytic
+# derivatives of the models or the Jacobian estimated by finite differences.
+# To execute it, type "python bench_fit_deriv.py [n_spectra]" in the
+# terminal (default: 10000 spectra).
+
+import sys
+import time
+
+import numpy as np
+from astropy.modeling.fitting import LevMarLSQFitter
+
+from dust_attenuation.averages import C00, L02
+from dust_attenuation.shapes import N09, SBL18
+from dust_attenuation.radiative_transfer import WG00
+
+
+def fit_catalog(init_model, x, spectra, estimate_jacobian):
+    fitter = LevMarLSQFitter()
+    params = np.empty((len(spectra), len(init_model.parameters)))
+    n_calls = 0
+    # first fit outside of the timing, to exclude imports and caches setup
+    fitter(init_model, x, spectra[0], estimate_jacobian=estimate_jacobian)
+    start = time.time()
+    for k, att in enumerate(spectra):
+        fit_model = fitter(init_model, x, att,
+                           estimate_jacobian=estimate_jacobian)
+        params[k] = fit_model.parameters
+        n_calls += fitter.fit_info['nfev']
+    return time.time() - start, params, n_calls
+
+
+def make_catalog(model_class, x, n_spectra):
+    # parameters drawn around typical values for star-forming galaxies
+    if model_class is WG00:
+        true_params = {'tau_V': np.random.uniform(1.0, 40.0, n_spectra)}
+    else:
+        true_params = {'Av': np.random.uniform(0.1, 3.0, n_spectra)}
+    if model_class in (N09, SBL18):
+        true_params['x0'] = np.random.normal(0.2175, 0.003, n_spectra)
+        true_params['gamma'] = np.random.normal(0.035, 0.003, n_spectra)
+        true_params['ampl'] = np.random.uniform(0., 4., n_spectra)
+        true_params['slope'] = np.random.uniform(-1., 0.5, n_spectra)
+
+    spectra = np.empty((n_spectra, len(x)))
+    for k in range(n_spectra):
+        spectra[k] = model_class(**dict((name, values[k]) for name, values
+                                        in true_params.items()))(x)
+    spectra += np.random.normal(0., 0.01, spectra.shape)
+    return spectra
+
+
+if __name__ == '__main__':
+    n_spectra = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    np.random.seed(1234)
+
+    print('%6s %12s %12s %12s %12s %12s' % ('model', 'deriv [s]',
+                                             'numeric [s]', 'deriv nfev',
+                                             'numeric nfev', 'median dAv'))
+    for model_class, x_range in [(C00, [0.12, 2.2]), (L02, [0.097, 0.18]),
+                                 (N09, [0.097, 2.2]), (SBL18, [0.097, 2.2]),
+                                 (WG00, [0.1, 3.0])]:
+        x = np.linspace(x_range[0], x_range[1], 100)
+        spectra = make_catalog(model_class, x, n_spectra)
+        if model_class is WG00:
+            init_model = model_class(tau_V=5.0)
+        else:
+            init_model = model_class(Av=1.0)
+        if model_class in (N09, SBL18):
+            init_model.ampl = 1.0
+
+        # Av, or tau_V for WG00, is the last parameter
+        i_Av = -1
+
+        t_deriv, params_deriv, n_deriv = fit_catalog(init_model, x, spectra,
+                                                     False)
+        t_num, params_num, n_num = fit_catalog(init_model, x, spectra, True)
+
+        print('%6s %12.3f %12.3f %12d %12d %12.2e' % (
+            model_class.__name__, t_deriv, t_num, n_deriv, n_num,
+            np.median(np.abs(params_deriv[:, i_Av] - params_num[:, i_Av]))))
@@ -0,0 +1,50 @@
+#! /usr/bin/python
+
+# Measure the import time of the package modules in new interpreters, from
+# the output of "python -X importtime", the time of astropy.modeling and of
+# the WG00 table module being given for reference.
+# To execute it, type "python bench_import.py" in the terminal.
+
+import subprocess
+import sys
+
+
+def import_times(statement, repeat=5):
+    # smallest cumulative import times [microsec] by module over the runs
+    best = {}
+    for i in range(repeat):
+        proc = subprocess.Popen([sys.executable, '-X', 'importtime', '-c',
+                                 statement], stderr=subprocess.PIPE,
+                                universal_newlines=True)
+        stderr = proc.communicate()[1]
+        for line in stderr.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            self_time, cumulative, name = line[len('import time:'):].split(
+                '|')
+            name = name.strip()
+            best[name] = min(best.get(name, float('inf')), int(cumulative))
+
+    return best
+
+
+if __name__ == '__main__':
+    statements = ['import dust_attenuation',
+                  'import dust_attenuation.averages',
+                  'import dust_attenuation.shapes',
+                  'import dust_attenuation.radiative_transfer']
+
+    print('%45s %15s %20s' % ('statement', 'import [ms]',
+                              'astropy.modeling [ms]'))
+    for statement in statements:
+        module = statement.split()[1]
+        times = import_times(statement)
+        print('%45s %15.1f %20.1f' % (
+            statement, 1e-3 * times[module],
+            1e-3 * times.get('astropy.modeling', 0)))
+
+    # the WG00 table module only takes a small part of the import, the
+    # tables themselves are read on the first WG00 use
+    times = import_times('import dust_attenuation.radiative_transfer')
+    print('%45s %15.1f' % ('table module',
+                           1e-3 * times['dust_attenuation.utils.WG00_tables']))
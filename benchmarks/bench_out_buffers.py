@@ -0,0 +1,40 @@
+#! /usr/bin/python
+
+# Measure the time of repeated evaluations of the models on a fixed grid,
+# with a new array for each result or with preallocated out and work
+# arrays.
+# To execute it, type "python bench_out_buffers.py" in the terminal.
+
+import numpy as np
+
+from dust_attenuation.averages import C00, L02
+from dust_attenuation.shapes import N09, SBL18
+from dust_attenuation.radiative_transfer import WG00
+
+from _common import bench
+
+
+if __name__ == '__main__':
+    models = [(C00(), [0.12, 2.2], {'Av': 1.3}),
+              (L02(), [0.097, 0.18], {'Av': 1.3}),
+              (N09(), [0.097, 2.2], {'Av': 1.3, 'ampl': 2., 'slope': -0.4}),
+              (SBL18(), [0.097, 2.2], {'Av': 1.3, 'ampl': 2., 'slope': -0.4}),
+              (WG00(1.0), [0.1, 3.0], {'tau_V': 3.3})]
+
+    print('%6s %8s %15s %15s %15s' % ('model', 'N', 'attenuate [s]',
+                                      'plan [s]', 'plan out [s]'))
+    for model, x_range, params in models:
+        for n_x in [100, 4000, 100000]:
+            x = np.linspace(x_range[0], x_range[1], n_x)
+            plan = model.prepare(x)
+            out = np.empty(n_x)
+            work = np.empty(n_x)
+            number = max(10, 200000 // n_x)
+
+            t_model = bench(lambda: model.attenuate(x), number)
+            t_plan = bench(lambda: plan.attenuate(**params), number)
+            t_out = bench(lambda: plan.attenuate(out=out, work=work,
+                                                 **params), number)
+
+            print('%6s %8d %15.3e %15.3e %15.3e' % (
+                model.__class__.__name__, n_x, t_model, t_plan, t_out))
@@ -0,0 +1,51 @@
+#! /usr/bin/python
+
+# Measure the time of repeated requests of the same template grid under a
+# few Av (or tau_V) values, with and without the cache of model
+# evaluations.
+# To execute it, type "python bench_result_cache.py" in the terminal.
+
+import numpy as np
+
+from dust_attenuation import conf
+from dust_attenuation.baseclasses import (result_cache_info,
+                                          clear_result_cache)
+from dust_attenuation.averages import C00, L02
+from dust_attenuation.shapes import N09, SBL18
+from dust_attenuation.radiative_transfer import WG00
+
+from _common import bench
+
+
+def requests(models, x):
+    # each service request builds its model and attenuates the templates
+    for model in models:
+        model.__class__(**dict(zip(model.param_names,
+                                   model.parameters))).attenuate(x)
+
+
+if __name__ == '__main__':
+    kinds = [(C00, [0.12, 2.19], 'Av', [0.1, 0.5, 1.0, 2.0]),
+             (L02, [0.097, 0.18], 'Av', [0.1, 0.5, 1.0, 2.0]),
+             (N09, [0.097, 2.2], 'Av', [0.1, 0.5, 1.0, 2.0]),
+             (SBL18, [0.097, 2.2], 'Av', [0.1, 0.5, 1.0, 2.0]),
+             (WG00, [0.1, 3.0], 'tau_V', [0.5, 1.0, 2.0, 5.0])]
+
+    print('%6s %8s %15s %15s %10s' % ('model', 'N', 'uncached [s]',
+                                      'cached [s]', 'hit rate'))
+    for cls, x_range, name, values in kinds:
+        models = [cls(**{name: value}) for value in values]
+        for n_x in [100, 4000, 100000]:
+            x = np.linspace(x_range[0], x_range[1], n_x)
+            number = max(3, 20000 // n_x)
+
+            t_uncached = bench(lambda: requests(models, x), number)
+
+            clear_result_cache()
+            with conf.set_temp('result_cache_size', 16):
+                t_cached = bench(lambda: requests(models, x), number)
+                info = result_cache_info()
+
+            print('%6s %8d %15.3e %15.3e %10.3f' % (
+                cls.__name__, n_x, t_uncached, t_cached,
+                info.hits / float(info.hits + info.misses)))
@@ -0,0 +1,55 @@
+#! /usr/bin/python
+
+# Compare the closed-form Av solver of the attenuation models to fits of the
+# individual spectra with the astropy Levenberg-Marquardt fitter.
+# To execute it, type "python bench_solve_Av.py [n_objects]" in the
+# terminal (default: 100000 objects, 1000 of them fitted with the fitter).
+
+import sys
+import time
+
+import numpy as np
+from astropy.modeling.fitting import LevMarLSQFitter
+
+from dust_attenuation.averages import C00
+
+
+if __name__ == '__main__':
+    n_objects = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    n_fits = min(n_objects, 1000)
+    np.random.seed(1234)
+
+    # power law intrinsic spectra attenuated with C00 and 2% noise
+    x = np.linspace(0.12, 2.2, 200)
+    Avs = np.random.uniform(0.1, 3.0, n_objects)
+    k = C00(Av=1.0)(x)
+    flux_int = np.outer(np.random.uniform(1., 10., n_objects), x**-1.5)
+    flux_unc = 0.02 * flux_int * np.power(10.0, -0.4 * np.outer(Avs, k))
+    flux_obs = flux_int * np.power(10.0, -0.4 * np.outer(Avs, k)) \
+        + np.random.normal(size=flux_int.shape) * flux_unc
+
+    att_model = C00(Av=1.0)
+
+    start = time.time()
+    Av_solve, Av_unc = att_model.solve_Av(x, flux_obs, flux_int,
+                                          flux_unc=flux_unc)
+    t_solve = time.time() - start
+
+    fitter = LevMarLSQFitter()
+    Av_fit = np.empty(n_fits)
+    start = time.time()
+    for i in range(n_fits):
+        att = -2.5 * np.log10(flux_obs[i] / flux_int[i])
+        att_unc = 2.5 / np.log(10) * flux_unc[i] / flux_obs[i]
+        Av_fit[i] = fitter(att_model, x, att,
+                           weights=1. / att_unc).Av.value
+    t_fit = time.time() - start
+
+    print('solver: %d objects in %.3f s (%.2e s per object)'
+          % (n_objects, t_solve, t_solve / n_objects))
+    print('fitter: %d objects in %.3f s (%.2e s per object)'
+          % (n_fits, t_fit, t_fit / n_fits))
+    print('max difference of Av: %.2e'
+          % np.max(np.abs(Av_solve[:n_fits] - Av_fit)))
+    print('median Av error / uncertainty: %.2f'
+          % np.median(np.abs(Av_solve - Avs) / Av_unc))
@@ -0,0 +1,39 @@
+#! /usr/bin/python
+
+# Measure the throughput of model evaluations with Quantity inputs from a
+# pool of threads.
+# To execute it, type "python bench_threads.py" in the terminal.
+
+import threading
+import time
+
+import numpy as np
+import astropy.units as u
+
+from dust_attenuation.averages import C00
+
+
+def run(n_threads, n_calls, model, x):
+    def worker():
+        for k in range(n_calls):
+            model(x)
+
+    threads = [threading.Thread(target=worker) for k in range(n_threads)]
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return n_threads * n_calls / (time.time() - start)
+
+
+if __name__ == '__main__':
+    att_model = C00(Av=1.0)
+
+    print('%10s %10s %20s' % ('N', 'threads', 'throughput [calls/s]'))
+    for n_x in [10, 10000]:
+        x = np.random.uniform(1.3e3, 2e4, n_x) * u.angstrom
+        for n_threads in [1, 2, 4, 8]:
+            print('%10d %10d %20.0f' % (n_x, n_threads,
+                                        run(n_threads, 500, att_model, x)))
@@ -0,0 +1,41 @@
+#! /usr/bin/python
+
+# Measure the overhead of the conversion of x to microns for plain arrays,
+# comparing the unit-less fast path to the astropy Quantity conversion used
+# for inputs with units.
+# To execute it, type "python bench_unit_conversion.py" in the terminal.
+
+import numpy as np
+import astropy.units as u
+
+from dust_attenuation.averages import C00
+from dust_attenuation.helpers import _convert_x_to_microns
+
+from _common import bench
+
+
+def quantity_conversion(x):
+    # conversion applied to all inputs before the fast path
+    with u.add_enabled_equivalencies(u.spectral()):
+        x_quant = u.Quantity(x, u.micron, dtype=np.float64)
+    return x_quant.value
+
+
+if __name__ == '__main__':
+    att_model = C00(Av=1.0)
+
+    print('%10s %15s %15s %15s %15s' % ('N', 'Quantity [s]', 'fast path [s]',
+                                        'C00 units [s]', 'C00 plain [s]'))
+    for n_x in [1, 10, 1000, 1000000]:
+        x = np.random.uniform(0.12, 2.2, n_x)
+        x_quant = x * u.micron
+        number = max(1, 2000 // n_x)
+
+        t_quant = bench(lambda: quantity_conversion(x), number)
+        t_fast = bench(lambda: _convert_x_to_microns(x), number)
+        t_model_quant = bench(lambda: att_model(x_quant), number)
+        t_model_fast = bench(lambda: att_model(x), number)
+
+        print('%10d %15.3e %15.3e %15.3e %15.3e' % (n_x, t_quant, t_fast,
+                                                    t_model_quant,
+                                                    t_model_fast))
@@ -0,0 +1,42 @@
+#! /usr/bin/python
+
+# Measure the time of the check of the x values against the valid range of
+# the models, with the previous comparisons of all the values, with the
+# single pass min/max check and for a model evaluation with the check
+# skipped.
+# To execute it, type "python bench_x_range_check.py" in the terminal.
+
+import numpy as np
+
+from dust_attenuation.baseclasses import skip_x_range_check
+from dust_attenuation.helpers import _test_valid_x_range
+from dust_attenuation.averages import C00
+
+from _common import bench
+
+
+def comparisons_check(x, x_range):
+    # previous version of the check
+    return np.logical_or(np.any(x < x_range[0]), np.any(x > x_range[1]))
+
+
+if __name__ == '__main__':
+    x_range = [0.12, 2.2]
+    model = C00(Av=1.0)
+
+    print('%10s %15s %15s %15s %15s' % ('N', 'comparisons [s]',
+                                        'min/max [s]', 'C00 [s]',
+                                        'C00 skip [s]'))
+    for n_x in [1000, 100000, 10000000]:
+        x = np.linspace(0.12, 2.2, n_x)
+        number = max(3, 1000000 // n_x)
+
+        t_comp = bench(lambda: comparisons_check(x, x_range), number)
+        t_minmax = bench(lambda: _test_valid_x_range(x, x_range, 'C00'),
+                         number)
+        t_model = bench(lambda: model.evaluate(x, 1.0), number)
+        with skip_x_range_check():
+            t_skip = bench(lambda: model.evaluate(x, 1.0), number)
+
+        print('%10d %15.3e %15.3e %15.3e %15.3e' % (
+            n_x, t_comp, t_minmax, t_model, t_skip))
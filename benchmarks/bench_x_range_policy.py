@@ -0,0 +1,51 @@
+#! /usr/bin/python
+
+# Measure the time of the evaluation of a batch of spectra with some
+# wavelengths out of the range of the models, with a loop over the spectra
+# catching the errors and with a single call under the 'nan' policy.
+# To execute it, type "python bench_x_range_policy.py" in the terminal.
+
+import numpy as np
+
+from dust_attenuation.averages import C00, L02
+from dust_attenuation.shapes import N09, SBL18
+from dust_attenuation.radiative_transfer import WG00
+
+from _common import bench
+
+
+def loop_with_errors(model, x_spectra):
+    # one call per spectrum, the spectra out of range are skipped
+    res = np.full(x_spectra.shape, np.nan)
+    for i, x in enumerate(x_spectra):
+        try:
+            res[i] = model(x)
+        except ValueError:
+            pass
+    return res
+
+
+if __name__ == '__main__':
+    kinds = [(C00, [0.12, 2.2]), (L02, [0.097, 0.18]), (N09, [0.097, 2.2]),
+             (SBL18, [0.097, 2.2]), (WG00, [0.1, 3.0001])]
+
+    n_spec = 1000
+    n_x = 200
+    rng = np.random.RandomState(1234)
+
+    print('%6s %15s %15s' % ('model', 'loop [s]', 'nan policy [s]'))
+    for cls, x_range in kinds:
+        args = [1.0] if cls is WG00 else []
+        model = cls(*args)
+        model_nan = cls(*args, x_range_policy='nan')
+
+        # redshifted spectra, a tenth of them partly out of range
+        x_spectra = (np.linspace(x_range[0], x_range[1], n_x)
+                     * rng.uniform(0.99, 1.0, (n_spec, 1)))
+        x_spectra[::10] *= 1.05
+
+        t_loop = bench(lambda: loop_with_errors(model, x_spectra), 1)
+        t_nan = bench(lambda: model_nan(x_spectra, model_set_axis=False),
+                      3)
+
+        print('%6s %15.3e %15.3e' % (cls.__name__, t_loop, t_nan))
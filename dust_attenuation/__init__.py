@@ -20,4 +20,26 @@ if sys.version_info < tuple((int(val) for val in __minimum_python_version__.spli
 
 if not _ASTROPY_SETUP_:
     # For egg_info test builds to pass, put package imports here.
-    pass
+    from astropy import config as _config
+
+    class Conf(_config.ConfigNamespace):
+        """
+        Configuration parameters for `dust_attenuation`.
+        """
+        dtype = _config.ConfigItem(
+            ['float64', 'float32'],
+            'Floating point type of the attenuation curves. float32 halves '
+            'the memory used by large grids of curves, with a relative '
+            'precision of about 1e-6.')
+        result_cache_size = _config.ConfigItem(
+            0,
+            'Number of model evaluations (model calls and attenuate) kept '
+            'in memory and returned again for the same model, parameters '
+            'and x values. 0 disables the cache.')
+        check_x_range = _config.ConfigItem(
+            True,
+            'Check that the x values are in the valid range of the models. '
+            'Only disable it for x grids known to be valid, the models '
+            'give wrong values out of their range.')
+
+    conf = Conf()
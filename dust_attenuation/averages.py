@@ -1,16 +1,97 @@
 # -*- coding: utf-8 -*-
 
 import numpy as np
-import astropy.units as u
 
-from .baseclasses import BaseAttAvModel
-from .helpers import _test_valid_x_range
+from .baseclasses import BaseAttAvModel, _Av_parameter
+from .helpers import _convert_x_to_microns, _get_dtype, _mask_out_of_range
 
 __all__ = ['C00', 'L02']
 
 x_range_C00 = [0.12, 2.2]
 x_range_L02 = [0.097, 0.18]
 
+# Rv of Calzetti (2000), also assumed for Leitherer (2002)
+Rv_C00 = 4.05
+
+
+def _k_lambda_C00(x, out=None, extrapolate=False):
+    """
+    Starburst reddening curve of Calzetti et al. (2000)
+    k'(λ)=A(λ)/E(B-V), without unit conversion or range check
+
+    Parameters
+    ----------
+    x: np array (float)
+       wavelengths in [micron]
+
+    out: np array (float)
+       array of the shape of x where the result is written
+
+    extrapolate: bool
+       continue the UV-visible curve below 0.12 micron and the NIR curve
+       above 2.2 micron instead of setting the curve to 0 there
+
+    Returns
+    -------
+    k_lambda: np array (float)
+       k_lambda(x) reddening curve, out if given
+    """
+    # setup the ax vectors, with the shape of x to support model sets
+    if out is None:
+        axEbv = np.zeros(x.shape, dtype=x.dtype)
+    else:
+        axEbv = out
+        axEbv[...] = 0.0
+
+    # define the ranges, equation (4) of Calzetti et al. (2000) holds for
+    # 0.12 <= x < 0.63 and 0.63 <= x <= 2.2 micron
+    if extrapolate:
+        uv2vis_indxs = x < 0.63
+        nir_indxs = 0.63 <= x
+    else:
+        uv2vis_indxs = np.logical_and(0.12 <= x, x < 0.63)
+        nir_indxs = np.logical_and(0.63 <= x, x <= 2.2)
+
+    axEbv[uv2vis_indxs] = (2.659 * (-2.156 +
+                                    1.509 * 1 / x[uv2vis_indxs] -
+                                    0.198 * 1 / x[uv2vis_indxs] ** 2 +
+                                    0.011 * 1 / x[uv2vis_indxs] ** 3) + Rv_C00)
+
+    axEbv[nir_indxs] = 2.659 * (-1.857 + 1.040 * 1 / x[nir_indxs]) + Rv_C00
+
+    return axEbv
+
+
+def _k_lambda_L02(x, out=None):
+    """
+    Starburst reddening curve of Leitherer et al. (2002)
+    k'(λ)=A(λ)/E(B-V), without unit conversion or range check
+
+    Parameters
+    ----------
+    x: np array (float)
+       wavelengths in [micron]
+
+    out: np array (float)
+       array of the shape of x where the result is written
+
+    Returns
+    -------
+    k_lambda: np array (float)
+       k_lambda(x) reddening curve, out if given
+    """
+    # 5.472 + 0.671/x - 9.218e-3/x**2 + 2.620e-3/x**3, in Horner form
+    # to fill out in place
+    inv_x = 1.0 / x
+    axEbv = np.multiply(inv_x, 2.620 * 1e-3, out=out)
+    axEbv -= 9.218 * 1e-3
+    axEbv *= inv_x
+    axEbv += 0.671
+    axEbv *= inv_x
+    axEbv += 5.472
+
+    return axEbv
+
 
 class C00(BaseAttAvModel):
     """
@@ -59,10 +140,20 @@ class C00(BaseAttAvModel):
         plt.show()
     """
 
+    Av = _Av_parameter()
+
     x_range = x_range_C00
-    Rv = 4.05
+    Rv = Rv_C00
+
+    def _k_lambda(self, x, out=None):
+        """
+        k_lambda(x) without unit conversion or range policy, continued out of
+        the range with the 'extrapolate' policy
+        """
+        return _k_lambda_C00(
+            x, out=out, extrapolate=self._x_range_policy == 'extrapolate')
 
-    def k_lambda(self, x):
+    def k_lambda(self, x, out=None):
         """ Compute the starburst reddening curve of Calzetti et al. (2000)
             k'(λ)=A(λ)/E(B-V)
 
@@ -74,10 +165,15 @@ class C00(BaseAttAvModel):
 
             internally microns are used
 
+         out: np array (float)
+            array of the shape of x where the result is written, its
+            type sets the type of the computation. Only the result is
+            written in place, the intermediate arrays are still allocated
+
          Returns
          -------
          k_lambda: np array (float)
-             k_lambda(x) reddening curve
+             k_lambda(x) reddening curve, out if given
 
          Raises
          ------
@@ -85,37 +181,17 @@ class C00(BaseAttAvModel):
             Input x values outside of defined range
 
         """
-        # convert to wavenumbers (1/micron) if x input in units
-        # otherwise, assume x in appropriate wavenumber units
-        with u.add_enabled_equivalencies(u.spectral()):
-            x_quant = u.Quantity(x, u.micron, dtype=np.float64)
-
-        # strip the quantity to avoid needing to add units to all the
-        #    polynomical coefficients
-        x = x_quant.value
-
-        # check that the wavenumbers are within the defined range
-        _test_valid_x_range(x, x_range_C00, 'C00')
-
-        # setup the ax vectors
-        n_x = len(x)
-        axEbv = np.zeros(n_x)
-
-        # define the ranges
-        uv2vis_indxs = np.where(np.logical_and(0.12 <= x, x < 0.63))
-        nir_indxs = np.where(np.logical_and(0.63 <= x, x < 2.2))
+        # convert to microns if x input in units
+        # otherwise, assume x in microns
+        x = _convert_x_to_microns(x, _get_dtype(out=out))
 
-        axEbv[uv2vis_indxs] = (2.659 * (-2.156 +
-                                        1.509 * 1 / x[uv2vis_indxs] -
-                                        0.198 * 1 / x[uv2vis_indxs] ** 2 +
-                                        0.011 * 1 / x[uv2vis_indxs] ** 3) + self.Rv)
+        # apply the policy for the wavenumbers out of the defined range
+        x, out_of_range = self._apply_x_range_policy(x)
 
-        axEbv[nir_indxs] = 2.659 * (-1.857 + 1.040 * 1 / x[nir_indxs]) + self.Rv
+        return _mask_out_of_range(self._k_lambda(x, out=out), out_of_range)
 
-        return axEbv
 
-
-    def evaluate(self, x, Av):
+    def evaluate(self, x, Av, out=None):
         """
         Returns the attenuation curve, A(λ), following the recipe of
         Calzetti et al. (2000).
@@ -128,31 +204,82 @@ class C00(BaseAttAvModel):
 
            internally microns are used
 
+        Av: float
+           attenuation in V band
+
+        out: np array (float)
+           array where the result is written, with the shape of the result,
+           its type sets the type of the computation. Only the result is
+           written in place, the intermediate arrays are still allocated,
+           see `prepare` for evaluations without allocations
+
         Returns
         -------
         att: np array (float)
-            Att(x) attenuation curve [mag]
+            Att(x) attenuation curve [mag], out if given
 
         Raises
         ------
         ValueError
            Input x values outside of defined range
         """
-        # convert to wavenumbers (1/micron) if x input in units
-        # otherwise, assume x in appropriate wavenumber units
-        with u.add_enabled_equivalencies(u.spectral()):
-            x_quant = u.Quantity(x, u.micron, dtype=np.float64)
+        # convert to microns if x input in units
+        # otherwise, assume x in microns
+        dtype = _get_dtype(out=out)
+        x = _convert_x_to_microns(x, dtype)
 
-        # strip the quantity to avoid needing to add units to all the
-        #    polynomical coefficients
-        x = x_quant.value
+        # apply the policy for the wavenumbers out of the defined range
+        x, out_of_range = self._apply_x_range_policy(x)
 
-        # check that the wavenumbers are within the defined range
-        _test_valid_x_range(x, x_range_C00, 'C00')
+        Av = np.asarray(Av, dtype=dtype)
+        ax = np.multiply(self._k_lambda(x), Av / self.Rv, out=out)
 
-        ax = self.k_lambda(x) / self.Rv * Av
+        return _mask_out_of_range(ax, out_of_range)
 
-        return ax
+    def _prepare(self, x, dtype=None):
+        """
+        Precompute k_lambda(x)/Rv, see `BaseAttModel.prepare`
+        """
+        dtype = _get_dtype(dtype)
+        x = _convert_x_to_microns(x, dtype)
+        x, out_of_range = self._apply_x_range_policy(x)
+
+        return {'k': self._k_lambda(x) / self.Rv, 'dtype': dtype,
+                'out_of_range': out_of_range}
+
+    def _evaluate_prepared(self, state, Av, out=None, work=None):
+        """
+        Attenuation curve from the precomputed k_lambda(x)/Rv
+        """
+        Av = np.asarray(Av, dtype=state['dtype'])
+        return np.multiply(state['k'], Av, out=out)
+
+    def fit_deriv(self, x, *params):
+        """
+        Derivative of the attenuation curve with respect to Av,
+        k_lambda(x)/Rv
+
+        Parameters
+        ----------
+        in_x: float
+           expects either x in units of wavelengths or frequency
+           or assumes wavelengths in [micron]
+
+           internally microns are used
+
+        params: float
+           Av values, one per model of a model set. The derivative does
+           not depend on them.
+
+        Returns
+        -------
+        derivs: list of np arrays (float)
+           derivative with respect to Av
+        """
+        x = _convert_x_to_microns(x)
+        x, out_of_range = self._apply_x_range_policy(x)
+
+        return [_mask_out_of_range(self._k_lambda(x) / self.Rv, out_of_range)]
 
 
 class L02(BaseAttAvModel):
@@ -203,13 +330,21 @@ class L02(BaseAttAvModel):
         plt.show()
     """
 
+    Av = _Av_parameter()
+
     x_range = x_range_L02
 
     # Assume same rv as for Calzetti 2000
     Rv = 4.05
 
 
-    def k_lambda(self, x):
+    def _k_lambda(self, x, out=None):
+        """
+        k_lambda(x) without unit conversion or range policy
+        """
+        return _k_lambda_L02(x, out=out)
+
+    def k_lambda(self, x, out=None):
         """ Compute the starburst reddening curve of Leitherer et al. (2002)
             k'(λ)=A(λ)/E(B-V)
 
@@ -221,10 +356,15 @@ class L02(BaseAttAvModel):
 
             internally microns are used
 
+         out: np array (float)
+            array of the shape of x where the result is written, its
+            type sets the type of the computation. Only the result is
+            written in place, the intermediate arrays are still allocated
+
          Returns
          -------
          k_lambda: np array (float)
-             k_lambda(x) reddening curve
+             k_lambda(x) reddening curve, out if given
 
          Raises
          ------
@@ -232,27 +372,18 @@ class L02(BaseAttAvModel):
             Input x values outside of defined range
 
         """
-        # convert to wavenumbers (1/micron) if x input in units
-        # otherwise, assume x in appropriate wavenumber units
-        with u.add_enabled_equivalencies(u.spectral()):
-            x_quant = u.Quantity(x, u.micron, dtype=np.float64)
-
-        # strip the quantity to avoid needing to add units to all the
-        #    polynomical coefficients
-        x = x_quant.value
-
-        # check that the wavenumbers are within the defined range
-        _test_valid_x_range(x, x_range_L02, 'L02')
+        # convert to microns if x input in units
+        # otherwise, assume x in microns
+        x = _convert_x_to_microns(x, _get_dtype(out=out))
 
-        axEbv = (5.472 + (0.671 * 1 / x -
-                          9.218 * 1e-3 / x**2 +
-                          2.620 * 1e-3 / x**3))
+        # apply the policy for the wavenumbers out of the defined range
+        x, out_of_range = self._apply_x_range_policy(x)
 
-        return axEbv
+        return _mask_out_of_range(self._k_lambda(x, out=out), out_of_range)
 
 
 
-    def evaluate(self, x, Av):
+    def evaluate(self, x, Av, out=None):
         """
         Returns the attenuation curve, A(λ), following the recipe of
         Leitherer et al. (2002), assuming Rv=4.05
@@ -265,28 +396,79 @@ class L02(BaseAttAvModel):
 
            internally microns are used
 
+        Av: float
+           attenuation in V band
+
+        out: np array (float)
+           array where the result is written, with the shape of the result,
+           its type sets the type of the computation. Only the result is
+           written in place, the intermediate arrays are still allocated,
+           see `prepare` for evaluations without allocations
+
         Returns
         -------
         att: np array (float)
-            Att(x) attenuation curve [mag]
+            Att(x) attenuation curve [mag], out if given
 
         Raises
         ------
         ValueError
            Input x values outside of defined range
         """
-        # convert to wavenumbers (1/micron) if x input in units
-        # otherwise, assume x in appropriate wavenumber units
-        with u.add_enabled_equivalencies(u.spectral()):
-            x_quant = u.Quantity(x, u.micron, dtype=np.float64)
+        # convert to microns if x input in units
+        # otherwise, assume x in microns
+        dtype = _get_dtype(out=out)
+        x = _convert_x_to_microns(x, dtype)
 
-        # strip the quantity to avoid needing to add units to all the
-        #    polynomical coefficients
-        x = x_quant.value
+        # apply the policy for the wavenumbers out of the defined range
+        x, out_of_range = self._apply_x_range_policy(x)
 
-        # check that the wavenumbers are within the defined range
-        _test_valid_x_range(x, x_range_L02, 'L02')
+        Av = np.asarray(Av, dtype=dtype)
+        ax = np.multiply(self._k_lambda(x), Av / self.Rv, out=out)
 
-        ax = self.k_lambda(x) / self.Rv * Av
+        return _mask_out_of_range(ax, out_of_range)
+
+    def _prepare(self, x, dtype=None):
+        """
+        Precompute k_lambda(x)/Rv, see `BaseAttModel.prepare`
+        """
+        dtype = _get_dtype(dtype)
+        x = _convert_x_to_microns(x, dtype)
+        x, out_of_range = self._apply_x_range_policy(x)
+
+        return {'k': self._k_lambda(x) / self.Rv, 'dtype': dtype,
+                'out_of_range': out_of_range}
+
+    def _evaluate_prepared(self, state, Av, out=None, work=None):
+        """
+        Attenuation curve from the precomputed k_lambda(x)/Rv
+        """
+        Av = np.asarray(Av, dtype=state['dtype'])
+        return np.multiply(state['k'], Av, out=out)
+
+    def fit_deriv(self, x, *params):
+        """
+        Derivative of the attenuation curve with respect to Av,
+        k_lambda(x)/Rv
+
+        Parameters
+        ----------
+        in_x: float
+           expects either x in units of wavelengths or frequency
+           or assumes wavelengths in [micron]
+
+           internally microns are used
+
+        params: float
+           Av values, one per model of a model set. The derivative does
+           not depend on them.
+
+        Returns
+        -------
+        derivs: list of np arrays (float)
+           derivative with respect to Av
+        """
+        x = _convert_x_to_microns(x)
+        x, out_of_range = self._apply_x_range_policy(x)
 
-        return ax
+        return [_mask_out_of_range(self._k_lambda(x) / self.Rv, out_of_range)]
@@ -1,21 +1,181 @@
 # -*- coding: utf-8 -*-
+import threading
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+
 import numpy as np
 
+import astropy.units as u
 from astropy.modeling import (Fittable1DModel,
                               Parameter,
                               InputParameterError)
 
-__all__ = ['BaseAttModel', 'BaseAttAvModel', 'BaseAtttauVModel']
+from . import conf
+from .helpers import (_get_dtype, _dtype_context, _x_range_check_context,
+                      _x_range_check_enabled, _test_valid_x_range,
+                      _mask_out_of_range)
+
+__all__ = ['BaseAttModel', 'BaseAttAvModel', 'BaseAtttauVModel',
+           'AttModelPlan', 'result_cache_info', 'clear_result_cache',
+           'skip_x_range_check']
+
+# Results of the most recent model evaluations, shared by all the models.
+# The cache is enabled by setting conf.result_cache_size.
+_result_cache = OrderedDict()
+_result_cache_stats = {'hits': 0, 'misses': 0}
+_result_cache_lock = threading.Lock()
+
+# Policies for the x values out of the valid range of the models
+_x_range_policies = ('raise', 'nan', 'clip', 'extrapolate')
+
+ResultCacheInfo = namedtuple('ResultCacheInfo',
+                             ['hits', 'misses', 'maxsize', 'currsize'])
+
+
+def result_cache_info():
+    """
+    Statistics of the cache of model evaluations.
+
+    Returns
+    -------
+    info: ResultCacheInfo
+       named tuple with the number of hits and misses since the cache was
+       last cleared, the maximum size (``conf.result_cache_size``) and the
+       number of results currently held
+    """
+    with _result_cache_lock:
+        return ResultCacheInfo(_result_cache_stats['hits'],
+                               _result_cache_stats['misses'],
+                               conf.result_cache_size, len(_result_cache))
+
+
+def clear_result_cache():
+    """
+    Empty the cache of model evaluations and reset its statistics.
+    """
+    with _result_cache_lock:
+        _result_cache.clear()
+        _result_cache_stats['hits'] = 0
+        _result_cache_stats['misses'] = 0
+
+
+@contextmanager
+def skip_x_range_check():
+    """
+    Do not check that the x values are in the valid range of the models
+    within the context, in the current thread only.
+
+    For x grids already known to be valid, e.g. evaluated many times.
+    The models give wrong values for x out of their range, without error.
+    The check can also be disabled for all the threads by setting
+    ``conf.check_x_range`` to False.
+
+    Example::
+
+        with skip_x_range_check():
+            att = model(x)
+    """
+    with _x_range_check_context(False):
+        yield
+
+
+def _Av_parameter():
+    """
+    Create the Av parameter of the BaseAttAvModel subclasses
+
+    Returns
+    -------
+    Av: astropy.modeling.Parameter
+        Av parameter with its validator
+    """
+    Av = Parameter(description="Av: attenuation in V band ",
+                   default=1.0, min=0.0)
+
+    @Av.validator
+    def Av(self, value):
+        """
+        Check that Av is in the valid range
+
+        Parameters
+        ----------
+        value: float
+            Av value to check
+
+        Raises
+        ------
+        InputParameterError
+           Input Av values outside of defined range
+        """
+
+        if np.any(value < 0.0):
+            raise InputParameterError("parameter Av must be positive")
+
+    return Av
 
 
 class BaseAttModel(Fittable1DModel):
     """
     Base Attenuation Model.  Do not use.
+
+    The models accept an x_range_policy keyword, see `x_range_policy`.
     """
     inputs = ('x',)
     outputs = ('ax',)
 
-    def attenuate(self, x):
+    _x_range_policy = 'raise'
+
+    def __init__(self, *args, **kwargs):
+        x_range_policy = kwargs.pop('x_range_policy', None)
+        super(BaseAttModel, self).__init__(*args, **kwargs)
+        if x_range_policy is not None:
+            self.x_range_policy = x_range_policy
+
+    @property
+    def x_range_policy(self):
+        """
+        Policy for the x values out of the valid range of the model:
+
+        - 'raise': raise a ValueError (default)
+        - 'nan': NaN attenuation for these values
+        - 'clip': attenuation at the closest limit of the range
+        - 'extrapolate': continuation of the model out of its range, the
+          analytic curves for C00, L02, N09 and SBL18 and the linear
+          extrapolation of the tables for WG00.  Use with care, the
+          curves quickly become unphysical.
+
+        With the 'nan', 'clip' and 'extrapolate' policies, an array of x
+        values with only some values out of range is evaluated in a single
+        call.
+        """
+        return self._x_range_policy
+
+    @x_range_policy.setter
+    def x_range_policy(self, value):
+        if value not in _x_range_policies:
+            raise ValueError('x_range_policy must be one of '
+                             + ', '.join(_x_range_policies))
+        self._x_range_policy = value
+
+    def __call__(self, *inputs, **kwargs):
+        """
+        Evaluate the model, see `~astropy.modeling.Model`.
+
+        The result is taken from the cache of model evaluations if it is
+        enabled (see ``conf.result_cache_size``) and the model was already
+        evaluated with the same parameters and x values.
+        """
+        dtype = _get_dtype()
+
+        def compute():
+            with _dtype_context(dtype):
+                return super(BaseAttModel, self).__call__(*inputs, **kwargs)
+
+        if len(inputs) != 1:
+            return compute()
+
+        return self._cached_result('call', inputs[0], dtype, kwargs, compute)
+
+    def attenuate(self, x, out=None, dtype=None, **kwargs):
         """
         Calculate the attenuation as a fraction
 
@@ -27,43 +187,482 @@ class BaseAttModel(Fittable1DModel):
 
            internally microns are used
 
+        out: np array (float)
+           array where the result is written, with the shape of the result.
+           Only the result is written in place, the attenuation curve is
+           still computed in a new array, see `prepare` for evaluations
+           without allocations
+
+        dtype: numpy dtype
+           floating point type of the computation, float32 or float64.
+           Defaults to the type of out if given, otherwise to
+           ``dust_attenuation.conf.dtype``.
+
+        kwargs:
+           passed to the model call, such as model_set_axis for a set of
+           models
+
+        Returns
+        -------
+        frac_att: np array (float)
+           fractional attenuation as a function of x, out if given
+        """
+        # the configuration is read once and passed down to the evaluation
+        dtype = _get_dtype(dtype, out=out)
+
+        def compute():
+            # get the attenuation curve, computed in the requested type
+            with _dtype_context(dtype):
+                ax = super(BaseAttModel, self).__call__(x, **kwargs)
+
+            # return fractional attenuation
+            if out is None:
+                return np.power(10.0, -0.4*ax)
+
+            np.multiply(ax, -0.4, out=out)
+            return np.power(10.0, out, out=out)
+
+        return self._cached_result('attenuate', x, dtype, kwargs, compute,
+                                   out=out)
+
+    def prepare(self, x, dtype=None):
+        """
+        Prepare the evaluation of the model on a fixed grid of x values.
+
+        The work that only depends on x (unit conversion, range check,
+        wavelength dependent terms) is done once, so the returned plan
+        only has to apply the parameters when it is called.
+
+        Parameters
+        ----------
+        x: float
+           expects either x in units of wavelengths or frequency
+           or assumes wavelengths in [micron]
+
+           internally microns are used
+
+        dtype: numpy dtype
+           floating point type of the computation, float32 or float64.
+           Defaults to ``dust_attenuation.conf.dtype``.
+
+        Returns
+        -------
+        plan: AttModelPlan
+           callable returning the attenuation curve on the x grid
+
+        Raises
+        ------
+        ValueError
+           Input x values outside of defined range
+        """
+        return AttModelPlan(self, x, dtype=dtype)
+
+    def attenuate_cube(self, x, out=None, chunk_size=256, dtype=None,
+                       **maps):
+        """
+        Calculate the attenuation as a fraction for maps of parameters,
+        such as the spaxels of a data cube.
+
+        The wavelength dependent part of the model is computed once and
+        the cube is filled by chunks of spaxels, so that the temporary
+        arrays only hold chunk_size spectra.
+
+        Parameters
+        ----------
+        x: float
+           expects either x in units of wavelengths or frequency
+           or assumes wavelengths in [micron]
+
+           internally microns are used
+
+        out: np array (float)
+           array (or np.memmap) of shape map shape + (n_x,) where the
+           result is written, allocated if not given
+
+        chunk_size: int
+           number of spaxels computed at once
+
+        dtype: numpy dtype
+           floating point type of the computation, float32 or float64.
+           Defaults to the type of out if given, otherwise to
+           ``dust_attenuation.conf.dtype``.
+
+        maps: np arrays (float)
+           maps of parameter values given by name, e.g. Av=Av_map, broadcast
+           together. The parameters not given take the current values of the
+           model parameters.
+
         Returns
         -------
         frac_att: np array (float)
-           fractional attenuation as a function of x
+           fractional attenuation, of shape map shape + (n_x,), out if given
+
+        Raises
+        ------
+        ValueError
+           Input x values outside of defined range, or out of the wrong
+           shape
+
+        InputParameterError
+           Input parameter values outside of defined range
+        """
+        if not maps:
+            raise TypeError('no parameter map given, the model parameters '
+                            'are ' + ', '.join(self.param_names))
+
+        dtype = _get_dtype(dtype, out)
+
+        maps = dict((name, np.asarray(value, dtype=dtype))
+                    for name, value in maps.items())
+        for name, value in maps.items():
+            if name in self.param_names:
+                param = getattr(self, name)
+                if hasattr(param, 'validate'):
+                    param.validate(value)
+                else:
+                    # astropy < 4, the bound validator checks the value
+                    param.validator(value)
+
+        map_shape = np.broadcast(*maps.values()).shape
+        n_x = np.size(x)
+
+        # the plan checks x and the parameter names
+        plan = self.prepare(x, dtype=dtype)
+
+        if out is None:
+            out = np.empty(map_shape + (n_x,), dtype=dtype)
+        elif out.shape != map_shape + (n_x,):
+            raise ValueError('out has shape ' + str(out.shape)
+                             + ', expected ' + str(map_shape + (n_x,)))
+
+        # view of out with one spectrum per row, without copy
+        out_flat = out.view()
+        try:
+            out_flat.shape = (-1, n_x)
+        except AttributeError:
+            raise ValueError('out must be reshapable to (n_spaxels, n_x) '
+                             'without copy, e.g. a contiguous array')
+
+        flat_maps = dict((name, np.broadcast_to(value, map_shape).ravel())
+                         for name, value in maps.items())
+
+        # scratch space shared by all the chunks
+        work = np.empty((min(chunk_size, out_flat.shape[0]), n_x),
+                        dtype=out.dtype)
+
+        for start in range(0, out_flat.shape[0], chunk_size):
+            stop = start + chunk_size
+            params = dict((name, value[start:stop, np.newaxis])
+                          for name, value in flat_maps.items())
+            out_chunk = out_flat[start:stop]
+            plan.attenuate(out=out_chunk, work=work[:len(out_chunk)],
+                           **params)
+
+        return out
+
+    def _apply_x_range_policy(self, x):
+        """
+        Apply the out of range policy of the model to x values.
+
+        Parameters
+        ----------
+        x: np array (float)
+           wavelengths in [micron]
+
+        Returns
+        -------
+        x: np array (float)
+           wavelengths where the model is evaluated, clipped to the valid
+           range for the 'nan' and 'clip' policies
+
+        out_of_range: np array (bool)
+           x values out of range, where the results are set to NaN, None
+           if there are none or for the other policies
+
+        Raises
+        ------
+        ValueError
+           Input x values outside of defined range, for the 'raise' policy
         """
-        # get the attenuation curve
-        ax = self(x)
+        policy = self._x_range_policy
+        if policy == 'raise':
+            _test_valid_x_range(x, self.x_range, self.__class__.__name__)
+            return x, None
+        elif policy == 'extrapolate':
+            return x, None
+
+        x_clipped = np.clip(x, self.x_range[0], self.x_range[1])
+        if policy == 'clip':
+            return x_clipped, None
+
+        out_of_range = x_clipped != x
+        if not np.any(out_of_range):
+            return x, None
+        return x_clipped, out_of_range
+
+    def _config_key(self):
+        """
+        Configuration of the model other than its class and parameters,
+        such as tables, used in the keys of the cache of model evaluations.
+        Models with such a configuration override this method.
+
+        Returns
+        -------
+        config: tuple
+           hashable configuration
+        """
+        return ()
+
+    def _cached_result(self, kind, x, dtype, kwargs, compute, out=None):
+        """
+        Result of an evaluation, from the cache of model evaluations when
+        possible.
+
+        Parameters
+        ----------
+        kind: string
+           name of the evaluation, 'call' or 'attenuate'
+
+        x: float
+           x as given to the evaluation
+
+        dtype: numpy dtype
+           floating point type of the result
+
+        kwargs: dict
+           other arguments of the evaluation
+
+        compute: callable
+           function computing the result
+
+        out: np array (float)
+           array where the result is written
+
+        Returns
+        -------
+        result: np array (float)
+           result of compute, a copy of the cached result or out if given
+        """
+        size = conf.result_cache_size
+        if size <= 0:
+            return compute()
+
+        # key on the model and its parameters, the range check that makes
+        # the evaluation raise or not, and a hash of the x values that are
+        # compared on a hit
+        x_values = x
+        unit = None
+        if isinstance(x, u.Quantity):
+            x_values = x.value
+            unit = x.unit.to_string()
+        x_values = np.ascontiguousarray(x_values)
+        check_x_range = _x_range_check_enabled()
+        try:
+            key = (kind, self.__class__, self._config_key(),
+                   self._x_range_policy, check_x_range,
+                   len(self),
+                   self.model_set_axis, self.parameters.tobytes(),
+                   dtype.str, tuple(sorted(kwargs.items())), unit,
+                   x_values.dtype.str, x_values.shape,
+                   hash(x_values.tobytes()))
+            hash(key)
+        except TypeError:
+            # arguments that cannot be part of a key
+            return compute()
+
+        with _result_cache_lock:
+            entry = _result_cache.pop(key, None)
+            if entry is not None and np.array_equal(entry[0], x_values):
+                # move to the most recently used position
+                _result_cache[key] = entry
+                _result_cache_stats['hits'] += 1
+                result = entry[1]
+            else:
+                _result_cache_stats['misses'] += 1
+                result = None
 
-        # return fractional attenuation
-        return np.power(10.0, -0.4*ax)
+        if result is not None:
+            # the cached result is never given out, to stay unchanged
+            if out is not None:
+                np.copyto(out, result)
+                return out
+            if isinstance(result, np.ndarray):
+                return result.copy()
+            return result
+
+        # evaluate with the range check setting of the key
+        with _x_range_check_context(check_x_range):
+            result = compute()
+
+        cached = result
+        if isinstance(result, np.ndarray):
+            cached = result.copy()
+            cached.setflags(write=False)
+
+        with _result_cache_lock:
+            _result_cache[key] = (x_values.copy(), cached)
+            while len(_result_cache) > size:
+                _result_cache.popitem(last=False)
+
+        return result
+
+    def _prepare(self, x, dtype=None):
+        """
+        Precompute the parts of the model depending only on x.
+        Models override this method together with `_evaluate_prepared`,
+        by default nothing is precomputed.
+
+        Parameters
+        ----------
+        x: float
+           x as given to `prepare`
+
+        dtype: numpy dtype
+           floating point type of the computation
+
+        Returns
+        -------
+        state: dict
+           precomputed quantities, passed to `_evaluate_prepared`
+        """
+        return {'x': x, 'dtype': _get_dtype(dtype)}
+
+    def _evaluate_prepared(self, state, *params, **kwargs):
+        """
+        Evaluate the model from the precomputed quantities.
+
+        Parameters
+        ----------
+        state: dict
+           precomputed quantities, as returned by `_prepare`
+
+        params: floats
+           parameters of the model, in the order of ``param_names``
+
+        kwargs:
+           out, array where the result is written, and work, scratch
+           array of the same shape. Models overriding this method use
+           them to avoid allocating temporary arrays.
+
+        Returns
+        -------
+        ax: np array (float)
+            Att(x) attenuation curve [mag], out if given
+        """
+        ax = self.evaluate(state['x'], *params)
+
+        out = kwargs.get('out')
+        if out is None:
+            return np.asarray(ax, dtype=state['dtype'])
+
+        out[...] = ax
+        return out
 
 
 class BaseAttAvModel(BaseAttModel):
     """
     Base attenuation Av Model.  Do not use.
+
+    The subclasses define the Av parameter with `_Av_parameter`, after
+    their other parameters.  astropy >= 4 puts the parameters of the base
+    classes first, so an Av parameter defined here would not follow the
+    order of the evaluate arguments of the models with several parameters.
     """
-    Av = Parameter(description="Av: attenuation in V band ",
-                   default=1.0, min=0.0)
 
-    @Av.validator
-    def Av(self, value):
+    def solve_Av(self, x, flux_obs, flux_int, flux_unc=None):
         """
-        Check that Av is in the valid range
+        Best fit Av of many attenuated spectra, in closed form.
+
+        The attenuation in magnitudes, -2.5 log10(flux_obs/flux_int), is
+        proportional to Av for the model curve at Av=1, with the other
+        parameters of the model fixed at their current values. The best
+        fit Av of each spectrum is the weighted least-squares solution of
+        this linear problem, so all the spectra are solved at once without
+        an iterative fitter.
 
         Parameters
         ----------
-        value: float
-            Av value to check
+        x: float
+           expects either x in units of wavelengths or frequency
+           or assumes wavelengths in [micron]
+
+           internally microns are used
+
+        flux_obs: np array (float)
+           observed (attenuated) fluxes, of shape (n_objects, n_x)
+
+        flux_int: np array (float)
+           intrinsic fluxes, broadcast with flux_obs
+
+        flux_unc: np array (float)
+           uncertainties on the observed fluxes, broadcast with flux_obs.
+           If not given, all the points have the same weight and the Av
+           uncertainties are estimated from the residuals.
+
+        Returns
+        -------
+        Av, Av_unc: np arrays (float)
+           best fit Av and its uncertainty, of shape (n_objects,)
 
         Raises
         ------
-        InputParameterError
-           Input Av values outside of defined range
+        ValueError
+           Input x values outside of defined range
+
+        Notes
+        -----
+        Points with non-positive or non-finite fluxes or uncertainties are
+        ignored, as are the wavelengths out of range with the 'nan'
+        `x_range_policy`.  The best fit Av is not constrained to be
+        positive.
         """
+        # attenuation curve per unit Av, computed once for all the spectra,
+        # in float64 for the accuracy of the sums of the normal equations
+        params = dict((name, getattr(self, name).value)
+                      for name in self.param_names)
+        params['Av'] = 1.0
+        k = self.prepare(x, dtype=np.float64)(**params)
 
-        if (value < 0.0):
-            raise InputParameterError("parameter Av must be positive")
+        # wavelengths out of range with the 'nan' policy are ignored
+        k_valid = np.isfinite(k)
+        k = np.where(k_valid, k, 0.0)
+
+        ratio = flux_obs / flux_int
+        if isinstance(ratio, u.Quantity):
+            ratio = ratio.to_value(u.dimensionless_unscaled)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mag = -2.5 * np.log10(ratio)
+            if flux_unc is None:
+                weights = np.ones(np.shape(mag))
+            else:
+                # uncertainties in magnitudes, 2.5/ln(10) sigma/flux
+                unc = flux_unc / flux_obs
+                if isinstance(unc, u.Quantity):
+                    unc = unc.to_value(u.dimensionless_unscaled)
+                weights = 1.0 / (2.5 / np.log(10.0) * unc)**2
+
+            # ignore the points where the magnitudes or the curve are not
+            # defined
+            valid = (np.isfinite(mag) & np.isfinite(weights) & (weights > 0)
+                     & k_valid)
+            mag = np.where(valid, mag, 0.0)
+            weights = np.where(valid, weights, 0.0)
+
+            # normal equations of the fit of mag = Av*k
+            wkk = weights.dot(k**2)
+            Av = (weights * mag).dot(k) / wkk
+
+            if flux_unc is None:
+                # reduced chi2 of the residuals as the variance of the points
+                n_valid = np.sum(valid, axis=-1)
+                res = mag - Av[..., np.newaxis] * k
+                var = np.sum(weights * res**2, axis=-1) / (n_valid - 1)
+                Av_unc = np.sqrt(var / wkk)
+            else:
+                Av_unc = 1.0 / np.sqrt(wkk)
+
+        return Av, Av_unc
 
 
 class BaseAtttauVModel(BaseAttModel):
@@ -88,8 +687,118 @@ class BaseAtttauVModel(BaseAttModel):
         InputParameterError
            Input tau_V values outside of defined range
         """
-        if not (self.tau_V_range[0] <= value <= self.tau_V_range[1]):
+        if np.any(value < self.tau_V_range[0]) or \
+                np.any(value > self.tau_V_range[1]):
             raise InputParameterError("parameter tau_V must be between "
                                       + str(self.tau_V_range[0])
                                       + " and "
                                       + str(self.tau_V_range[1]))
+
+
+class AttModelPlan(object):
+    """
+    Attenuation model bound to a fixed grid of x values.
+
+    Created by `BaseAttModel.prepare`, it evaluates the model on the grid
+    with only the parameter dependent part of the computation.
+
+    Parameters
+    ----------
+    model: BaseAttModel
+       attenuation model
+
+    x: float
+       expects either x in units of wavelengths or frequency
+       or assumes wavelengths in [micron]
+
+    dtype: numpy dtype
+       floating point type of the computation, float32 or float64.
+       Defaults to ``dust_attenuation.conf.dtype``.
+
+    Notes
+    -----
+    The parameters can be given by position, in the order of the model
+    ``param_names``, or by name.  The ones not given take the current
+    values of the model parameters, with an axis for the models of a
+    model set, whose curves then have the shape (n_models, n_x) as with
+    ``model_set_axis=False``.  They are not checked against the
+    parameter validators and can be arrays broadcast with the x grid.
+
+    The ``out`` keyword gives an array where the result is written and
+    ``work`` a scratch array of the same shape, so that repeated
+    evaluations do not allocate new arrays.
+    """
+    def __init__(self, model, x, dtype=None):
+        self.model = model
+        self.dtype = _get_dtype(dtype)
+        self._state = model._prepare(x, dtype=self.dtype)
+
+    def _get_parameters(self, args, kwargs):
+        """
+        Parameter values in the order of the model ``param_names``.
+        """
+        names = self.model.param_names
+        if len(args) > len(names):
+            raise TypeError('too many parameters, the model parameters are '
+                            + ', '.join(names))
+
+        params = list(args)
+        for name in names[len(args):]:
+            if name in kwargs:
+                params.append(kwargs.pop(name))
+            elif len(self.model) > 1:
+                # one value per model, broadcast with the x grid
+                params.append(getattr(self.model, name).value[:, np.newaxis])
+            else:
+                params.append(getattr(self.model, name).value)
+
+        if kwargs:
+            raise TypeError('unknown parameters ' + ', '.join(kwargs)
+                            + ', the model parameters are '
+                            + ', '.join(names))
+
+        return params
+
+    def __call__(self, *args, **kwargs):
+        """
+        Attenuation curve on the x grid
+
+        Parameters
+        ----------
+        args, kwargs: floats
+           model parameters and out and work arrays, see the class notes
+
+        Returns
+        -------
+        ax: np array (float)
+            Att(x) attenuation curve [mag], out if given
+        """
+        out = kwargs.pop('out', None)
+        work = kwargs.pop('work', None)
+
+        ax = self.model._evaluate_prepared(
+            self._state, *self._get_parameters(args, kwargs), out=out,
+            work=work)
+
+        return _mask_out_of_range(ax, self._state.get('out_of_range'))
+
+    def attenuate(self, *args, **kwargs):
+        """
+        Attenuation as a fraction on the x grid
+
+        Parameters
+        ----------
+        args, kwargs: floats
+           model parameters and out and work arrays, see the class notes
+
+        Returns
+        -------
+        frac_att: np array (float)
+           fractional attenuation as a function of x, out if given
+        """
+        if kwargs.get('out') is None:
+            return np.power(10.0, -0.4*self(*args, **kwargs))
+
+        ax = self(*args, **kwargs)
+        np.multiply(ax, -0.4, out=ax)
+        return np.power(10.0, ax, out=ax)
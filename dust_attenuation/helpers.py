@@ -1,10 +1,181 @@
+import threading
+from contextlib import contextmanager
+
 import numpy as np
+import astropy.units as u
+
+from . import conf
+
+# wavelength/frequency/wavenumber equivalencies used for the conversions
+_spectral_equivalencies = u.spectral()
+
+# floating point types supported for the computations
+_dtypes = (np.dtype(np.float64), np.dtype(np.float32))
+
+# floating point type requested for the call in progress and x range
+# check setting of each thread
+_local = threading.local()
+
+# number of x values checked at once, small enough to stay in cache
+# between the min and max reductions
+_x_range_block_size = 65536
+
+
+def _get_dtype(dtype=None, out=None):
+    """
+    Floating point type of a computation: dtype if given, otherwise the
+    type of out, the type requested for the call in progress in this
+    thread or the package default ``conf.dtype``.
+
+    Parameters
+    ----------
+    dtype : numpy dtype or string
+       requested type, float32 or float64
+
+    out : np array
+       array where the result is written
+
+    Returns
+    -------
+    dtype : numpy dtype
+       floating point type
+
+    Raises
+    ------
+    ValueError
+       Type other than float32 and float64
+    """
+    if dtype is None and out is not None:
+        dtype = out.dtype
+    if dtype is None:
+        dtype = getattr(_local, 'dtype', None)
+    if dtype is None:
+        dtype = conf.dtype
+
+    dtype = np.dtype(dtype)
+    if dtype not in _dtypes:
+        raise ValueError('dtype must be float32 or float64, not '
+                         + str(dtype))
+
+    return dtype
+
+
+@contextmanager
+def _dtype_context(dtype):
+    """
+    Use dtype for the computations of this thread within the context,
+    for the model evaluations called through astropy.
+
+    Parameters
+    ----------
+    dtype : numpy dtype or string
+       floating point type, None to keep the current one
+    """
+    previous = getattr(_local, 'dtype', None)
+    if dtype is not None:
+        _local.dtype = _get_dtype(dtype)
+    try:
+        yield
+    finally:
+        _local.dtype = previous
+
+
+def _as_dtype(dtype, *values):
+    """
+    Convert parameter values to arrays of the floating point type of the
+    computation, as astropy gives them as float64 arrays that would
+    promote float32 results to float64.
+
+    Parameters
+    ----------
+    dtype : numpy dtype
+       floating point type
+
+    values : floats or float arrays
+       parameter values
+
+    Returns
+    -------
+    values : list of np arrays
+       converted values
+    """
+    return [np.asarray(value, dtype=dtype) for value in values]
+
+
+def _convert_x_to_microns(x, dtype=np.float64):
+    """
+    Convert x to wavelengths in microns
+
+    Parameters
+    ----------
+    x : float array or astropy Quantity
+       expects either x in units of wavelengths or frequency
+       or assumes wavelengths in [micron]
+
+    dtype : numpy dtype
+       floating point type of the result
+
+    Returns
+    -------
+    x : float array
+       wavelength in microns
+    """
+    if isinstance(x, u.Quantity):
+        # the equivalencies are passed to the conversion only, enabling
+        # them would change the unit registry shared by all the threads
+        x = x.to_value(u.micron, equivalencies=_spectral_equivalencies)
+
+        # strip the quantity to avoid needing to add units to all the
+        #    polynomical coefficients
+        return np.asarray(x, dtype=dtype)
+
+    # no units: already in microns, skip the unit handling
+    return np.asarray(x, dtype=dtype)
+
+
+@contextmanager
+def _x_range_check_context(enabled):
+    """
+    Enable or disable the x range check of this thread within the context.
+
+    Parameters
+    ----------
+    enabled : bool
+       whether the x values are checked
+    """
+    previous = getattr(_local, 'check_x_range', None)
+    _local.check_x_range = enabled
+    try:
+        yield
+    finally:
+        _local.check_x_range = previous
+
+
+def _x_range_check_enabled():
+    """
+    Whether the x values are checked against the valid range, in a
+    `_x_range_check_context` or else following ``conf.check_x_range``
+
+    Returns
+    -------
+    enabled : bool
+       True if the x values are checked
+    """
+    enabled = getattr(_local, 'check_x_range', None)
+    if enabled is None:
+        enabled = conf.check_x_range
+
+    return enabled
 
 
 def _test_valid_x_range(x, x_range, outname):
     """
     Test if any of the x values are outside of the valid range
 
+    The minimum and maximum are computed by blocks, in a single pass over
+    the values.  The test is skipped in a `_x_range_check_context`
+    disabling it, or if ``conf.check_x_range`` is False.
+
     Parameters
     ----------
     x : float array
@@ -16,11 +187,325 @@ def _test_valid_x_range(x, x_range, outname):
     outname: str
        name of curve for error message
     """
-    if np.logical_or(np.any(x < x_range[0]),
-                     np.any(x > x_range[1])):
-        raise ValueError('Input x outside of range defined for ' + outname
-                         + ' ['
-                         + str(x_range[0])
-                         + ' <= x <= '
-                         + str(x_range[1])
-                         + ', x has units micron]')
+    if not _x_range_check_enabled():
+        return
+
+    x = np.asarray(x).ravel()
+    x_min, x_max = x_range
+    if x.dtype.kind == 'f':
+        # compare in the type of x, so that float32 x values rounded from
+        # the limits are valid
+        x_min, x_max = x.dtype.type(x_min), x.dtype.type(x_max)
+
+    for start in range(0, x.size, _x_range_block_size):
+        block = x[start:start + _x_range_block_size]
+        block_min = np.minimum.reduce(block)
+        if block_min != block_min:
+            # NaN values propagate in min and max, compare all the values
+            invalid = np.any(block < x_min) or np.any(block > x_max)
+        else:
+            invalid = block_min < x_min or np.maximum.reduce(block) > x_max
+        if invalid:
+            raise ValueError('Input x outside of range defined for '
+                             + outname
+                             + ' ['
+                             + str(x_range[0])
+                             + ' <= x <= '
+                             + str(x_range[1])
+                             + ', x has units micron]')
+
+
+def _mask_out_of_range(values, out_of_range):
+    """
+    Set the values computed for x values out of range to NaN
+
+    Parameters
+    ----------
+    values : float array
+       values computed on the x values, broadcast with them on the last
+       axes
+
+    out_of_range : bool array
+       x values out of range, None if there are none
+
+    Returns
+    -------
+    values : float array
+       values, modified in place
+    """
+    if out_of_range is not None:
+        np.copyto(values, np.nan, where=out_of_range)
+
+    return values
+
+
+def _interp_weights(grid, x, widths=None):
+    """
+    Find the cells of a grid containing the x values for linear
+    interpolation.  Values outside of the grid are assigned to the first or
+    last cell, giving a linear extrapolation.
+
+    Parameters
+    ----------
+    grid : float array
+       increasing grid points
+
+    x : float array
+       values to locate in the grid
+
+    widths : float array
+       precomputed widths of the grid cells, np.diff(grid)
+
+    Returns
+    -------
+    indxs : int array
+       index of the lower grid point of the cell containing each x
+
+    weights : float array
+       fractional position of each x in its cell
+    """
+    # searching in the interior points directly gives the cell indexes,
+    # with values outside of the grid in the first or last cell
+    indxs = np.searchsorted(grid[1:-1], x)
+
+    if widths is None:
+        widths = np.diff(grid)
+    weights = (x - grid[indxs]) / widths[indxs]
+
+    return indxs, weights
+
+
+class _LinearInterpolator(object):
+    """
+    Linear interpolation of a table on a fixed 1D grid.
+
+    Values outside of the grid are linearly extrapolated from the closest
+    cell, as `~astropy.modeling.tabular_model` with ``method='linear'``,
+    ``bounds_error=False`` and ``fill_value=None``.
+
+    Parameters
+    ----------
+    grid : float array
+       increasing grid points, of size n
+
+    table : float array
+       values at the grid points, of shape (..., n)
+    """
+    def __init__(self, grid, table):
+        self.grid = np.asarray(grid)
+        self.table = table
+
+        # cell widths used for the weights
+        self._widths = np.diff(self.grid)
+
+    def weights(self, x):
+        """
+        Cells and weights, see `_interp_weights`
+        """
+        return _interp_weights(self.grid, x, self._widths)
+
+    def from_weights(self, weights):
+        """
+        Interpolate the table with cells and weights already computed.
+
+        Parameters
+        ----------
+        weights : tuple of arrays
+           cells and weights, as returned by `weights`
+
+        Returns
+        -------
+        values : float array
+           interpolated values
+        """
+        indxs, w = weights
+
+        return self.table[..., indxs] * (1.0 - w) \
+            + self.table[..., indxs + 1] * w
+
+    def __call__(self, x):
+        """
+        Interpolate the table.
+
+        Parameters
+        ----------
+        x : float array
+           values where to interpolate
+
+        Returns
+        -------
+        values : float array
+           interpolated values
+        """
+        return self.from_weights(self.weights(x))
+
+
+class _BilinearInterpolator(object):
+    """
+    Linear interpolation of a table on a fixed rectilinear 2D grid.
+
+    Values outside of the grid are linearly extrapolated from the closest
+    cell, as `~astropy.modeling.tabular_model` with ``method='linear'``,
+    ``bounds_error=False`` and ``fill_value=None``.
+
+    Parameters
+    ----------
+    x_grid, y_grid : float arrays
+       increasing grid points along the two axes, of size nx and ny
+
+    table : float array
+       values at the grid points, of shape (..., nx, ny). Leading axes
+       hold several tables interpolated together.
+    """
+    def __init__(self, x_grid, y_grid, table):
+        self.x_grid = np.asarray(x_grid)
+        self.y_grid = np.asarray(y_grid)
+        self.table = table
+
+        # cell widths used for the weights
+        self._x_widths = np.diff(self.x_grid)
+        self._y_widths = np.diff(self.y_grid)
+
+    def x_weights(self, x):
+        """
+        Cells and weights along the first axis, see `_interp_weights`
+        """
+        return _interp_weights(self.x_grid, x, self._x_widths)
+
+    def y_weights(self, y):
+        """
+        Cells and weights along the second axis, see `_interp_weights`
+        """
+        return _interp_weights(self.y_grid, y, self._y_widths)
+
+    def interp_x(self, x):
+        """
+        Interpolate the table along the first axis only.
+
+        Parameters
+        ----------
+        x : float array
+           values along the first axis, of shape (N,)
+
+        Returns
+        -------
+        table_x : float array
+           table at x for all the points of the second axis grid,
+           of shape (..., N, ny)
+        """
+        i_x, w_x = self.x_weights(x)
+        w_x = w_x[:, np.newaxis]
+
+        return (self.table[..., i_x, :] * (1.0 - w_x)
+                + self.table[..., i_x + 1, :] * w_x)
+
+    def __call__(self, x, y):
+        """
+        Interpolate the table.
+
+        Parameters
+        ----------
+        x, y : float arrays
+           values along the first and second axes, broadcast together
+
+        Returns
+        -------
+        values : float array
+           interpolated values, of shape (...) + broadcast shape of x and y
+        """
+        if np.size(y) == 1:
+            # a single y value: interpolate the grid along the second axis,
+            # then along the first axis with the slopes of the cells, with
+            # three lookups of the size of x instead of six
+            x = np.asarray(x)
+            shape = np.broadcast(x, y).shape
+            if x.shape != shape:
+                x = x.reshape(shape)
+            table_y, slopes = self._cell_slopes(np.ravel(y)[0])
+            i_x = np.searchsorted(self.x_grid[1:-1], x)
+            values = slopes[..., i_x]
+            values *= x - self.x_grid[i_x]
+            values += table_y[..., i_x]
+            return values
+
+        # the index arrays broadcast together in the table lookup
+        return self.from_weights(self.x_weights(x), self.y_weights(y))
+
+    def _cell_slopes(self, y):
+        """
+        Table interpolated at a single y value and its slopes in the cells
+        of the first axis.
+
+        Parameters
+        ----------
+        y : float
+           value along the second axis
+
+        Returns
+        -------
+        table_y : float array
+           table at y, of shape (..., nx)
+
+        slopes : float array
+           slopes along the first axis, of shape (..., nx - 1)
+        """
+        i_y, w_y = self.y_weights(y)
+        table_y = (self.table[..., i_y] * (1.0 - w_y)
+                   + self.table[..., i_y + 1] * w_y)
+        slopes = np.diff(table_y, axis=-1) / self._x_widths
+
+        return table_y, slopes
+
+    def from_weights(self, x_weights, y_weights):
+        """
+        Interpolate the table with cells and weights already computed,
+        for instance to share them with other interpolations.
+
+        Parameters
+        ----------
+        x_weights, y_weights : tuples of arrays
+           cells and weights along the two axes, as returned by
+           `x_weights` and `y_weights`
+
+        Returns
+        -------
+        values : float array
+           interpolated values
+        """
+        i_x, w_x = x_weights
+        i_y, w_y = y_weights
+
+        table = self.table
+        return ((table[..., i_x, i_y] * (1.0 - w_y)
+                 + table[..., i_x, i_y + 1] * w_y) * (1.0 - w_x)
+                + (table[..., i_x + 1, i_y] * (1.0 - w_y)
+                   + table[..., i_x + 1, i_y + 1] * w_y) * w_x)
+
+    def y_slope(self, x, y):
+        """
+        Derivative of the interpolated table along the second axis.
+
+        The derivative is the slope of the interpolation in the cell used
+        to compute the values (see `_interp_weights`), so that it is
+        consistent with `__call__`, including where values are
+        extrapolated. On the grid points it is the slope of the cell
+        below.
+
+        Parameters
+        ----------
+        x, y : float arrays
+           values along the first and second axes, broadcast together
+
+        Returns
+        -------
+        slopes : float array
+           derivative along the second axis, of shape (...) + broadcast
+           shape of x and y
+        """
+        i_x, w_x = self.x_weights(x)
+        i_y, w_y = self.y_weights(y)
+
+        table = self.table
+        return ((table[..., i_x, i_y + 1] - table[..., i_x, i_y]) * (1.0 - w_x)
+                + (table[..., i_x + 1, i_y + 1]
+                   - table[..., i_x + 1, i_y]) * w_x) / self._y_widths[i_y]
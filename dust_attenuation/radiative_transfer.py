@@ -1,21 +1,233 @@
 # -*- coding: utf-8 -*-
 
+import threading
 
 import numpy as np
-import astropy.units as u
-import pkg_resources
 
-from astropy.io import ascii
-from astropy.modeling.tabular import tabular_model
+from astropy.modeling import InputParameterError
 
 from .baseclasses import BaseAtttauVModel
-from .helpers import _test_valid_x_range
+from .helpers import (_convert_x_to_microns, _get_dtype, _mask_out_of_range,
+                      _LinearInterpolator, _BilinearInterpolator)
+from .utils import WG00_tables
 
 
-__all__ = ['WG00']
+__all__ = ['WG00', 'clear_WG00_cache', 'WG00_cache_size']
 
 x_range_WG00 = [0.1, 3.0001]
 
+# Grid for the optical depth
+tau_V_grid_WG00 = np.array([0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 2.5, 3.0, 3.5,
+                            4.0, 4.5, 5.0, 5.5, 6.0, 7.0, 8.0, 9.0, 10.0,
+                            15.0, 20.0, 25.0, 30.0, 35.0, 40.0, 45.0, 50.0])
+
+# Albedo and scattering phase function asymmetry on the wavelength grid
+alb_WG00 = {'mw': np.array([0.320, 0.409, 0.481, 0.526, 0.542, 0.536, 0.503,
+                            0.432, 0.371, 0.389, 0.437, 0.470, 0.486, 0.499,
+                            0.506, 0.498, 0.502, 0.491, 0.481, 0.500, 0.473,
+                            0.457, 0.448, 0.424, 0.400]),
+            'smc': np.array([0.400, 0.449, 0.473, 0.494, 0.508, 0.524, 0.529,
+                             0.528, 0.523, 0.520, 0.516, 0.511, 0.505, 0.513,
+                             0.515, 0.498, 0.494, 0.489, 0.484, 0.493, 0.475,
+                             0.465, 0.439, 0.417, 0.400])}
+
+g_WG00 = {'mw': np.array([0.800, 0.783, 0.767, 0.756, 0.745, 0.736, 0.727,
+                          0.720, 0.712, 0.707, 0.702, 0.697, 0.691, 0.685,
+                          0.678, 0.646, 0.624, 0.597, 0.563, 0.545, 0.533,
+                          0.511, 0.480, 0.445, 0.420]),
+          'smc': np.array([0.800, 0.783, 0.767, 0.756, 0.745, 0.736, 0.727,
+                           0.720, 0.712, 0.707, 0.702, 0.697, 0.691, 0.685,
+                           0.678, 0.646, 0.624, 0.597, 0.563, 0.545, 0.533,
+                           0.511, 0.480, 0.445, 0.420])}
+
+# Tables of each configuration, in the order of the stacked tables
+WG00_table_names = ('tau_att', 'tau', 'fsca', 'fdir', 'fesc')
+
+# Quantities returned by WG00.get_all_quantities
+WG00_quantities = ('att', 'ext', 'fsca', 'fdir', 'fesc', 'albedo', 'g')
+
+# Parsed tables and interpolators shared by all the WG00 instances,
+# keyed on (geometry, dust_type, dust_distribution)
+_WG00_cache = {}
+_WG00_cache_lock = threading.Lock()
+
+# Memory mapped binary tables, when available
+_WG00_binary = {}
+
+
+def _read_WG00_tables(geometry, dust_type, dust_distribution):
+    """
+    Read the Witt & Gordon (2000) tables for one configuration and build
+    the interpolator of the attenuation optical depth.
+
+    Parameters
+    ----------
+    geometry: string
+       'shell', 'cloudy' or 'dusty'
+
+    dust_type: string
+       'mw' or 'smc'
+
+    dust_distribution: string
+       'homogeneous' or 'clumpy'
+
+    Returns
+    -------
+    tables: dict
+       wavelength grid ('wvl_grid'), tables of 'tau_att', 'tau', 'fsca',
+       'fdir' and 'fesc' stacked in this order ('tables') and 2D
+       interpolator in (wavelength, tau_V) for 'tau_att'. The other
+       interpolators are added by `_get_WG00_interp` when first needed.
+    """
+    if geometry not in WG00_tables.geometries:
+        raise ValueError('geometry must be one of '
+                         + ', '.join(WG00_tables.geometries))
+    if dust_type not in WG00_tables.dust_types:
+        raise ValueError('dust_type must be one of '
+                         + ', '.join(WG00_tables.dust_types))
+    if dust_distribution not in WG00_tables.dust_distributions:
+        raise ValueError('dust_distribution must be one of '
+                         + ', '.join(WG00_tables.dust_distributions))
+
+    i_dust = WG00_tables.dust_types.index(dust_type)
+    i_distrib = WG00_tables.dust_distributions.index(dust_distribution)
+
+    # Use the memory mapped binary tables if they have been generated,
+    # otherwise parse the text tables
+    wvl, packed_tables = _load_WG00_binary()
+    if packed_tables is not None:
+        i_geo = WG00_tables.geometries.index(geometry)
+        tables = packed_tables[i_geo, i_dust, i_distrib]
+    else:
+        # only keep the tables of this configuration
+        wvl, tables = WG00_tables.read_WG00_text(geometry)
+        tables = tables[i_dust, i_distrib].copy()
+
+    # Create a 2D interpolator for tau_att, needed by all the models
+    return {'wvl_grid': wvl, 'tables': tables,
+            'tau_att': _BilinearInterpolator(wvl, tau_V_grid_WG00,
+                                             tables[0])}
+
+
+def _get_WG00_interp(tables, name):
+    """
+    Return an interpolator of the tables of one configuration, building it
+    only the first time it is requested in the process.
+
+    Parameters
+    ----------
+    tables: dict
+       tables of the configuration, see `_read_WG00_tables`
+
+    name: string
+       'tau', 'fsca', 'fdir' or 'fesc', or 'all' for all the tables
+       interpolated together
+
+    Returns
+    -------
+    interp: `_BilinearInterpolator`
+       2D interpolator in (wavelength, tau_V)
+    """
+    interp = tables.get(name)
+    if interp is None:
+        with _WG00_cache_lock:
+            interp = tables.get(name)
+            if interp is None:
+                if name == 'all':
+                    table = tables['tables']
+                else:
+                    table = tables['tables'][WG00_table_names.index(name)]
+                interp = _BilinearInterpolator(tables['wvl_grid'],
+                                               tau_V_grid_WG00, table)
+                tables[name] = interp
+
+    return interp
+
+
+def _load_WG00_binary():
+    """
+    Memory map the binary WG00 tables, only once per process.
+
+    Returns
+    -------
+    wvl, tables: np arrays (float)
+       see `dust_attenuation.utils.WG00_tables.load_WG00_binary`
+    """
+    if 'binary' not in _WG00_binary:
+        _WG00_binary['binary'] = WG00_tables.load_WG00_binary()
+
+    return _WG00_binary['binary']
+
+
+def _get_WG00_tables(geometry, dust_type, dust_distribution):
+    """
+    Return the tables for one configuration, reading them only the first
+    time this configuration is requested in the process.
+
+    Parameters
+    ----------
+    geometry: string
+       'shell', 'cloudy' or 'dusty'
+
+    dust_type: string
+       'mw' or 'smc'
+
+    dust_distribution: string
+       'homogeneous' or 'clumpy'
+
+    Returns
+    -------
+    tables: dict
+       see `_read_WG00_tables`
+    """
+    key = (geometry, dust_type, dust_distribution)
+    tables = _WG00_cache.get(key)
+    if tables is None:
+        # only one thread reads the tables of a configuration
+        with _WG00_cache_lock:
+            tables = _WG00_cache.get(key)
+            if tables is None:
+                tables = _read_WG00_tables(geometry, dust_type,
+                                           dust_distribution)
+                _WG00_cache[key] = tables
+
+    return tables
+
+
+def clear_WG00_cache():
+    """
+    Empty the cache of WG00 tables shared by all the WG00 instances.
+    The tables are read again on the next WG00 initialisation.
+    """
+    # not while a thread is reading tables into the cache
+    with _WG00_cache_lock:
+        _WG00_cache.clear()
+        _WG00_binary.clear()
+
+
+def WG00_cache_size():
+    """
+    Number of (geometry, dust_type, dust_distribution) configurations
+    currently held in the WG00 table cache.
+
+    Returns
+    -------
+    size: int
+       number of cached configurations
+    """
+    with _WG00_cache_lock:
+        return len(_WG00_cache)
+
+
+def _rebuild_WG00(cls, tau_V, geometry, dust_type, dust_distribution,
+                  kwargs):
+    """
+    Rebuild a pickled WG00 model, the tables coming from the cache of the
+    process, see `WG00.__reduce__`
+    """
+    return cls(tau_V, geometry=geometry, dust_type=dust_type,
+               dust_distribution=dust_distribution, **kwargs)
+
 
 class WG00(BaseAtttauVModel):
     """
@@ -80,8 +292,13 @@ class WG00(BaseAtttauVModel):
     tau_V_range = [0.25, 50.0]
     x_range = x_range_WG00
 
+    # Albedo and phase function interpolators shared by all the instances,
+    # built once per dust type
+    _albedo_interps = {}
+    _g_interps = {}
+
     def __init__(self, tau_V, geometry='dusty', dust_type='mw',
-                 dust_distribution='clumpy'):
+                 dust_distribution='clumpy', **kwargs):
         """
         Load the attenuation curves for a given geometry, dust type and
         dust distribution.
@@ -100,6 +317,10 @@ class WG00(BaseAtttauVModel):
         dust_distribution: string
            'homogeneous' or 'clumpy'
 
+        kwargs:
+           other arguments of `~astropy.modeling.Model`, such as
+           n_models to define a set of models
+
         Returns
         -------
         Attx: np array (float)
@@ -111,108 +332,92 @@ class WG00(BaseAtttauVModel):
         self.dust_type = dust_type.lower()
         self.dust_distribution = dust_distribution.lower()
 
-        data_path = pkg_resources.resource_filename('dust_attenuation',
-                                                    'data/WG00/')
-
-        data = ascii.read(data_path + self.geometry + '.txt', header_start=0)
-
-        if self.dust_type == 'mw':
-            start = 0
-        elif self.dust_type == 'smc':
-            start = 25
-
-        # Column names
-        tau_colname = 'tau'
-        tau_att_colname = 'tau_att'
-        fsca_colname = 'f(sca)'
-        fdir_colname = 'f(dir)'
-        fesc_colname = 'f(esc)'
-
-        if self.dust_distribution == 'clumpy':
-            tau_att_colname += '_c'
-            fsca_colname += '_c'
-            fdir_colname += '_c'
-            fesc_colname += '_c'
-
-        elif self.dust_distribution == 'homogeneous':
-            tau_att_colname += '_h'
-            fsca_colname += '_h'
-            fdir_colname += '_h'
-            fesc_colname += '_h'
-
-        tau_att_list = []
-        tau_list = []
-        fsca_list = []
-        fdir_list = []
-        fesc_list = []
-
-        len_data = len(data['lambda'])
-        # number of lines between 2 models
-        steps = 25
-
-        counter = start
-        while counter < len_data:
-            tau_att_list.append(np.array(data[tau_att_colname][counter:
-                                                        counter+steps]))
-            tau_list.append(np.array(data[tau_colname][counter:
-                                                        counter+steps]))
-            fsca_list.append(np.array(data[fsca_colname][counter:
-                                                        counter+steps]))
-            fdir_list.append(np.array(data[fdir_colname][counter:
-                                                        counter+steps]))
-            fesc_list.append(np.array(data[fesc_colname][counter:
-                                                        counter+steps]))
-
-            counter += int(2*steps)
-
-        # Convert to np.array and take transpose to have (wvl, tau_V)
-        tau_att_table = np.array(tau_att_list).T
-        tau_table = np.array(tau_list).T
-        fsca_table = np.array(fsca_list).T
-        fdir_table = np.array(fdir_list).T
-        fesc_table = np.array(fesc_list).T
+        self._tables = _get_WG00_tables(self.geometry, self.dust_type,
+                                        self.dust_distribution)
 
         # wavelength grid. It is the same for all the models
-        wvl = np.array(data['lambda'][0:25])
-        self.wvl_grid = wvl
-
-        # Grid for the optical depth
-        tau_V_grid = np.array([0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 2.5, 3.0, 3.5,
-                               4.0, 4.5, 5.0, 5.5, 6.0, 7.0, 8.0, 9.0, 10.0,
-                               15.0, 20.0, 25.0, 30.0, 35.0, 40.0, 45.0, 50.0])
+        self.wvl_grid = self._tables['wvl_grid']
 
-        # Create a 2D tabular model for tau_att and all flux fraction
-        tab = tabular_model(2, name='2D_table')
+        # the other interpolators are only built when first used
+        self.model = self._tables['tau_att']
 
-        # Values corresponding to the x and y grid points
-        gridpoints = (wvl, tau_V_grid)
+        # In Python 2: super(WG00, self) 
+        # In Python 3: super() but super(WG00, self) still works
+        super(WG00, self).__init__(tau_V=tau_V, **kwargs)
 
-        self.model = tab(gridpoints, lookup_table=tau_att_table,
-                         name='tau_att_WG00', bounds_error=False,
-                         fill_value=None, method='linear')
+    def __reduce__(self):
+        """
+        Pickle only the parameters and the configuration of the model.
 
-        self.tau = tab(gridpoints, lookup_table=tau_table,
-                         name='tau_WG00', bounds_error=False,
-                         fill_value=None, method='linear')
+        The tables are not pickled but taken from the table cache of the
+        process unpickling the model, so sending a model to other
+        processes, for instance with `multiprocessing`, costs a few
+        hundred bytes per model.
+        """
+        kwargs = {}
+        if len(self) != 1:
+            kwargs['n_models'] = len(self)
+            kwargs['model_set_axis'] = self.model_set_axis
+        if self.name is not None:
+            kwargs['name'] = self.name
+        if self._x_range_policy != 'raise':
+            kwargs['x_range_policy'] = self._x_range_policy
+
+        # constraints, only when they differ from the defaults
+        if self.fixed['tau_V']:
+            kwargs['fixed'] = {'tau_V': True}
+        if self.tied['tau_V']:
+            kwargs['tied'] = {'tau_V': self.tied['tau_V']}
+        if self.bounds['tau_V'] != type(self).tau_V.bounds:
+            kwargs['bounds'] = {'tau_V': self.bounds['tau_V']}
+
+        return (_rebuild_WG00, (self.__class__, self.tau_V.value,
+                                self.geometry, self.dust_type,
+                                self.dust_distribution, kwargs))
+
+    @property
+    def tau(self):
+        """
+        Interpolator of the extinction optical depth
+        """
+        return _get_WG00_interp(self._tables, 'tau')
 
-        self.fsca = tab(gridpoints, lookup_table=fsca_table,
-                         name='fsca_WG00', bounds_error=False,
-                         fill_value=None, method='linear')
+    @property
+    def fsca(self):
+        """
+        Interpolator of the fraction of scattered flux
+        """
+        return _get_WG00_interp(self._tables, 'fsca')
 
-        self.fdir = tab(gridpoints, lookup_table=fdir_table,
-                         name='fdir_WG00', bounds_error=False,
-                         fill_value=None, method='linear')
+    @property
+    def fdir(self):
+        """
+        Interpolator of the fraction of direct flux
+        """
+        return _get_WG00_interp(self._tables, 'fdir')
 
-        self.fesc = tab(gridpoints, lookup_table=fesc_table,
-                         name='fesc_WG00', bounds_error=False,
-                         fill_value=None, method='linear')
+    @property
+    def fesc(self):
+        """
+        Interpolator of the fraction of escaping flux
+        """
+        return _get_WG00_interp(self._tables, 'fesc')
 
+    @property
+    def _all_tables(self):
+        """
+        Interpolator of all the tables together, in the order of
+        `WG00_table_names`
+        """
+        return _get_WG00_interp(self._tables, 'all')
 
-        # In Python 2: super(WG00, self) 
-        # In Python 3: super() but super(WG00, self) still works
-        super(WG00, self).__init__(tau_V=tau_V)
+    def _config_key(self):
+        """
+        Tables of the model, see `BaseAttModel._config_key`
+        """
+        return (self.geometry, self.dust_type, self.dust_distribution)
 
-    def evaluate(self, x, tau_V):
+    def evaluate(self, x, tau_V, out=None):
         """
         WG00 function
 
@@ -227,40 +432,184 @@ class WG00(BaseAtttauVModel):
         tau_V: float
            optical depth in V band
 
+        out: np array (float)
+           array where the result is written, with the shape of the result,
+           its type sets the type of the result. Only the result is written
+           in place, the intermediate arrays are still allocated, see
+           `prepare` for evaluations without allocations
+
         Returns
         -------
         Attx: np array (float)
-            Att(x) attenuation curve [mag]
+            Att(x) attenuation curve [mag], out if given
 
         Raises
         ------
         ValueError
            Input x values outside of defined range
-        """
-        # convert to wavenumbers (1/micron) if x input in units
-        # otherwise, assume x in appropriate wavenumber units
-        with u.add_enabled_equivalencies(u.spectral()):
-            x_quant = u.Quantity(x, u.micron, dtype=np.float64)
 
-        # strip the quantity to avoid needing to add units to all the
-        #    polynomical coefficients
-        x = x_quant.value
-
-        # check that the wavenumbers are within the defined range
-        _test_valid_x_range(x, x_range_WG00, 'WG00')
+        Notes
+        -----
+        The tables are interpolated in float64, the result is converted to
+        the requested type.
+        """
+        # convert to microns if x input in units
+        # otherwise, assume x in microns
+        dtype = _get_dtype(out=out)
+        x = _convert_x_to_microns(x)
 
-        # setup the ax vectors
-        n_x = len(x)
+        # apply the policy for the wavenumbers out of the defined range
+        x, out_of_range = self._apply_x_range_policy(x)
 
         xinterp = 1e4 * x
-        yinterp = tau_V * np.ones(n_x)
 
-        taux = self.model(xinterp, yinterp)
+        taux = self.model(xinterp, tau_V)
+        if out is None:
+            out = np.empty(taux.shape, dtype=dtype)
 
         # Convert optical depth to attenuation
-        Attx = 1.086 * taux
+        Attx = np.multiply(taux, 1.086, out=out)
+
+        return _mask_out_of_range(Attx, out_of_range)
+
+    def fit_deriv(self, x, tau_V):
+        """
+        Derivative of the attenuation curve with respect to tau_V
+
+        The table is linearly interpolated in tau_V, so the derivative is
+        the slope of the table in the tau_V cell used by `evaluate`.
+
+        Parameters
+        ----------
+        x: float
+           expects either x in units of wavelengths or frequency
+           or assumes wavelengths in [micron]
+
+           internally microns are used
+
+        tau_V: float
+           optical depth in V band
 
-        return Attx
+        Returns
+        -------
+        derivs: list of np arrays (float)
+           derivative with respect to tau_V
+
+        Raises
+        ------
+        ValueError
+           Input x values outside of defined range
+        """
+        # convert to microns if x input in units
+        # otherwise, assume x in microns
+        x = _convert_x_to_microns(x)
+
+        # apply the policy for the wavenumbers out of the defined range
+        x, out_of_range = self._apply_x_range_policy(x)
+
+        return [_mask_out_of_range(1.086 * self.model.y_slope(1e4 * x, tau_V),
+                                   out_of_range)]
+
+    def evaluate_tau_V_grid(self, x, tau_V):
+        """
+        WG00 function for many V band optical depths at once.
+
+        The wavelength interpolation is done once and shared by all the
+        tau_V values.
+
+        Parameters
+        ----------
+        x: float
+           expects either x in units of wavelengths or frequency
+           or assumes wavelengths in [micron]
+
+           internally microns are used
+
+        tau_V: np array (float)
+           optical depths in V band, array of size M
+
+        Returns
+        -------
+        Attx: np array (float)
+            Att(x) attenuation curves [mag], array of shape (M, N) for N
+            values of x
+
+        Raises
+        ------
+        ValueError
+           Input x values outside of defined range
+
+        InputParameterError
+           Input tau_V values outside of defined range
+        """
+        # convert to microns if x input in units
+        # otherwise, assume x in microns
+        x = np.atleast_1d(_convert_x_to_microns(x))
+
+        # apply the policy for the wavenumbers out of the defined range
+        x, out_of_range = self._apply_x_range_policy(x)
+
+        tau_V = np.atleast_1d(np.asarray(tau_V, dtype=np.float64))
+        if np.any(tau_V < self.tau_V_range[0]) or \
+                np.any(tau_V > self.tau_V_range[1]):
+            raise InputParameterError("parameter tau_V must be between "
+                                      + str(self.tau_V_range[0])
+                                      + " and "
+                                      + str(self.tau_V_range[1]))
+
+        # interpolate the table in wavelength for all the tau_V of the grid
+        taux_grid = self.model.interp_x(1e4 * x)
+
+        # then in tau_V
+        i_tau, w_tau = self.model.y_weights(tau_V)
+        taux = (taux_grid[:, i_tau] * (1.0 - w_tau)
+                + taux_grid[:, i_tau + 1] * w_tau)
+
+        # Convert optical depth to attenuation
+        Attx = np.multiply(taux.T, 1.086, dtype=_get_dtype())
+
+        return _mask_out_of_range(Attx, out_of_range)
+
+    def _prepare(self, x, dtype=None):
+        """
+        Precompute the interpolation of the table in wavelength,
+        see `BaseAttModel.prepare`
+        """
+        dtype = _get_dtype(dtype)
+        x = np.atleast_1d(_convert_x_to_microns(x))
+        x, out_of_range = self._apply_x_range_policy(x)
+
+        # attenuation at x for all the tau_V of the grid, one row per tau_V
+        return {'attx_grid': np.ascontiguousarray(
+                    1.086 * self.model.interp_x(1e4 * x).T, dtype=dtype),
+                'indxs': np.arange(len(x)), 'dtype': dtype,
+                'out_of_range': out_of_range}
+
+    def _evaluate_prepared(self, state, tau_V, out=None, work=None):
+        """
+        Attenuation curve from the table interpolated in wavelength
+        """
+        i_tau, w_tau = self.model.y_weights(tau_V)
+        w_tau = np.asarray(w_tau, dtype=state['dtype'])
+        attx_grid = state['attx_grid']
+
+        if np.ndim(i_tau) == 0:
+            # single tau_V, interpolation between two rows in place
+            Attx = np.multiply(attx_grid[i_tau], 1.0 - w_tau, out=out)
+            if work is None:
+                Attx += attx_grid[i_tau + 1] * w_tau
+            else:
+                Attx += np.multiply(attx_grid[i_tau + 1], w_tau, out=work)
+            return Attx
+
+        indxs = state['indxs']
+        Attx = attx_grid[i_tau, indxs] * (1.0 - w_tau)
+        Attx += attx_grid[i_tau + 1, indxs] * w_tau
+        if out is None:
+            return Attx
+
+        out[...] = Attx
+        return out
 
     def get_extinction(self, x, tau_V):
         """
@@ -288,26 +637,20 @@ class WG00(BaseAtttauVModel):
         ValueError
            Input x values outside of defined range
         """
-        # convert to wavenumbers (1/micron) if x input in units
-        # otherwise, assume x in appropriate wavenumber units
-        with u.add_enabled_equivalencies(u.spectral()):
-            x_quant = u.Quantity(x, u.micron, dtype=np.float64)
-
-        # strip the quantity to avoid needing to add units to all the
-        #    polynomical coefficients
-        x = x_quant.value
+        # convert to microns if x input in units
+        # otherwise, assume x in microns
+        x = _convert_x_to_microns(x)
 
-        # check that the wavenumbers are within the defined range
-        _test_valid_x_range(x, x_range_WG00, 'WG00')
+        # apply the policy for the wavenumbers out of the defined range
+        x, out_of_range = self._apply_x_range_policy(x)
 
         # setup the ax vectors
         x = np.atleast_1d(x)
-        n_x = len(x)
 
         xinterp = 1e4 * x
-        yinterp = tau_V * np.ones(n_x)
 
-        return self.tau(xinterp, yinterp) * 1.086
+        return _mask_out_of_range(self.tau(xinterp, tau_V) * 1.086,
+                                  out_of_range)
 
 
     def get_fsca(self, x, tau_V):
@@ -336,26 +679,19 @@ class WG00(BaseAtttauVModel):
         ValueError
            Input x values outside of defined range
         """
-        # convert to wavenumbers (1/micron) if x input in units
-        # otherwise, assume x in appropriate wavenumber units
-        with u.add_enabled_equivalencies(u.spectral()):
-            x_quant = u.Quantity(x, u.micron, dtype=np.float64)
-
-        # strip the quantity to avoid needing to add units to all the
-        #    polynomical coefficients
-        x = x_quant.value
+        # convert to microns if x input in units
+        # otherwise, assume x in microns
+        x = _convert_x_to_microns(x)
 
-        # check that the wavenumbers are within the defined range
-        _test_valid_x_range(x, x_range_WG00, 'WG00')
+        # apply the policy for the wavenumbers out of the defined range
+        x, out_of_range = self._apply_x_range_policy(x)
 
         # setup the ax vectors
         x = np.atleast_1d(x)
-        n_x = len(x)
 
         xinterp = 1e4 * x
-        yinterp = tau_V * np.ones(n_x)
 
-        return self.fsca(xinterp, yinterp)
+        return _mask_out_of_range(self.fsca(xinterp, tau_V), out_of_range)
 
     def get_fdir(self, x, tau_V):
         """
@@ -383,26 +719,19 @@ class WG00(BaseAtttauVModel):
         ValueError
            Input x values outside of defined range
         """
-        # convert to wavenumbers (1/micron) if x input in units
-        # otherwise, assume x in appropriate wavenumber units
-        with u.add_enabled_equivalencies(u.spectral()):
-            x_quant = u.Quantity(x, u.micron, dtype=np.float64)
+        # convert to microns if x input in units
+        # otherwise, assume x in microns
+        x = _convert_x_to_microns(x)
 
-        # strip the quantity to avoid needing to add units to all the
-        #    polynomical coefficients
-        x = x_quant.value
-
-        # check that the wavenumbers are within the defined range
-        _test_valid_x_range(x, x_range_WG00, 'WG00')
+        # apply the policy for the wavenumbers out of the defined range
+        x, out_of_range = self._apply_x_range_policy(x)
 
         # setup the ax vectors
         x = np.atleast_1d(x)
-        n_x = len(x)
 
         xinterp = 1e4 * x
-        yinterp = tau_V * np.ones(n_x)
 
-        return self.fdir(xinterp, yinterp)
+        return _mask_out_of_range(self.fdir(xinterp, tau_V), out_of_range)
 
     def get_fesc(self, x, tau_V):
         """
@@ -430,27 +759,109 @@ class WG00(BaseAtttauVModel):
         ValueError
            Input x values outside of defined range
         """
-        # convert to wavenumbers (1/micron) if x input in units
-        # otherwise, assume x in appropriate wavenumber units
-        with u.add_enabled_equivalencies(u.spectral()):
-            x_quant = u.Quantity(x, u.micron, dtype=np.float64)
-
-        # strip the quantity to avoid needing to add units to all the
-        #    polynomical coefficients
-        x = x_quant.value
+        # convert to microns if x input in units
+        # otherwise, assume x in microns
+        x = _convert_x_to_microns(x)
 
-        # check that the wavenumbers are within the defined range
-        _test_valid_x_range(x, x_range_WG00, 'WG00')
+        # apply the policy for the wavenumbers out of the defined range
+        x, out_of_range = self._apply_x_range_policy(x)
 
         # setup the ax vectors
         x = np.atleast_1d(x)
-        n_x = len(x)
 
         xinterp = 1e4 * x
-        yinterp = tau_V * np.ones(n_x)
 
-        return self.fesc(xinterp, yinterp)
+        return _mask_out_of_range(self.fesc(xinterp, tau_V), out_of_range)
+
+    def get_all_quantities(self, x, tau_V):
+        """
+        Return the attenuation, extinction, flux fractions, albedo and
+        scattering phase function asymmetry at a given wavelength and
+        V-band optical depth in one call.
+
+        The unit conversion and the search of the interpolation cells are
+        done once for all the quantities.
+
+        Parameters
+        ----------
+        x: float
+           expects either x in units of wavelengths or frequency
+           or assumes wavelengths in [micron]
+
+           internally microns are used
+
+        tau_V: float
+           optical depth in V band
+
+        Returns
+        -------
+        quantities: np structured array
+            with fields 'att' (attenuation [mag]), 'ext' (extinction [mag]),
+            'fsca', 'fdir', 'fesc' (scattered, direct and escaping flux
+            fractions), 'albedo' and 'g' (scattering phase function)
+
+        Raises
+        ------
+        ValueError
+           Input x values outside of defined range
+        """
+        # convert to microns if x input in units
+        # otherwise, assume x in microns
+        x = _convert_x_to_microns(x)
+
+        # apply the policy for the wavenumbers out of the defined range
+        x, out_of_range = self._apply_x_range_policy(x)
+
+        x = np.atleast_1d(x)
+
+        xinterp = 1e4 * x
+
+        # locate the interpolation cells once for all the quantities
+        x_weights = self._all_tables.x_weights(xinterp)
+        tab_vals = self._all_tables.from_weights(
+            x_weights, self._all_tables.y_weights(tau_V))
+
+        quantities = np.empty(len(x), dtype=[(name, np.float64)
+                                             for name in WG00_quantities])
+        quantities['att'] = 1.086 * tab_vals[0]
+        quantities['ext'] = 1.086 * tab_vals[1]
+        quantities['fsca'] = tab_vals[2]
+        quantities['fdir'] = tab_vals[3]
+        quantities['fesc'] = tab_vals[4]
+        quantities['albedo'] = self._get_albedo_interp().from_weights(
+            x_weights)
+        quantities['g'] = self._get_g_interp().from_weights(x_weights)
+
+        for name in WG00_quantities:
+            _mask_out_of_range(quantities[name], out_of_range)
+
+        return quantities
+
+
+    def _get_albedo_interp(self):
+        """
+        Albedo interpolator for the dust type of the model.
+        """
+        interp = WG00._albedo_interps.get(self.dust_type)
+        if interp is None:
+            interp = _LinearInterpolator(self.wvl_grid,
+                                         alb_WG00[self.dust_type])
+            WG00._albedo_interps[self.dust_type] = interp
+
+        return interp
+
+    def _get_g_interp(self):
+        """
+        Scattering phase function interpolator for the dust type of the
+        model.
+        """
+        interp = WG00._g_interps.get(self.dust_type)
+        if interp is None:
+            interp = _LinearInterpolator(self.wvl_grid,
+                                         g_WG00[self.dust_type])
+            WG00._g_interps[self.dust_type] = interp
 
+        return interp
 
     def get_albedo(self, x):
         """
@@ -476,44 +887,20 @@ class WG00(BaseAtttauVModel):
         ValueError
            Input x values outside of defined range
         """
-        # convert to wavenumbers (1/micron) if x input in units
-        # otherwise, assume x in appropriate wavenumber units
-        with u.add_enabled_equivalencies(u.spectral()):
-            x_quant = u.Quantity(x, u.micron, dtype=np.float64)
+        # convert to microns if x input in units
+        # otherwise, assume x in microns
+        x = _convert_x_to_microns(x)
 
-        # strip the quantity to avoid needing to add units to all the
-        #    polynomical coefficients
-        x = x_quant.value
-
-        # check that the wavenumbers are within the defined range
-        _test_valid_x_range(x, x_range_WG00, 'WG00')
+        # apply the policy for the wavenumbers out of the defined range
+        x, out_of_range = self._apply_x_range_policy(x)
 
         # setup the ax vectors
         x = np.atleast_1d(x)
-        n_x = len(x)
-
-        alb_MW = np.array([0.320, 0.409, 0.481, 0.526, 0.542, 0.536, 0.503,
-                           0.432, 0.371, 0.389, 0.437, 0.470, 0.486, 0.499,
-                           0.506, 0.498, 0.502, 0.491, 0.481, 0.500, 0.473,
-                           0.457, 0.448, 0.424, 0.400])
-
-        alb_SMC = np.array([0.400, 0.449, 0.473, 0.494, 0.508, 0.524, 0.529,
-                            0.528, 0.523, 0.520, 0.516, 0.511, 0.505, 0.513,
-                            0.515, 0.498, 0.494, 0.489, 0.484, 0.493, 0.475,
-                            0.465, 0.439, 0.417, 0.400 ])
-
-        if self.dust_type == 'smc':
-            albedo = alb_SMC
-        elif self.dust_type == 'mw':
-            albedo = alb_MW
-
-        tab = tabular_model(1, name='Tabular1D')
-        alb_fit = tab(self.wvl_grid, lookup_table=albedo, name='albedo',
-                  bounds_error=False, fill_value=None, method='linear')
 
         xinterp = 1e4 * x
 
-        return alb_fit(xinterp)
+        return _mask_out_of_range(self._get_albedo_interp()(xinterp),
+                                  out_of_range)
 
     def get_scattering_phase_function(self, x):
         """
@@ -539,41 +926,16 @@ class WG00(BaseAtttauVModel):
         ValueError
            Input x values outside of defined range
         """
-        # convert to wavenumbers (1/micron) if x input in units
-        # otherwise, assume x in appropriate wavenumber units
-        with u.add_enabled_equivalencies(u.spectral()):
-            x_quant = u.Quantity(x, u.micron, dtype=np.float64)
-
-        # strip the quantity to avoid needing to add units to all the
-        #    polynomical coefficients
-        x = x_quant.value
+        # convert to microns if x input in units
+        # otherwise, assume x in microns
+        x = _convert_x_to_microns(x)
 
-        # check that the wavenumbers are within the defined range
-        _test_valid_x_range(x, x_range_WG00, 'WG00')
+        # apply the policy for the wavenumbers out of the defined range
+        x, out_of_range = self._apply_x_range_policy(x)
 
         # setup the ax vectors
         x = np.atleast_1d(x)
-        n_x = len(x)
-
-        g_MW = np.array([0.800, 0.783, 0.767, 0.756, 0.745, 0.736, 0.727,
-                         0.720, 0.712, 0.707, 0.702, 0.697, 0.691, 0.685,
-                         0.678, 0.646, 0.624, 0.597, 0.563, 0.545, 0.533,
-                         0.511, 0.480, 0.445, 0.420])
-
-        g_SMC = np.array([0.800, 0.783, 0.767, 0.756, 0.745, 0.736, 0.727,
-                          0.720, 0.712, 0.707, 0.702, 0.697, 0.691, 0.685,
-                          0.678, 0.646, 0.624, 0.597, 0.563, 0.545, 0.533,
-                          0.511, 0.480, 0.445, 0.420])
-
-        if self.dust_type == 'smc':
-            g = g_SMC
-        elif self.dust_type == 'mw':
-            g = g_MW
-
-        tab = tabular_model(1, name='Tabular1D')
-        g_fit = tab(self.wvl_grid, lookup_table=g, name='albedo',
-                  bounds_error=False, fill_value=None, method='linear')
 
         xinterp = 1e4 * x
 
-        return g_fit(xinterp)
+        return _mask_out_of_range(self._get_g_interp()(xinterp), out_of_range)
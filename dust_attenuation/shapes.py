@@ -1,12 +1,15 @@
 # -*- coding: utf-8 -*-
 
+import threading
+from collections import OrderedDict
+
 import numpy as np
-import astropy.units as u
 
-from .baseclasses import BaseAttAvModel
-from .helpers import _test_valid_x_range
+from .baseclasses import BaseAttAvModel, _Av_parameter
+from .helpers import (_convert_x_to_microns, _get_dtype, _as_dtype,
+                      _mask_out_of_range)
 
-from .averages import C00, L02
+from .averages import _k_lambda_C00, _k_lambda_L02
 from astropy.modeling import Parameter, InputParameterError
 
 __all__ = ['N09', 'SBL18']
@@ -14,6 +17,129 @@ __all__ = ['N09', 'SBL18']
 x_range_N09 = [0.097, 2.2]
 x_range_SBL18 = [0.097, 2.2]
 
+# Calzetti/Leitherer base curves of the most recently used wavelength
+# arrays, shared by all the N09 and SBL18 instances
+_base_curve_cache = OrderedDict()
+_base_curve_cache_size = 8
+_base_curve_lock = threading.Lock()
+
+
+def _k_lambda_base(x, extrapolate=False):
+    """
+    Reddening curve k'(λ)=A(λ)/E(B-V) of Calzetti et al. (2000) above
+    0.15 microns and of Leitherer et al. (2002) below, without unit
+    conversion or range check.
+
+    The curve only depends on the wavelengths, so it is kept for the last
+    `_base_curve_cache_size` wavelength arrays and reused when a model is
+    evaluated again on one of them.
+
+    Parameters
+    ----------
+    x: np array (float)
+       wavelengths in [micron]
+
+    extrapolate: bool
+       continue the curve of Calzetti et al. (2000) above 2.2 micron
+
+    Returns
+    -------
+    k_lambda: np array (float)
+       k_lambda(x) reddening curve, read-only
+    """
+    key = (x.shape, x.dtype.str, hash(x.tobytes()), extrapolate)
+
+    with _base_curve_lock:
+        entry = _base_curve_cache.pop(key, None)
+        if entry is not None and np.array_equal(entry[0], x):
+            # move to the most recently used position
+            _base_curve_cache[key] = entry
+            return entry[1]
+
+    # setup the axEbv vectors, with the shape of x to support model sets
+    axEbv = np.zeros(x.shape, dtype=x.dtype)
+
+    # Compute reddening curve using Calzetti 2000
+    mask_C00 = x > 0.15
+    axEbv[mask_C00] = _k_lambda_C00(x[mask_C00], extrapolate=extrapolate)
+
+    # Use recipe of Leitherer 2002 below 0.15 microns
+    mask_L02 = x <= 0.15
+    axEbv[mask_L02] = _k_lambda_L02(x[mask_L02])
+
+    # the cached curve must not be modified by the callers
+    axEbv.setflags(write=False)
+
+    with _base_curve_lock:
+        _base_curve_cache[key] = (x.copy(), axEbv)
+        while len(_base_curve_cache) > _base_curve_cache_size:
+            _base_curve_cache.popitem(last=False)
+
+    return axEbv
+
+
+def _uv_bump_derivs(x2, x0, gamma, ampl):
+    """
+    Drude profile of the UV bump and its derivatives with respect to its
+    parameters.
+
+    Parameters
+    ----------
+    x2: np array (float)
+       squared wavelengths in [micron^2]
+
+    x0, gamma, ampl: float
+       central wavelength, width and amplitude of the UV bump
+
+    Returns
+    -------
+    bump, d_x0, d_gamma, d_ampl: np arrays (float)
+       Drude profile and its derivatives with respect to x0, gamma and ampl
+    """
+    diff = x2 - x0**2
+    width = x2 * gamma**2
+    denom = diff**2 + width
+
+    d_ampl = width / denom
+    bump = ampl * d_ampl
+    d_x0 = 4 * ampl * x0 * width * diff / denom**2
+    d_gamma = 2 * ampl * x2 * gamma * diff**2 / denom**2
+
+    return bump, d_x0, d_gamma, d_ampl
+
+
+def _uv_bump_inplace(x2, x0, gamma, ampl, out):
+    """
+    Drude profile of the UV bump, computed in place as
+    ampl / (1 + (x2 - x0**2)**2 / (x2 gamma**2)) to only use out.
+
+    Parameters
+    ----------
+    x2: np array (float)
+       squared wavelengths in [micron^2]
+
+    x0, gamma, ampl: float
+       central wavelength, width and amplitude of the UV bump
+
+    out: np array (float)
+       array of the broadcast shape of x2 and the parameters where the
+       profile is written
+
+    Returns
+    -------
+    bump: np array (float)
+       Drude profile, out
+    """
+    np.subtract(x2, x0**2, out=out)
+    np.square(out, out=out)
+    out /= x2
+    # a zero width gives an infinite ratio and a zero profile
+    with np.errstate(divide='ignore'):
+        out /= gamma**2
+    out += 1.0
+
+    return np.divide(ampl, out, out=out)
+
 
 class N09(BaseAttAvModel):
     """
@@ -90,11 +216,10 @@ class N09(BaseAttAvModel):
     slope = Parameter(description="slope: slope of the power law",
                             default=0., min=-3., max=3.)
 
-    # Had to redefine the Av parameter though it is defined in the parent class.
-    # May be beause new Parameters are defined here?...
+    # Av is defined after the other parameters, following the order of the
+    # arguments of evaluate, see BaseAttAvModel
 
-    Av = Parameter(description="Av: attenuation in V band ",
-                   default=1.0, min=0.0)
+    Av = _Av_parameter()
 
     @x0.validator
     def x0(self, value):
@@ -112,7 +237,7 @@ class N09(BaseAttAvModel):
            Input x0 values outside of defined range
         """
 
-        if (value < 0.0):
+        if np.any(value < 0.0):
             raise InputParameterError("parameter x0 must be positive")
 
     @gamma.validator
@@ -131,7 +256,7 @@ class N09(BaseAttAvModel):
            Input gamma values outside of defined range
         """
 
-        if (value < 0.0):
+        if np.any(value < 0.0):
             raise InputParameterError("parameter gamma must be positive")
 
     @ampl.validator
@@ -150,7 +275,7 @@ class N09(BaseAttAvModel):
            Input ampl values outside of defined range
         """
 
-        if (value < 0.0):
+        if np.any(value < 0.0):
             raise InputParameterError("parameter ampl must be positive")
 
     @slope.validator
@@ -169,29 +294,10 @@ class N09(BaseAttAvModel):
            Input slope values outside of defined range
         """
 
-        if (value < -3.0) or (value > 3.0):
+        if np.any(value < -3.0) or np.any(value > 3.0):
             raise InputParameterError("parameter slope must be between "
                                       "-3.0 and 3.0")
 
-    @Av.validator
-    def Av(self, value):
-        """
-        Check that Av is in the valid range
-
-        Parameters
-        ----------
-        value: float
-            Av value to check
-
-        Raises
-        ------
-        InputParameterError
-           Input Av values outside of defined range
-        """
-
-        if (value < 0.0):
-            raise InputParameterError("parameter Av must be positive")
-
 
     # Rv from Calzetti 2000
     Rv_C00 = 4.05
@@ -226,8 +332,10 @@ class N09(BaseAttAvModel):
            Input x values outside of defined range
 
         """
-        return ampl * (x**2 * gamma**2 /
-                            ((x**2 - x0**2)**2 + x**2 * gamma**2))
+        x2 = np.square(x)
+        out = np.empty(np.broadcast(x2, x0, gamma, ampl).shape,
+                       dtype=np.result_type(x2, float))
+        return _uv_bump_inplace(x2, x0, gamma, ampl, out)
 
 
     def power_law(self, x, slope):
@@ -247,10 +355,10 @@ class N09(BaseAttAvModel):
            power law
         """
 
-        return (x / 0.55)**slope
+        return np.exp(slope * np.log(x / 0.55))
 
 
-    def k_lambda(self, x, x0, gamma, ampl, slope):
+    def k_lambda(self, x, x0, gamma, ampl, slope, out=None, work=None):
         """ Compute the starburst reddening curve k'(λ)=A(λ)/E(B-V)
         using recipe of Calzetti 2000 and Leitherer 2002
 
@@ -273,10 +381,19 @@ class N09(BaseAttAvModel):
         slope: float
            Slope of the power law.
 
+        out: np array (float)
+           array where the result is written, with the shape of the result,
+           its type sets the type of the computation. Only the result is
+           written in place, the intermediate arrays are still allocated,
+           see `prepare` for evaluations without allocations
+
+        work: np array (float)
+           scratch array of the shape of out
+
         Returns
         -------
         k_lambda: np array (float)
-           k_lambda(x) reddening curve
+           k_lambda(x) reddening curve, out if given
 
         Raises
         ------
@@ -284,41 +401,138 @@ class N09(BaseAttAvModel):
            Input x values outside of defined range
 
         """
-        # convert to wavenumbers (1/micron) if x input in units
-        # otherwise, assume x in appropriate wavenumber units
-        with u.add_enabled_equivalencies(u.spectral()):
-            x_quant = u.Quantity(x, u.micron, dtype=np.float64)
+        # convert to microns if x input in units, check that the
+        # wavenumbers are within the defined range and compute the
+        # wavelength dependent terms
+        state = self._prepare(x, _get_dtype(out=out))
+
+        axEbv = self._k_lambda_prepared(state, x0, gamma, ampl, slope,
+                                        out=out, work=work)
+
+        return _mask_out_of_range(axEbv, state['out_of_range'])
+
+
+    def evaluate(self, x, x0, gamma, ampl, slope, Av, out=None, work=None):
+        """
+        C00 function
+
+        Parameters
+        ----------
+        x: np array (float)
+           expects either x in units of wavelengths or frequency
+           or assumes wavelengths in [micron]
+           internally microns are used
+
+        x0: float
+           Central wavelength of the UV bump (in microns).
+
+        gamma: float
+           Width (FWHM) of thhe UV bump (in microns).
 
-        # strip the quantity to avoid needing to add units to all the
-        #    polynomical coefficients
-        x = x_quant.value
+        ampl: float
+           Amplitude of the UV bump.
 
-        # check that the wavenumbers are within the defined range
-        _test_valid_x_range(x, x_range_N09, 'N09')
+        slope: float
+           Slope of the power law.
 
-        # setup the axEbv vectors
-        axEbv = np.zeros(len(x))
+        Av: float
+           attenuation in V band.
 
-        # Compute reddening curve using Calzetti 2000
-        mask_C00 = x > 0.15
-        axEbv[mask_C00] = C00().k_lambda(x[mask_C00])
+        out: np array (float)
+           array where the result is written, with the shape of the result,
+           its type sets the type of the computation. Only the result is
+           written in place, the intermediate arrays are still allocated,
+           see `prepare` for evaluations without allocations
 
-        # Use recipe of Leitherer 2002 below 0.15 microns
-        mask_L02 = x <= 0.15
-        axEbv[mask_L02] = L02().k_lambda(x[mask_L02])
+        work: np array (float)
+           scratch array of the shape of out
 
-        # Add the UV bump using the Drude profile
-        axEbv += self.uv_bump(x, x0, gamma, ampl)
+        Returns
+        -------
+        att: np array (float)
+            Att(x) attenuation curve [mag], out if given
 
-        # Multiply the reddening curve with a power law with varying slope
-        axEbv *= self.power_law(x, slope)
+        Raises
+        ------
+        ValueError
+           Input x values outside of defined range
+
+        Notes
+        -----
+        The parameters can be arrays broadcast together and with x to
+        evaluate a grid of curves at once. For instance slope of shape
+        (S, 1, 1), ampl of shape (1, A, 1) and x of shape (N,) give curves
+        of shape (S, A, N).  The base reddening curve is computed once for
+        all the parameter values.
+        """
+        state = self._prepare(x, _get_dtype(out=out))
+        ax = self._evaluate_prepared(state, x0, gamma, ampl, slope, Av,
+                                     out=out, work=work)
+
+        return _mask_out_of_range(ax, state['out_of_range'])
+
+    def _prepare(self, x, dtype=None):
+        """
+        Precompute the base reddening curve and the wavelength terms of the
+        UV bump and power law, see `BaseAttModel.prepare`
+        """
+        dtype = _get_dtype(dtype)
+        x = _convert_x_to_microns(x, dtype)
+        x, out_of_range = self._apply_x_range_policy(x)
+        base = _k_lambda_base(
+            x, extrapolate=self._x_range_policy == 'extrapolate')
+
+        return {'base': base, 'x2': x**2, 'log_x': np.log(x / 0.55),
+                'dtype': dtype, 'out_of_range': out_of_range}
+
+    def _k_lambda_prepared(self, state, x0, gamma, ampl, slope, out=None,
+                           work=None):
+        """
+        Reddening curve from the precomputed wavelength terms, computed in
+        place in out with work as scratch space
+        """
+        dtype = state['dtype']
+        x0, gamma, ampl, slope = _as_dtype(dtype, x0, gamma, ampl, slope)
+        if out is None:
+            out = np.empty(np.broadcast(state['x2'], x0, gamma, ampl,
+                                        slope).shape, dtype=dtype)
+        if work is None:
+            work = np.empty(out.shape, dtype=dtype)
+
+        # Power law with varying slope. The exponential is not computed in
+        # place, numpy only uses its vectorized version without overlap.
+        np.multiply(state['log_x'], slope, out=out)
+        powlaw = np.exp(out, out=work)
+
+        # Add the UV bump using the Drude profile to the reddening curve
+        # of Calzetti 2000 and Leitherer 2002
+        axEbv = _uv_bump_inplace(state['x2'], x0, gamma, ampl, out)
+        axEbv += state['base']
+
+        # Multiply the reddening curve with the power law
+        axEbv *= powlaw
 
         return axEbv
 
+    def _evaluate_prepared(self, state, x0, gamma, ampl, slope, Av,
+                           out=None, work=None):
+        """
+        Attenuation curve from the precomputed wavelength terms
+        """
+        Av = np.asarray(Av, dtype=state['dtype'])
+        if out is None:
+            out = np.empty(np.broadcast(state['x2'], x0, gamma, ampl, slope,
+                                        Av).shape, dtype=state['dtype'])
+
+        axEbv = self._k_lambda_prepared(state, x0, gamma, ampl, slope,
+                                        out=out, work=work)
+        axEbv *= Av / self.Rv_C00
+
+        return axEbv
 
-    def evaluate(self, x, x0, gamma, ampl, slope, Av):
+    def fit_deriv(self, x, x0, gamma, ampl, slope, Av):
         """
-        C00 function
+        Derivatives of the attenuation curve with respect to the parameters
 
         Parameters
         ----------
@@ -344,19 +558,35 @@ class N09(BaseAttAvModel):
 
         Returns
         -------
-        att: np array (float)
-            Att(x) attenuation curve [mag]
+        derivs: list of np arrays (float)
+           derivatives with respect to x0, gamma, ampl, slope and Av
 
         Raises
         ------
         ValueError
            Input x values outside of defined range
         """
+        state = self._prepare(x, np.float64)
+        derivs = self._fit_deriv_prepared(state, x0, gamma, ampl, slope, Av)
+
+        return [_mask_out_of_range(deriv, state['out_of_range'])
+                for deriv in derivs]
 
-        axEbv = self.k_lambda(x, x0, gamma, ampl, slope)
-        ax = axEbv / self.Rv_C00 * Av
+    def _fit_deriv_prepared(self, state, x0, gamma, ampl, slope, Av):
+        """
+        Derivatives of the attenuation curve from the precomputed
+        wavelength terms, the UV bump being added before the power law
+        """
+        bump, d_x0, d_gamma, d_ampl = _uv_bump_derivs(state['x2'], x0,
+                                                      gamma, ampl)
+        powlaw = np.exp(slope * state['log_x'])
 
-        return ax
+        # derivative with respect to Av, k_lambda/Rv
+        d_Av = (state['base'] + bump) * powlaw / self.Rv_C00
+        scale = powlaw / self.Rv_C00 * Av
+
+        return [d_x0 * scale, d_gamma * scale, d_ampl * scale,
+                d_Av * Av * state['log_x'], d_Av]
 
 
 
@@ -425,67 +655,46 @@ class SBL18(N09):
         plt.show()
     """
 
-    def k_lambda(self, x, x0, gamma, ampl, slope):
-        """ Compute the starburst reddening curve k'(λ)=A(λ)/E(B-V)
-        using recipe of Calzetti 2000 and Leitherer 2002
-
-        Parameters
-        ----------
-        in_x: np array (float)
-           expects either x in units of wavelengths or frequency
-           or assumes wavelengths in [micron]
-           internally microns are used
-
-        x0: float
-           Central wavelength of the UV bump (in microns).
-
-        gamma: float
-           Width (FWHM) of thhe UV bump (in microns).
-
-        ampl: float
-           Amplitude of the UV bump.
-
-        slope: float
-           Slope of the power law.
-
-        Returns
-        -------
-        k_lambda: np array (float)
-           k_lambda(x) reddening curve
-
-        Raises
-        ------
-        ValueError
-           Input x values outside of defined range
-
+    def _k_lambda_prepared(self, state, x0, gamma, ampl, slope, out=None,
+                           work=None):
         """
-        # convert to wavenumbers (1/micron) if x input in units
-        # otherwise, assume x in appropriate wavenumber units
-        with u.add_enabled_equivalencies(u.spectral()):
-            x_quant = u.Quantity(x, u.micron, dtype=np.float64)
-
-        # strip the quantity to avoid needing to add units to all the
-        #    polynomical coefficients
-        x = x_quant.value
-
-        # check that the wavenumbers are within the defined range
-        _test_valid_x_range(x, x_range_SBL18, 'SBL18')
-
-        # setup the axEbv vectors
-        axEbv = np.zeros(len(x))
-
-        # Compute reddening curve using Calzetti 2000
-        mask_C00 = x > 0.15
-        axEbv[mask_C00] = C00().k_lambda(x[mask_C00])
+        Reddening curve from the precomputed wavelength terms, computed in
+        place in out with work as scratch space
+        """
+        dtype = state['dtype']
+        x0, gamma, ampl, slope = _as_dtype(dtype, x0, gamma, ampl, slope)
+        if out is None:
+            out = np.empty(np.broadcast(state['x2'], x0, gamma, ampl,
+                                        slope).shape, dtype=dtype)
+        if work is None:
+            work = np.empty(out.shape, dtype=dtype)
+
+        # Reddening curve of Calzetti 2000 and Leitherer 2002 multiplied
+        # with a power law with varying slope. The exponential is not
+        # computed in place, numpy only uses its vectorized version without
+        # overlap.
+        np.multiply(state['log_x'], slope, out=out)
+        base_powlaw = np.exp(out, out=work)
+        base_powlaw *= state['base']
+
+        # Add the UV bump using the Drude profile
+        axEbv = _uv_bump_inplace(state['x2'], x0, gamma, ampl, out)
+        axEbv += base_powlaw
 
-        # Use recipe of Leitherer 2002 below 0.15 microns
-        mask_L02 = x <= 0.15
-        axEbv[mask_L02] = L02().k_lambda(x[mask_L02])
+        return axEbv
 
-        # Multiply the reddening curve with a power law with varying slope
-        axEbv *= self.power_law(x, slope)
+    def _fit_deriv_prepared(self, state, x0, gamma, ampl, slope, Av):
+        """
+        Derivatives of the attenuation curve from the precomputed
+        wavelength terms, the UV bump being added after the power law
+        """
+        bump, d_x0, d_gamma, d_ampl = _uv_bump_derivs(state['x2'], x0,
+                                                      gamma, ampl)
+        base_powlaw = state['base'] * np.exp(slope * state['log_x'])
 
-        # Add the UV bump using the Drude profile
-        axEbv += self.uv_bump(x, x0, gamma, ampl)
+        # derivative with respect to Av, k_lambda/Rv
+        d_Av = (base_powlaw + bump) / self.Rv_C00
+        scale = Av / self.Rv_C00
 
-        return axEbv
+        return [d_x0 * scale, d_gamma * scale, d_ampl * scale,
+                base_powlaw * state['log_x'] * scale, d_Av]
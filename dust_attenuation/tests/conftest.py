@@ -0,0 +1,23 @@
+import pytest
+
+from .helpers import model_cases, av_model_cases
+
+
+def _case_id(case):
+    return case.model_class.__name__
+
+
+@pytest.fixture(params=model_cases, ids=_case_id)
+def model_case(request):
+    """
+    Each of the attenuation models, see `helpers.ModelCase`
+    """
+    return request.param
+
+
+@pytest.fixture(params=av_model_cases, ids=_case_id)
+def av_model_case(request):
+    """
+    Each of the Av attenuation models, see `helpers.ModelCase`
+    """
+    return request.param
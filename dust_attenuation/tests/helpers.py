@@ -1,5 +1,12 @@
+from collections import namedtuple
+
+import numpy as np
 import pytest
 
+from ..averages import C00, L02
+from ..shapes import N09, SBL18
+from ..radiative_transfer import WG00
+
 
 def _invalid_x_range(x, tmodel, modname):
     with pytest.raises(ValueError) as exc:
@@ -11,3 +18,38 @@ def _invalid_x_range(x, tmodel, modname):
                                 + ' <= x <= ' \
                                 + str(tmodel.x_range[1]) \
                                 + ', x has units micron]'
+
+
+class ModelCase(namedtuple('ModelCase', ['model_class', 'config', 'params'])):
+    """
+    Attenuation model tested by the tests common to all the models: class,
+    configuration keywords and parameters different from the defaults
+    """
+    def model(self, **params):
+        """
+        Model with the configuration and the parameters of the case, or the
+        given parameters
+        """
+        if not params:
+            params = self.params
+        return self.model_class(**dict(self.config, **params))
+
+    def x(self, n=100):
+        """
+        n x values spanning the valid range of the model [micron]
+        """
+        return np.linspace(self.model_class.x_range[0],
+                           self.model_class.x_range[1], n)
+
+
+shape_params = {'Av': 1.3, 'ampl': 2.5, 'slope': -0.4}
+
+# the Av models first, the tests of the Av models use av_model_cases
+model_cases = [ModelCase(C00, {}, {'Av': 1.3}),
+               ModelCase(L02, {}, {'Av': 1.3}),
+               ModelCase(N09, {}, shape_params),
+               ModelCase(SBL18, {}, shape_params),
+               ModelCase(WG00, {'geometry': 'cloudy', 'dust_type': 'smc'},
+                         {'tau_V': 3.3})]
+
+av_model_cases = model_cases[:4]
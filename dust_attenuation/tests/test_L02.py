@@ -3,6 +3,7 @@ import pytest
 
 import astropy.units as u
 from astropy.modeling import InputParameterError
+from astropy.modeling.fitting import LevMarLSQFitter
 
 from ..averages import L02
 from .helpers import _invalid_x_range
@@ -116,3 +117,29 @@ def test_attenuation_L02_attenuate_values_Av(Av):
 
     # test
     np.testing.assert_allclose(tmodel.attenuate(x), cor_vals, atol=1e-6)
+
+
+@pytest.mark.parametrize("Av", [0.2, 1.0, 2.4, 5.0, 10.0])
+def test_fit_deriv_L02(Av):
+    x, cor_vals = get_axav_cor_vals(Av)
+
+    tmodel = L02(Av=Av)
+
+    # numerical derivative
+    dAv = 1e-6
+    num_deriv = (tmodel.evaluate(x, Av + dAv)
+                 - tmodel.evaluate(x, Av - dAv)) / (2 * dAv)
+
+    derivs = tmodel.fit_deriv(x, Av)
+    assert len(derivs) == 1
+    np.testing.assert_allclose(derivs[0], num_deriv, rtol=1e-6, atol=1e-10)
+
+
+@pytest.mark.parametrize("Av", [0.2, 1.0, 2.4, 5.0, 10.0])
+def test_fit_L02(Av):
+    x, cor_vals = get_axav_cor_vals(Av)
+
+    fitter = LevMarLSQFitter()
+    fit_model = fitter(L02(Av=0.5), x.value, cor_vals)
+
+    np.testing.assert_allclose(fit_model.Av.value, Av, rtol=1e-6)
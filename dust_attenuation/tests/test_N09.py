@@ -3,8 +3,10 @@ import pytest
 
 import astropy.units as u
 from astropy.modeling import InputParameterError
+from astropy.modeling.fitting import LevMarLSQFitter
 
-from ..shapes import N09
+from ..shapes import N09, SBL18, _k_lambda_base
+from ..averages import C00, L02
 from .helpers import _invalid_x_range
 
 
@@ -76,7 +78,7 @@ def get_axav_cor_vals(x0, gamma, ampl, slope, Av):
             if ampl == 0.0:
                 if slope == -1.0:
                     if Av == 0.2:
-                        cor_vals = np.array([0., 0.0476727, 0.13119835,
+                        cor_vals = np.array([0.00455826, 0.0476727, 0.13119835,
                                              0.2454022, 0.38269147, 0.53675915,
                                              0.70305229, 0.87839772, 1.06100214,
                                              1.25045205, 1.44771379, 1.65513354,
@@ -84,7 +86,8 @@ def get_axav_cor_vals(x0, gamma, ampl, slope, Av):
                                              2.64703323, 2.94714046, 3.27112745,
                                              3.62093228, 3.99861665])
                     elif Av == 1.0:
-                        cor_vals = np.array([0., 0.23836349, 0.65599175,
+                        cor_vals = np.array([0.02279129, 0.23836349,
+                                             0.65599175,
                                              1.22701102, 1.91345735,
                                              2.68379577, 3.51526143,
                                              4.3919886, 5.30501068, 6.25226024,
@@ -95,7 +98,8 @@ def get_axav_cor_vals(x0, gamma, ampl, slope, Av):
                                              18.10466138, 19.99308327])
                 elif slope == 0.0:
                     if Av == 0.2:
-                        cor_vals = np.array([0., 0.08906314, 0.15989324,
+                        cor_vals = np.array([0.01823303, 0.08906314,
+                                             0.15989324,
                                              0.22192162, 0.27510497,
                                              0.32019651, 0.35840547,
                                              0.39094108, 0.41901258,
@@ -105,8 +109,8 @@ def get_axav_cor_vals(x0, gamma, ampl, slope, Av):
                                              0.6121642, 0.64145213,
                                              0.67243149, 0.70521057])
                     elif Av == 1.0:
-                        cor_vals = np.array([0., 0.44531568, 0.79946622,
-                                             1.1096081, 1.37552487,
+                        cor_vals = np.array([0.09116514, 0.44531568,
+                                             0.79946622, 1.1096081, 1.37552487,
                                              1.60098256, 1.79202733,
                                              1.95470538, 2.09506288,
                                              2.219146, 2.33300094, 2.44267386,
@@ -116,8 +120,8 @@ def get_axav_cor_vals(x0, gamma, ampl, slope, Av):
                                              3.36215744, 3.52605287])
                 elif slope == 1.0:
                     if Av == 0.2:
-                        cor_vals = np.array([0., 0.16638962, 0.19486411,
-                                             0.20068771, 0.1977644,
+                        cor_vals = np.array([0.07293211, 0.16638962,
+                                             0.19486411, 0.20068771, 0.1977644,
                                              0.19100896, 0.18270971,
                                              0.17399285, 0.16547708,
                                              0.15753052, 0.1503859,
@@ -127,7 +131,7 @@ def get_axav_cor_vals(x0, gamma, ampl, slope, Av):
                                              0.12578563, 0.12487505,
                                              0.1243735])
                     elif Av == 1.0:
-                        cor_vals = np.array([0., 0.8319481, 0.97432055,
+                        cor_vals = np.array([0.36466056, 0.8319481, 0.97432055,
                                              1.00343853, 0.98882198,
                                              0.95504478, 0.91354854,
                                              0.86996426, 0.82738541,
@@ -140,7 +144,7 @@ def get_axav_cor_vals(x0, gamma, ampl, slope, Av):
             elif ampl == 5.0:
                 if slope == -1.0:
                     if Av == 0.2:
-                        cor_vals = np.array([1.59292377e-05, 4.78405545e-02,
+                        cor_vals = np.array([0.00457419, 4.78405545e-02,
                                              1.31886067e-01, 2.47453670e-01,
                                              3.88138032e-01, 5.51226180e-01,
                                              7.46382511e-01, 1.05355562e+00,
@@ -151,7 +155,7 @@ def get_axav_cor_vals(x0, gamma, ampl, slope, Av):
                                              2.96311962e+00, 3.28506963e+00,
                                              3.63331261e+00, 4.00976290e+00])
                     elif Av == 1.0:
-                        cor_vals = np.array([7.96461884e-05, 2.39202772e-01,
+                        cor_vals = np.array([0.02287093, 2.39202772e-01,
                                              6.59430336e-01, 1.23726835e+00,
                                              1.94069016e+00, 2.75613090e+00,
                                              3.73191256e+00, 5.26777812e+00,
@@ -163,7 +167,7 @@ def get_axav_cor_vals(x0, gamma, ampl, slope, Av):
                                              1.81665630e+01, 2.00488145e+01])
                 elif slope == 0.0:
                     if Av == 0.2:
-                        cor_vals = np.array([6.37169507e-05, 8.93767277e-02,
+                        cor_vals = np.array([0.01829675, 8.93767277e-02,
                                              1.60731375e-01, 2.23776797e-01,
                                              2.79020339e-01, 3.28826623e-01,
                                              3.80494563e-01, 4.68897130e-01,
@@ -174,7 +178,7 @@ def get_axav_cor_vals(x0, gamma, ampl, slope, Av):
                                              6.15483300e-01, 6.44186129e-01,
                                              6.74730598e-01, 7.07176366e-01])
                     elif Av == 1.0:
-                        cor_vals = np.array([3.18584754e-04, 4.46883639e-01,
+                        cor_vals = np.array([0.09148373, 4.46883639e-01,
                                              8.03656874e-01, 1.11888399e+00,
                                              1.39510169e+00, 1.64413311e+00,
                                              1.90247281e+00, 2.34448565e+00,
@@ -186,7 +190,7 @@ def get_axav_cor_vals(x0, gamma, ampl, slope, Av):
                                              3.37365299e+00, 3.53588183e+00])
                 elif slope == 1.0:
                     if Av == 0.2:
-                        cor_vals = np.array([2.54867803e-04, 1.66975478e-01,
+                        cor_vals = np.array([0.07318698, 1.66975478e-01,
                                              1.95885551e-01, 2.02365377e-01,
                                              2.00579029e-01, 1.96157134e-01,
                                              1.93970397e-01, 2.08688097e-01,
@@ -197,7 +201,7 @@ def get_axav_cor_vals(x0, gamma, ampl, slope, Av):
                                              1.27844887e-01, 1.26321757e-01,
                                              1.25302012e-01, 1.24720195e-01])
                     elif Av == 1.0:
-                        cor_vals = np.array([1.27433901e-03, 8.34877391e-01,
+                        cor_vals = np.array([0.3659349, 8.34877391e-01,
                                              9.79427753e-01, 1.01182688e+00,
                                              1.00289514e+00, 9.80785670e-01,
                                              9.69851987e-01, 1.04344049e+00,
@@ -247,3 +251,99 @@ def test_attenuation_N09_attenuate_values(x0, gamma, ampl, slope, Av):
 
     # test
     np.testing.assert_allclose(tmodel.attenuate(x), cor_vals[::-1], atol=1e-6)
+
+
+def test_N09_base_curve_cache():
+    x = np.linspace(0.1, 2.1, 100)
+
+    base = _k_lambda_base(x)
+    # same wavelengths in a different array reuse the cached curve
+    assert _k_lambda_base(x.copy()) is base
+    assert not base.flags.writeable
+
+    # the base curve matches Calzetti 2000 and Leitherer 2002
+    mask = x > 0.15
+    np.testing.assert_allclose(base[mask], C00().k_lambda(x[mask]))
+    np.testing.assert_allclose(base[~mask], L02().k_lambda(x[~mask]))
+
+    # evaluations with the cached curve do not modify it
+    tmodel = N09(Av=1.0, ampl=3.0, slope=0.5)
+    vals = tmodel(x)
+    np.testing.assert_allclose(tmodel(x), vals)
+    np.testing.assert_allclose(_k_lambda_base(x), base)
+
+
+@pytest.mark.parametrize("x0", [0.2175, 0.23])
+@pytest.mark.parametrize("gamma", [0.035, 0.06])
+@pytest.mark.parametrize("ampl", [0.0, 5.0])
+@pytest.mark.parametrize("slope", [-1.0, 0.0, 1.0])
+@pytest.mark.parametrize("Av", [0.2, 1.0])
+def test_fit_deriv_N09(x0, gamma, ampl, slope, Av):
+    x = np.linspace(0.1, 2.2, 200)
+    params = [x0, gamma, ampl, slope, Av]
+
+    tmodel = N09()
+    derivs = tmodel.fit_deriv(x, *params)
+    assert len(derivs) == len(tmodel.param_names)
+
+    # compare to central finite differences
+    for k, param in enumerate(params):
+        step = 1e-6 * max(abs(param), 1.0)
+        params_plus = list(params)
+        params_plus[k] += step
+        params_minus = list(params)
+        params_minus[k] -= step
+        num_deriv = (tmodel.evaluate(x, *params_plus)
+                     - tmodel.evaluate(x, *params_minus)) / (2 * step)
+
+        np.testing.assert_allclose(derivs[k], num_deriv, rtol=1e-5,
+                                   atol=1e-6 * np.max(np.abs(num_deriv)))
+
+
+def test_fit_N09():
+    x = np.linspace(0.1, 2.2, 200)
+    params = {'x0': 0.22, 'gamma': 0.04, 'ampl': 3.0, 'slope': -0.5,
+              'Av': 1.5}
+    att = N09(**params)(x)
+
+    fitter = LevMarLSQFitter()
+    fit_model = fitter(N09(x0=0.2175, gamma=0.035, ampl=1.0, slope=0.,
+                          Av=1.0), x, att)
+
+    for name, value in params.items():
+        np.testing.assert_allclose(getattr(fit_model, name).value, value,
+                                   rtol=1e-5)
+
+
+def test_N09_parameter_grid():
+    x = np.linspace(0.1, 2.2, 50) * u.micron
+    slopes = np.array([-1.0, -0.3, 0.0, 0.8])
+    ampls = np.array([0.0, 1.5, 4.0])
+    Avs = np.array([0.2, 1.0])
+
+    tmodel = N09()
+    att = tmodel.evaluate(x, 0.2175, 0.035,
+                          ampls[np.newaxis, :, np.newaxis, np.newaxis],
+                          slopes[:, np.newaxis, np.newaxis, np.newaxis],
+                          Avs[np.newaxis, np.newaxis, :, np.newaxis])
+    assert att.shape == (len(slopes), len(ampls), len(Avs), len(x))
+
+    for i, slope in enumerate(slopes):
+        for j, ampl in enumerate(ampls):
+            for k, Av in enumerate(Avs):
+                np.testing.assert_allclose(
+                    att[i, j, k], N09(ampl=ampl, slope=slope, Av=Av)(x),
+                    rtol=1e-12)
+
+
+@pytest.mark.parametrize("model_class", [N09, SBL18])
+def test_uv_bump_power_law(model_class):
+    x = np.linspace(0.097, 2.2, 50)
+    x0, gamma, ampl, slope = 0.2175, 0.035, 3.5, -0.4
+    tmodel = model_class()
+
+    bump = ampl * (x**2 * gamma**2 / ((x**2 - x0**2)**2 + x**2 * gamma**2))
+    np.testing.assert_allclose(tmodel.uv_bump(x, x0, gamma, ampl), bump,
+                               rtol=1e-12)
+    np.testing.assert_allclose(tmodel.power_law(x, slope),
+                               (x / 0.55)**slope, rtol=1e-12)
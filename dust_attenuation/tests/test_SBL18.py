@@ -3,6 +3,7 @@ import pytest
 
 import astropy.units as u
 from astropy.modeling import InputParameterError
+from astropy.modeling.fitting import LevMarLSQFitter
 
 from ..shapes import SBL18
 from .helpers import _invalid_x_range
@@ -76,7 +77,7 @@ def get_axav_cor_vals(x0, gamma, ampl, slope, Av):
             if ampl == 0.0:
                 if slope == -1.0:
                     if Av == 0.2:
-                        cor_vals = np.array([0., 0.0476727, 0.13119835, 0.2454022,
+                        cor_vals = np.array([0.00455826, 0.0476727, 0.13119835, 0.2454022,
                                              0.38269147, 0.53675915, 0.70305229,
                                              0.87839772, 1.06100214, 1.25045205,
                                              1.44771379, 1.65513354, 1.87246302,
@@ -84,7 +85,7 @@ def get_axav_cor_vals(x0, gamma, ampl, slope, Av):
                                              2.94714046, 3.27112745, 3.62093228,
                                              3.99861665])
                     elif Av == 1.0:
-                        cor_vals = np.array([0., 0.23836349, 0.65599175, 1.22701102,
+                        cor_vals = np.array([0.02279129, 0.23836349, 0.65599175, 1.22701102,
                                              1.91345735, 2.68379577, 3.51526143,
                                              4.3919886, 5.30501068, 6.25226024,
                                              7.23856897, 8.2756677, 9.36231512,
@@ -92,7 +93,7 @@ def get_axav_cor_vals(x0, gamma, ampl, slope, Av):
                                              14.73570232, 16.35563723, 18.10466138,
                                              19.99308327])
                     elif Av == 10.0:
-                        cor_vals = np.array([0., 2.38363494, 6.5599175, 12.27011018,
+                        cor_vals = np.array([0.22791285, 2.38363494, 6.5599175, 12.27011018,
                                              19.13457348, 26.83795774, 35.15261433,
                                              43.91988597, 53.05010681, 62.5226024,
                                              72.38568968, 82.756677, 93.62315116,
@@ -101,7 +102,7 @@ def get_axav_cor_vals(x0, gamma, ampl, slope, Av):
                                              199.93083267])
                 elif slope == 0.0:
                     if Av == 0.2:
-                        cor_vals = np.array([0., 0.08906314, 0.15989324, 0.22192162,
+                        cor_vals = np.array([0.01823303, 0.08906314, 0.15989324, 0.22192162,
                                              0.27510497, 0.32019651, 0.35840547,
                                              0.39094108, 0.41901258, 0.4438292,
                                              0.46660019, 0.48853477, 0.50976024,
@@ -109,7 +110,7 @@ def get_axav_cor_vals(x0, gamma, ampl, slope, Av):
                                              0.6121642, 0.64145213, 0.67243149,
                                              0.70521057])
                     elif Av == 1.0:
-                        cor_vals = np.array([0., 0.44531568, 0.79946622, 1.1096081,
+                        cor_vals = np.array([0.09116514, 0.44531568, 0.79946622, 1.1096081,
                                              1.37552487, 1.60098256, 1.79202733,
                                              1.95470538, 2.09506288, 2.219146,
                                              2.33300094, 2.44267386, 2.54880118,
@@ -117,7 +118,7 @@ def get_axav_cor_vals(x0, gamma, ampl, slope, Av):
                                              3.06082098, 3.20726067, 3.36215744,
                                              3.52605287])
                     elif Av == 10.0:
-                        cor_vals = np.array([0., 4.45315682, 7.99466223, 11.09608099,
+                        cor_vals = np.array([0.9116514, 4.45315682, 7.99466223, 11.09608099,
                                              13.75524872, 16.00982558, 17.92027334,
                                              19.54705381, 20.95062878, 22.19146003,
                                              23.33000937, 24.42673858, 25.48801176,
@@ -126,7 +127,7 @@ def get_axav_cor_vals(x0, gamma, ampl, slope, Av):
                                              35.26052867])
                 elif slope == 1.0:
                     if Av == 0.2:
-                        cor_vals = np.array([0., 0.16638962, 0.19486411, 0.20068771,
+                        cor_vals = np.array([0.07293211, 0.16638962, 0.19486411, 0.20068771,
                                              0.1977644, 0.19100896, 0.18270971,
                                              0.17399285, 0.16547708, 0.15753052,
                                              0.1503859, 0.14419756, 0.13877737,
@@ -134,7 +135,7 @@ def get_axav_cor_vals(x0, gamma, ampl, slope, Av):
                                              0.12715546, 0.12578563, 0.12487505,
                                              0.1243735])
                     elif Av == 1.0:
-                        cor_vals = np.array([0., 0.8319481, 0.97432055, 1.00343853,
+                        cor_vals = np.array([0.36466056, 0.8319481, 0.97432055, 1.00343853,
                                              0.98882198, 0.95504478, 0.91354854,
                                              0.86996426, 0.82738541, 0.78765259,
                                              0.75192948, 0.72098782, 0.69388686,
@@ -142,7 +143,7 @@ def get_axav_cor_vals(x0, gamma, ampl, slope, Av):
                                              0.6357773, 0.62892817, 0.62437526,
                                              0.62186751])
                     elif Av == 10.0:
-                        cor_vals = np.array([0., 8.31948101, 9.74320548, 10.03438531,
+                        cor_vals = np.array([3.64660561, 8.31948101, 9.74320548, 10.03438531,
                                              9.88821976, 9.55044782, 9.13548545,
                                              8.69964264, 8.27385415, 7.87652592,
                                              7.51929476, 7.20987816, 6.93886859,
@@ -152,7 +153,7 @@ def get_axav_cor_vals(x0, gamma, ampl, slope, Av):
             elif ampl == 5.0:
                 if slope == -1.0:
                     if Av == 0.2:
-                        cor_vals = np.array([6.37169507e-05, 4.79862903e-02,
+                        cor_vals = np.array([0.00462197, 4.79862903e-02,
                                              1.32036480e-01, 2.47257381e-01,
                                              3.86606834e-01, 5.45389266e-01,
                                              7.25141383e-01, 9.56353773e-01,
@@ -163,7 +164,7 @@ def get_axav_cor_vals(x0, gamma, ampl, slope, Av):
                                              2.95045957e+00, 3.27386144e+00,
                                              3.62323139e+00, 4.00058245e+00])
                     elif Av == 1.0:
-                        cor_vals = np.array([3.18584754e-04, 2.39931451e-01,
+                        cor_vals = np.array([0.02310987, 2.39931451e-01,
                                              6.60182402e-01, 1.23628691e+00,
                                              1.93303417e+00, 2.72694633e+00,
                                              3.62570691e+00, 4.78176886e+00,
@@ -174,7 +175,7 @@ def get_axav_cor_vals(x0, gamma, ampl, slope, Av):
                                              1.47522978e+01, 1.63693072e+01,
                                              1.81161569e+01, 2.00029122e+01])
                     elif Av == 10.0:
-                        cor_vals = np.array([3.18584754e-03, 2.39931451e+00,
+                        cor_vals = np.array([0.2310987, 2.39931451e+00,
                                              6.60182402e+00, 1.23628691e+01,
                                              1.93303417e+01, 2.72694633e+01,
                                              3.62570691e+01, 4.78176886e+01,
@@ -186,7 +187,7 @@ def get_axav_cor_vals(x0, gamma, ampl, slope, Av):
                                              1.81161569e+02, 2.00029122e+02])
                 elif slope == 0.0:
                     if Av == 0.2:
-                        cor_vals = np.array([6.37169507e-05, 8.93767277e-02,
+                        cor_vals = np.array([0.01829675, 8.93767277e-02,
                                              1.60731375e-01, 2.23776797e-01,
                                              2.79020339e-01, 3.28826623e-01,
                                              3.80494563e-01, 4.68897130e-01,
@@ -197,7 +198,7 @@ def get_axav_cor_vals(x0, gamma, ampl, slope, Av):
                                              6.15483300e-01, 6.44186129e-01,
                                              6.74730598e-01, 7.07176366e-01])
                     elif Av == 1.0:
-                        cor_vals = np.array([3.18584754e-04, 4.46883639e-01,
+                        cor_vals = np.array([0.09148373, 4.46883639e-01,
                                              8.03656874e-01, 1.11888399e+00,
                                              1.39510169e+00, 1.64413311e+00,
                                              1.90247281e+00, 2.34448565e+00,
@@ -208,7 +209,7 @@ def get_axav_cor_vals(x0, gamma, ampl, slope, Av):
                                              3.07741650e+00, 3.22093064e+00,
                                              3.37365299e+00, 3.53588183e+00])
                     elif Av == 10.0:
-                        cor_vals = np.array([3.18584754e-03, 4.46883639e+00,
+                        cor_vals = np.array([0.91483725, 4.46883639e+00,
                                              8.03656874e+00, 1.11888399e+01,
                                              1.39510169e+01, 1.64413311e+01,
                                              1.90247281e+01, 2.34448565e+01,
@@ -220,7 +221,7 @@ def get_axav_cor_vals(x0, gamma, ampl, slope, Av):
                                              3.37365299e+01, 3.53588183e+01])
                 elif slope == 1.0:
                     if Av == 0.2:
-                        cor_vals = np.array([6.37169507e-05, 1.66703212e-01,
+                        cor_vals = np.array([0.07299583, 1.66703212e-01,
                                              1.95702240e-01, 2.02542884e-01,
                                              2.01679760e-01, 1.99639067e-01,
                                              2.04798805e-01, 2.51948906e-01,
@@ -231,7 +232,7 @@ def get_axav_cor_vals(x0, gamma, ampl, slope, Av):
                                              1.30474564e-01, 1.28519629e-01,
                                              1.27174162e-01, 1.26339294e-01])
                     elif Av == 1.0:
-                        cor_vals = np.array([3.18584754e-04, 8.33516058e-01,
+                        cor_vals = np.array([0.36497915, 8.33516058e-01,
                                              9.78511200e-01, 1.01271442e+00,
                                              1.00839880e+00, 9.98195337e-01,
                                              1.02399403e+00, 1.25974453e+00,
@@ -242,7 +243,7 @@ def get_axav_cor_vals(x0, gamma, ampl, slope, Av):
                                              6.52372822e-01, 6.42598145e-01,
                                              6.35870812e-01, 6.31696468e-01])
                     elif Av == 10.0:
-                        cor_vals = np.array([3.18584754e-03, 8.33516058e+00,
+                        cor_vals = np.array([3.64979146, 8.33516058e+00,
                                              9.78511200e+00, 1.01271442e+01,
                                              1.00839880e+01, 9.98195337e+00,
                                              1.02399403e+01, 1.25974453e+01,
@@ -255,7 +256,7 @@ def get_axav_cor_vals(x0, gamma, ampl, slope, Av):
             elif ampl == 20.0:
                 if slope == -1.0:
                     if Av == 0.2:
-                        cor_vals = np.array([2.54867803e-04, 4.89270645e-02,
+                        cor_vals = np.array([0.00481312, 4.89270645e-02,
                                              1.34550871e-01, 2.52822914e-01,
                                              3.98352927e-01, 5.71279599e-01,
                                              7.91408671e-01, 1.19022193e+00,
@@ -266,7 +267,7 @@ def get_axav_cor_vals(x0, gamma, ampl, slope, Av):
                                              2.96041688e+00, 3.28206342e+00,
                                              3.63012872e+00, 4.00647982e+00])
                     elif Av == 1.0:
-                        cor_vals = np.array([1.27433901e-03, 2.44635322e-01,
+                        cor_vals = np.array([0.02406562, 2.44635322e-01,
                                              6.72754356e-01, 1.26411457e+00,
                                              1.99176464e+00, 2.85639800e+00,
                                              3.95704335e+00, 5.95110966e+00,
@@ -277,7 +278,7 @@ def get_axav_cor_vals(x0, gamma, ampl, slope, Av):
                                              1.48020844e+01, 1.64103171e+01,
                                              1.81506436e+01, 2.00323991e+01])
                     elif Av == 10.0:
-                        cor_vals = np.array([1.27433901e-02, 2.44635322e+00,
+                        cor_vals = np.array([0.24065624, 2.44635322e+00,
                                              6.72754356e+00, 1.26411457e+01,
                                              1.99176464e+01, 2.85639800e+01,
                                              3.95704335e+01, 5.95110966e+01,
@@ -289,7 +290,7 @@ def get_axav_cor_vals(x0, gamma, ampl, slope, Av):
                                              1.81506436e+02, 2.00323991e+02])
                 elif slope == 0.0:
                     if Av == 0.2:
-                        cor_vals = np.array([2.54867803e-04, 9.03175019e-02,
+                        cor_vals = np.array([0.0184879, 9.03175019e-02,
                                              1.63245766e-01, 2.29342330e-01,
                                              2.90766432e-01, 3.54716956e-01,
                                              4.46761851e-01, 7.02765289e-01,
@@ -300,7 +301,7 @@ def get_axav_cor_vals(x0, gamma, ampl, slope, Av):
                                              6.25440611e-01, 6.52388113e-01,
                                              6.81627930e-01, 7.13073744e-01])
                     elif Av == 1.0:
-                        cor_vals = np.array([1.27433901e-03, 4.51587510e-01,
+                        cor_vals = np.array([0.09243948, 4.51587510e-01,
                                              8.16228829e-01, 1.14671165e+00,
                                              1.45383216e+00, 1.77358478e+00,
                                              2.23380926e+00, 3.51382645e+00,
@@ -311,7 +312,7 @@ def get_axav_cor_vals(x0, gamma, ampl, slope, Av):
                                              3.12720306e+00, 3.26194056e+00,
                                              3.40813965e+00, 3.56536872e+00])
                     elif Av == 10.0:
-                        cor_vals = np.array([1.27433901e-02, 4.51587510e+00,
+                        cor_vals = np.array([0.92439479, 4.51587510e+00,
                                              8.16228829e+00, 1.14671165e+01,
                                              1.45383216e+01, 1.77358478e+01,
                                              2.23380926e+01, 3.51382645e+01,
@@ -323,7 +324,7 @@ def get_axav_cor_vals(x0, gamma, ampl, slope, Av):
                                              3.40813965e+01, 3.56536872e+01])
                 elif slope == 1.0:
                     if Av == 0.2:
-                        cor_vals = np.array([2.54867803e-04, 1.67643986e-01,
+                        cor_vals = np.array([0.07318698, 1.67643986e-01,
                                              1.98216631e-01, 2.08108416e-01,
                                              2.13425853e-01, 2.25529401e-01,
                                              2.71066093e-01, 4.85817066e-01,
@@ -334,7 +335,7 @@ def get_axav_cor_vals(x0, gamma, ampl, slope, Av):
                                              1.40431875e-01, 1.36721613e-01,
                                              1.34071495e-01, 1.32236671e-01])
                     elif Av == 1.0:
-                        cor_vals = np.array([1.27433901e-03, 8.38219929e-01,
+                        cor_vals = np.array([0.3659349, 8.38219929e-01,
                                              9.91083154e-01, 1.04054208e+00,
                                              1.06712926e+00, 1.12764700e+00,
                                              1.35533047e+00, 2.42908533e+00,
@@ -345,7 +346,7 @@ def get_axav_cor_vals(x0, gamma, ampl, slope, Av):
                                              7.02159377e-01, 6.83608066e-01,
                                              6.70357474e-01, 6.61183357e-01])
                     elif Av == 10.0:
-                        cor_vals = np.array([1.27433901e-02, 8.38219929e+00,
+                        cor_vals = np.array([3.659349, 8.38219929e+00,
                                              9.91083154e+00, 1.04054208e+01,
                                              1.06712926e+01, 1.12764700e+01,
                                              1.35533047e+01, 2.42908533e+01,
@@ -395,3 +396,66 @@ def test_attenuation_SBL18_attenuate_values(x0, gamma, ampl, slope, Av):
 
     # test
     np.testing.assert_allclose(tmodel.attenuate(x), cor_vals[::-1], atol=1e-6)
+
+
+@pytest.mark.parametrize("x0", [0.2175, 0.23])
+@pytest.mark.parametrize("gamma", [0.035, 0.06])
+@pytest.mark.parametrize("ampl", [0.0, 5.0])
+@pytest.mark.parametrize("slope", [-1.0, 0.0, 1.0])
+@pytest.mark.parametrize("Av", [0.2, 1.0])
+def test_fit_deriv_SBL18(x0, gamma, ampl, slope, Av):
+    x = np.linspace(0.1, 2.2, 200)
+    params = [x0, gamma, ampl, slope, Av]
+
+    tmodel = SBL18()
+    derivs = tmodel.fit_deriv(x, *params)
+    assert len(derivs) == len(tmodel.param_names)
+
+    # compare to central finite differences
+    for k, param in enumerate(params):
+        step = 1e-6 * max(abs(param), 1.0)
+        params_plus = list(params)
+        params_plus[k] += step
+        params_minus = list(params)
+        params_minus[k] -= step
+        num_deriv = (tmodel.evaluate(x, *params_plus)
+                     - tmodel.evaluate(x, *params_minus)) / (2 * step)
+
+        np.testing.assert_allclose(derivs[k], num_deriv, rtol=1e-5,
+                                   atol=1e-6 * np.max(np.abs(num_deriv)))
+
+
+def test_fit_SBL18():
+    x = np.linspace(0.1, 2.2, 200)
+    params = {'x0': 0.22, 'gamma': 0.04, 'ampl': 3.0, 'slope': -0.5,
+              'Av': 1.5}
+    att = SBL18(**params)(x)
+
+    fitter = LevMarLSQFitter()
+    fit_model = fitter(SBL18(x0=0.2175, gamma=0.035, ampl=1.0, slope=0.,
+                          Av=1.0), x, att)
+
+    for name, value in params.items():
+        np.testing.assert_allclose(getattr(fit_model, name).value, value,
+                                   rtol=1e-5)
+
+
+def test_SBL18_parameter_grid():
+    x = np.linspace(0.1, 2.2, 50) * u.micron
+    slopes = np.array([-1.0, -0.3, 0.0, 0.8])
+    ampls = np.array([0.0, 1.5, 4.0])
+    Avs = np.array([0.2, 1.0])
+
+    tmodel = SBL18()
+    att = tmodel.evaluate(x, 0.2175, 0.035,
+                          ampls[np.newaxis, :, np.newaxis, np.newaxis],
+                          slopes[:, np.newaxis, np.newaxis, np.newaxis],
+                          Avs[np.newaxis, np.newaxis, :, np.newaxis])
+    assert att.shape == (len(slopes), len(ampls), len(Avs), len(x))
+
+    for i, slope in enumerate(slopes):
+        for j, ampl in enumerate(ampls):
+            for k, Av in enumerate(Avs):
+                np.testing.assert_allclose(
+                    att[i, j, k], SBL18(ampl=ampl, slope=slope, Av=Av)(x),
+                    rtol=1e-12)
@@ -1,10 +1,15 @@
+import pickle
+import threading
+
 import numpy as np
 import pytest
 
 import astropy.units as u
 from astropy.modeling import InputParameterError
+from astropy.modeling.fitting import LevMarLSQFitter
 
-from ..radiative_transfer import WG00
+from .. import radiative_transfer
+from ..radiative_transfer import WG00, clear_WG00_cache, WG00_cache_size
 from .helpers import _invalid_x_range
 
 
@@ -845,3 +850,205 @@ def test_fesc_WG00(tauV, geometries, dust_types, dust_distribs):
 
     # test
     np.testing.assert_allclose(tmodel.get_fesc(x, tauV), cor_vals, atol=1e-10)
+
+
+def test_WG00_cache():
+    clear_WG00_cache()
+    assert WG00_cache_size() == 0
+
+    tmodel = WG00(1.0, geometry='shell', dust_type='smc',
+                  dust_distribution='clumpy')
+    assert WG00_cache_size() == 1
+
+    # same configuration, possibly with different cases, reuses the tables
+    tmodel2 = WG00(2.0, geometry='SHELL', dust_type='SMC',
+                   dust_distribution='clumpy')
+    assert WG00_cache_size() == 1
+    assert tmodel2.model is tmodel.model
+
+    WG00(1.0, geometry='shell', dust_type='mw', dust_distribution='clumpy')
+    assert WG00_cache_size() == 2
+
+    # results do not depend on whether the tables came from the cache
+    x = np.array([0.12, 0.3, 0.55, 1.0, 2.5]) * u.micron
+    cached_vals = tmodel(x)
+    clear_WG00_cache()
+    assert WG00_cache_size() == 0
+    fresh_model = WG00(1.0, geometry='shell', dust_type='smc',
+                       dust_distribution='clumpy')
+    np.testing.assert_allclose(fresh_model(x), cached_vals)
+
+
+def test_WG00_cache_clear_lock():
+    # clearing waits for the tables being read into the cache
+    WG00(1.0)
+    thread = threading.Thread(target=clear_WG00_cache)
+    with radiative_transfer._WG00_cache_lock:
+        thread.start()
+        thread.join(0.2)
+        assert thread.is_alive()
+        assert len(radiative_transfer._WG00_cache) > 0
+    thread.join()
+    assert WG00_cache_size() == 0
+
+
+@pytest.mark.parametrize("config", [{'geometry': 'sphere'},
+                                    {'dust_type': 'lmc'},
+                                    {'dust_distribution': 'smooth'}])
+def test_invalid_WG00_configuration(config):
+    with pytest.raises(ValueError):
+        WG00(1.0, **config)
+
+
+@pytest.mark.parametrize("geometries", ['shell', 'cloudy', 'dusty'])
+@pytest.mark.parametrize("dust_types", ['smc', 'mw'])
+@pytest.mark.parametrize("dust_distribs", ['homogeneous', 'clumpy'])
+def test_WG00_tau_V_grid(geometries, dust_types, dust_distribs):
+    tmodel = WG00(1.0, geometry=geometries, dust_type=dust_types,
+                  dust_distribution=dust_distribs)
+
+    # includes wavelengths and tau_V on and in between the grid points
+    x = np.array([0.1, 0.105, 0.2142, 0.55, 1.0, 2.4, 3.0001]) * u.micron
+    tau_Vs = np.array([0.25, 0.3, 1.0, 4.2, 17.0, 50.0])
+
+    att = tmodel.evaluate_tau_V_grid(x, tau_Vs)
+    assert att.shape == (len(tau_Vs), len(x))
+    for k, tau_V in enumerate(tau_Vs):
+        tmodel.tau_V = tau_V
+        np.testing.assert_allclose(att[k], tmodel(x), rtol=1e-12)
+
+
+@pytest.mark.parametrize("tau_V_invalid", [0.2, 100])
+def test_WG00_tau_V_grid_invalid_tau_V(tau_V_invalid):
+    with pytest.raises(InputParameterError) as exc:
+        WG00(1.0).evaluate_tau_V_grid(0.55, [1.0, tau_V_invalid])
+    assert exc.value.args[0] == 'parameter tau_V must be between 0.25 and 50.0'
+
+
+@pytest.mark.parametrize("tauV", [0.25, 3.3, 50.0])
+@pytest.mark.parametrize("geometries", ['shell', 'cloudy', 'dusty'])
+@pytest.mark.parametrize("dust_types", ['smc', 'mw'])
+@pytest.mark.parametrize("dust_distribs", ['homogeneous', 'clumpy'])
+def test_WG00_all_quantities(tauV, geometries, dust_types, dust_distribs):
+    tmodel = WG00(tauV, geometry=geometries, dust_type=dust_types,
+                  dust_distribution=dust_distribs)
+
+    x = np.array([0.1, 0.105, 0.2142, 0.55, 1.0, 2.4, 3.0001]) * u.micron
+    quantities = tmodel.get_all_quantities(x, tauV)
+
+    assert quantities.shape == (len(x),)
+    np.testing.assert_allclose(quantities['att'], tmodel(x), rtol=1e-12)
+    np.testing.assert_allclose(quantities['ext'],
+                               tmodel.get_extinction(x, tauV), rtol=1e-12)
+    np.testing.assert_allclose(quantities['fsca'],
+                               tmodel.get_fsca(x, tauV), rtol=1e-12)
+    np.testing.assert_allclose(quantities['fdir'],
+                               tmodel.get_fdir(x, tauV), rtol=1e-12)
+    np.testing.assert_allclose(quantities['fesc'],
+                               tmodel.get_fesc(x, tauV), rtol=1e-12)
+    np.testing.assert_allclose(quantities['albedo'],
+                               tmodel.get_albedo(x), rtol=1e-12)
+    np.testing.assert_allclose(quantities['g'],
+                               tmodel.get_scattering_phase_function(x),
+                               rtol=1e-12)
+
+
+@pytest.mark.parametrize("dust_types", ['smc', 'mw'])
+def test_WG00_albedo_g_interpolators_shared(dust_types):
+    tmodel = WG00(1.0, geometry='shell', dust_type=dust_types)
+    tmodel2 = WG00(2.0, geometry='cloudy', dust_type=dust_types)
+
+    x = np.array([0.12, 0.3, 0.55, 1.0, 2.5]) * u.micron
+    np.testing.assert_allclose(tmodel.get_albedo(x), tmodel2.get_albedo(x))
+    assert tmodel._get_albedo_interp() is tmodel2._get_albedo_interp()
+    assert tmodel._get_g_interp() is tmodel2._get_g_interp()
+
+
+@pytest.mark.parametrize("kwargs", [{},
+                                    {'geometry': 'shell',
+                                     'dust_type': 'smc',
+                                     'dust_distribution': 'homogeneous'},
+                                    {'name': 'att', 'x_range_policy': 'nan'},
+                                    {'fixed': {'tau_V': True},
+                                     'bounds': {'tau_V': (0.5, 10.0)}}])
+def test_WG00_pickle(kwargs):
+    tmodel = WG00(1.3, **kwargs)
+    data = pickle.dumps(tmodel, protocol=2)
+
+    # the tables are not pickled, they come from the cache of the process
+    assert len(data) < 1000
+    tmodel2 = pickle.loads(data)
+    assert tmodel2.model is tmodel.model
+
+    x = np.array([0.05, 0.12, 0.3, 0.55, 1.0, 2.5])
+    if 'x_range_policy' not in kwargs:
+        x = x[1:]
+    np.testing.assert_array_equal(tmodel2(x), tmodel(x))
+    for attr in ['geometry', 'dust_type', 'dust_distribution', 'name',
+                 'x_range_policy', 'fixed', 'bounds']:
+        assert getattr(tmodel2, attr) == getattr(tmodel, attr)
+
+    # the copies are built in the same way
+    tmodel3 = tmodel.copy()
+    tmodel3.tau_V = 2.0
+    assert tmodel.tau_V == 1.3
+    assert tmodel3.fixed == tmodel.fixed
+
+
+def test_WG00_pickle_model_set():
+    tmodel = WG00([0.5, 1.0, 2.0], n_models=3, geometry='cloudy')
+    tmodel2 = pickle.loads(pickle.dumps(tmodel))
+    assert len(tmodel2) == 3
+
+    x = np.array([0.12, 0.3, 0.55, 1.0, 2.5])
+    np.testing.assert_array_equal(tmodel2(x, model_set_axis=False),
+                                  tmodel(x, model_set_axis=False))
+
+
+@pytest.mark.parametrize("name", ['tau', 'fsca', 'fdir', 'fesc',
+                                  '_all_tables'])
+def test_WG00_lazy_interpolators(name):
+    clear_WG00_cache()
+    tmodel = WG00(1.0, geometry='cloudy', dust_type='smc')
+    tmodel2 = WG00(2.0, geometry='cloudy', dust_type='smc')
+
+    # only the attenuation table is interpolated by default
+    x = np.array([0.12, 0.3, 0.55, 1.0, 2.5]) * u.micron
+    tmodel(x)
+    tables = tmodel._tables
+    assert set(['tau', 'fsca', 'fdir', 'fesc', 'all']).isdisjoint(tables)
+
+    # the interpolators are built once and shared by the instances
+    interp = getattr(tmodel, name)
+    assert getattr(tmodel2, name) is interp
+    assert len(set(['tau', 'fsca', 'fdir', 'fesc', 'all']) & set(tables)) == 1
+
+
+@pytest.mark.parametrize("tauV", [0.3, 1.2, 3.3, 17.0, 42.0])
+@pytest.mark.parametrize("geometries", ['shell', 'cloudy', 'dusty'])
+@pytest.mark.parametrize("dust_distribs", ['homogeneous', 'clumpy'])
+def test_WG00_fit_deriv(tauV, geometries, dust_distribs):
+    tmodel = WG00(tauV, geometry=geometries, dust_distribution=dust_distribs)
+
+    x = np.array([0.1, 0.105, 0.2142, 0.55, 1.0, 2.4, 3.0001]) * u.micron
+    derivs = tmodel.fit_deriv(x, tauV)
+    assert len(derivs) == 1
+
+    # the curve is linear in tau_V between grid points
+    step = 1e-5
+    num_deriv = (tmodel.evaluate(x, tauV + step)
+                 - tmodel.evaluate(x, tauV - step)) / (2 * step)
+    np.testing.assert_allclose(derivs[0], num_deriv, rtol=1e-6, atol=1e-10)
+
+
+# values close to the tau_V lower bound are not tested as the fitter steps
+# are clipped to the bound
+@pytest.mark.parametrize("tauV", [1.2, 3.3, 17.0, 42.0])
+def test_WG00_fit(tauV):
+    x = np.linspace(0.1, 3.0, 50)
+    att = WG00(tauV, geometry='cloudy', dust_type='smc')(x)
+
+    fitter = LevMarLSQFitter()
+    fit_model = fitter(WG00(2.0, geometry='cloudy', dust_type='smc'), x, att)
+
+    np.testing.assert_allclose(fit_model.tau_V.value, tauV, rtol=1e-6)
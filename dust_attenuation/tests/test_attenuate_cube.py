@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+import astropy.units as u
+from astropy.modeling import InputParameterError
+
+from .helpers import model_cases
+
+
+def get_cube(model_case):
+    # maps of the amplitude parameter, and of slope for the shape models
+    rng = np.random.RandomState(42)
+    x = model_case.x(25) * u.micron
+    names = [model_case.model_class.param_names[-1]]
+    if 'slope' in model_case.params:
+        names.append('slope')
+    shapes = [(6, 7), (6, 1)]
+    maps = {name: model_case.params[name] * rng.uniform(0.5, 1.5, shape)
+            for name, shape in zip(names, shapes)}
+    return model_case.model(), x, maps
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 4096])
+def test_attenuate_cube(model_case, chunk_size):
+    model, x, maps = get_cube(model_case)
+    cube = model.attenuate_cube(x, chunk_size=chunk_size, **maps)
+    assert cube.shape == (6, 7, len(x))
+
+    for i in range(6):
+        for j in range(7):
+            single = model.copy()
+            for name, value in maps.items():
+                setattr(single, name, np.broadcast_to(value, (6, 7))[i, j])
+            np.testing.assert_allclose(cube[i, j], single.attenuate(x),
+                                       rtol=1e-12)
+
+
+def test_attenuate_cube_memmap(tmpdir):
+    model, x, maps = get_cube(model_cases[0])
+    filename = str(tmpdir.join('cube.dat'))
+    out = np.memmap(filename, dtype=np.float64, mode='w+',
+                    shape=(6, 7, len(x)))
+
+    cube = model.attenuate_cube(x, out=out, chunk_size=4, **maps)
+    assert cube is out
+    out.flush()
+
+    expected = model.attenuate_cube(x, **maps)
+    saved = np.memmap(filename, dtype=np.float64, mode='r',
+                      shape=(6, 7, len(x)))
+    np.testing.assert_allclose(saved, expected, rtol=1e-12)
+
+
+def test_attenuate_cube_invalid():
+    model, x, maps = get_cube(model_cases[0])
+
+    with pytest.raises(ValueError):
+        model.attenuate_cube(x, out=np.empty((6, 7, 3)), **maps)
+
+    # spaxels of out not contiguous
+    with pytest.raises(ValueError):
+        model.attenuate_cube(x, out=np.empty((len(x), 7, 6)).T, **maps)
+
+    with pytest.raises(InputParameterError):
+        model.attenuate_cube(x, Av=-maps['Av'])
+
+    with pytest.raises(TypeError):
+        model.attenuate_cube(x)
+
+    with pytest.raises(TypeError):
+        model.attenuate_cube(x, tau_V=maps['Av'])
@@ -3,6 +3,7 @@ import pytest
 
 import astropy.units as u
 from astropy.modeling import InputParameterError
+from astropy.modeling.fitting import LevMarLSQFitter
 
 from ..averages import C00
 from .helpers import _invalid_x_range
@@ -56,32 +57,32 @@ def get_axav_cor_vals(Av):
                              0.19684966, 0.16078594, 0.13194974, 0.11023698,
                              0.09329826, 0.07971503, 0.06858008, 0.05928619,
                              0.05141164, 0.04465435, 0.0387923, 0.03365862,
-                             0.02912551, 0.0250934, 0.02148359, 0.])
+                             0.02912551, 0.0250934, 0.02148359, 0.01823303])
     elif Av == 1.0:
         cor_vals = np.array([2.99243843, 2.03086288, 1.56137474, 1.22746473,
                              0.98424828, 0.80392969, 0.65974871, 0.55118488,
                              0.46649132, 0.39857516, 0.34290038, 0.29643097,
                              0.25705821, 0.22327176, 0.19396148, 0.1682931,
-                             0.14562754, 0.125467, 0.10741794, 0.])
+                             0.14562754, 0.125467, 0.10741794, 0.09116514])
     elif Av == 2.4:
         cor_vals = np.array([7.18185222, 4.8740709, 3.74729937, 2.94591535,
                              2.36219588, 1.92943125, 1.58339689, 1.32284371,
                              1.11957917, 0.95658037, 0.82296091, 0.71143433,
                              0.6169397, 0.53585223, 0.46550756, 0.40390344,
-                             0.34950611, 0.3011208, 0.25780305, 0.])
+                             0.34950611, 0.3011208, 0.25780305, 0.21879634])
     elif Av == 5.0:
         cor_vals = np.array([14.96219214, 10.15431438, 7.80687369, 6.13732365,
                              4.92124141, 4.01964844, 3.29874353, 2.75592439,
                              2.33245661, 1.99287578, 1.71450189, 1.48215485,
                              1.28529105, 1.11635882, 0.96980742, 0.84146551,
-                             0.72813772, 0.62733501, 0.53708968, 0.])
+                             0.72813772, 0.62733501, 0.53708968, 0.4558257])
     elif Av == 10.0:
         cor_vals = np.array([29.92438427, 20.30862876, 15.61374738,
                              12.27464731, 9.84248281, 8.03929687, 6.59748706,
                              5.51184878, 4.66491322, 3.98575156, 3.42900378,
                              2.96430969, 2.5705821, 2.23271764, 1.93961483,
                              1.68293101, 1.45627545, 1.25467002, 1.07417936,
-                             0.])
+                             0.9116514])
     else:
         cor_vals = np.array([0.0])
 
@@ -113,3 +114,29 @@ def test_attenuation_C00_attenuate_values_Av(Av):
 
     # test
     np.testing.assert_allclose(tmodel.attenuate(x), cor_vals, atol=1e-10)
+
+
+@pytest.mark.parametrize("Av", [0.2, 1.0, 2.4, 5.0, 10.0])
+def test_fit_deriv_C00(Av):
+    x, cor_vals = get_axav_cor_vals(Av)
+
+    tmodel = C00(Av=Av)
+
+    # numerical derivative
+    dAv = 1e-6
+    num_deriv = (tmodel.evaluate(x, Av + dAv)
+                 - tmodel.evaluate(x, Av - dAv)) / (2 * dAv)
+
+    derivs = tmodel.fit_deriv(x, Av)
+    assert len(derivs) == 1
+    np.testing.assert_allclose(derivs[0], num_deriv, rtol=1e-6, atol=1e-10)
+
+
+@pytest.mark.parametrize("Av", [0.2, 1.0, 2.4, 5.0, 10.0])
+def test_fit_C00(Av):
+    x, cor_vals = get_axav_cor_vals(Av)
+
+    fitter = LevMarLSQFitter()
+    fit_model = fitter(C00(Av=0.5), x.value, cor_vals)
+
+    np.testing.assert_allclose(fit_model.Av.value, Av, rtol=1e-6)
@@ -0,0 +1,119 @@
+import numpy as np
+import pytest
+
+import astropy.units as u
+
+from .. import conf
+from ..averages import C00
+
+
+# float32 relative precision is about 1e-7, the rounding errors of the
+# few operations of the models stay well below 1e-5
+rtol_float32 = 1e-5
+
+
+def test_dtype_global(model_case):
+    x = model_case.x(1000)
+    model = model_case.model()
+    params = model_case.params
+    ref = model(x)
+    ref_att = model.attenuate(x)
+    assert ref.dtype == np.float64
+
+    with conf.set_temp('dtype', 'float32'):
+        assert model(x).dtype == np.float32
+        np.testing.assert_allclose(model(x), ref, rtol=rtol_float32)
+        np.testing.assert_allclose(model(x.astype(np.float32) * u.micron),
+                                   ref, rtol=rtol_float32)
+
+        att = model.attenuate(x)
+        assert att.dtype == np.float32
+        np.testing.assert_allclose(att, ref_att, rtol=rtol_float32)
+
+        res = model.prepare(x)(**params)
+        assert res.dtype == np.float32
+        np.testing.assert_allclose(res, ref, rtol=rtol_float32)
+
+    assert model(x).dtype == np.float64
+
+
+def test_dtype_per_call(model_case):
+    x = model_case.x(1000)
+    model = model_case.model()
+    params = model_case.params
+    ref = model(x)
+    ref_att = model.attenuate(x)
+
+    att = model.attenuate(x, dtype=np.float32)
+    assert att.dtype == np.float32
+    np.testing.assert_allclose(att, ref_att, rtol=rtol_float32)
+
+    # the type is only changed for the call
+    assert model(x).dtype == np.float64
+
+    out = np.empty(len(x), dtype=np.float32)
+    model.attenuate(x, out=out)
+    np.testing.assert_allclose(out, ref_att, rtol=rtol_float32)
+
+    param_values = [getattr(model, name).value
+                    for name in model.param_names]
+    model.evaluate(x, *param_values, out=out)
+    np.testing.assert_allclose(out, ref, rtol=rtol_float32)
+
+    plan = model.prepare(x, dtype='float32')
+    assert plan.dtype == np.float32
+    res = plan(**params)
+    assert res.dtype == np.float32
+    np.testing.assert_allclose(res, ref, rtol=rtol_float32)
+
+    # float64 parameter arrays do not promote the result
+    name = model.param_names[-1]
+    values = np.full((3, 1), params[name])
+    res = plan.attenuate(**{name: values})
+    assert res.dtype == np.float32
+    np.testing.assert_allclose(res, np.tile(ref_att, (3, 1)),
+                               rtol=rtol_float32)
+
+    cube = model.attenuate_cube(x, dtype=np.float32,
+                                **{name: np.full((4, 3), params[name])})
+    assert cube.dtype == np.float32
+    np.testing.assert_allclose(cube, np.tile(ref_att, (4, 3, 1)),
+                               rtol=rtol_float32)
+
+
+def test_dtype_k_lambda(av_model_case):
+    x = av_model_case.x(1000)
+    model = av_model_case.model()
+    param_values = [getattr(model, name).value
+                    for name in model.param_names[:-1]]
+
+    out = np.empty(len(x), dtype=np.float32)
+    res = model.k_lambda(x, *param_values, out=out)
+    assert res is out
+    np.testing.assert_allclose(out, model.k_lambda(x, *param_values),
+                               rtol=rtol_float32)
+
+
+def test_dtype_invalid(model_case):
+    x = model_case.x(1000)
+    model = model_case.model()
+
+    with pytest.raises(ValueError) as exc:
+        model.attenuate(x, dtype=np.float16)
+    assert 'dtype must be float32 or float64' in str(exc.value)
+
+    with pytest.raises(ValueError):
+        model.prepare(x, dtype=np.int32)
+
+
+def test_dtype_solve_Av():
+    # the normal equations are solved in float64 whatever the type
+    x = np.linspace(0.12, 2.19, 200)
+    flux_int = np.ones((5, len(x)))
+    Av = np.linspace(0.1, 2.0, 5)
+    flux_obs = flux_int * C00(Av=1.0).attenuate(x) ** Av[:, np.newaxis]
+
+    with conf.set_temp('dtype', 'float32'):
+        res, res_unc = C00().solve_Av(x, flux_obs, flux_int)
+    assert res.dtype == np.float64
+    np.testing.assert_allclose(res, Av, rtol=1e-10)
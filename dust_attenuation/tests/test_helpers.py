@@ -0,0 +1,164 @@
+import threading
+
+import numpy as np
+import pytest
+
+import astropy.units as u
+from astropy.modeling.tabular import tabular_model
+
+from .. import conf
+from ..baseclasses import skip_x_range_check
+from ..helpers import (_convert_x_to_microns, _test_valid_x_range,
+                       _x_range_block_size, _LinearInterpolator,
+                       _BilinearInterpolator)
+
+
+def get_test_grid():
+    # irregular grid, as the WG00 ones
+    x_grid = np.array([1000., 1142., 1500., 3000., 9487., 30001.])
+    y_grid = np.array([0.25, 0.5, 1.0, 7.0, 50.0])
+    table = np.random.RandomState(42).uniform(size=(len(x_grid),
+                                                    len(y_grid)))
+    return x_grid, y_grid, table
+
+
+def test_bilinear_interpolator_tabular_model():
+    x_grid, y_grid, table = get_test_grid()
+
+    tab = tabular_model(2, name='2D_table')
+    tmodel = tab((x_grid, y_grid), lookup_table=table, bounds_error=False,
+                 fill_value=None, method='linear')
+    interp = _BilinearInterpolator(x_grid, y_grid, table)
+
+    # grid points, in between grid points and outside of the grid
+    x = np.array([1000., 1100., 1142., 2000., 9487., 20000., 30001.,
+                  500., 40000.])
+    for y in [0.25, 0.3, 5.0, 50.0, 0.1, 60.]:
+        np.testing.assert_allclose(interp(x, y),
+                                   tmodel(x, y * np.ones(len(x))),
+                                   rtol=1e-12)
+
+
+def test_bilinear_interpolator_stacked():
+    x_grid, y_grid, table = get_test_grid()
+    stacked = np.array([table, 2 * table, table ** 2])
+
+    interp = _BilinearInterpolator(x_grid, y_grid, stacked)
+
+    x = np.array([1050., 1142., 5000., 29000.])
+    y = np.array([0.3, 0.5, 10.0, 45.0])
+    values = interp(x, y)
+    assert values.shape == (3, len(x))
+    for k in range(3):
+        single = _BilinearInterpolator(x_grid, y_grid, stacked[k])
+        np.testing.assert_allclose(values[k], single(x, y), rtol=1e-12)
+
+    # interpolation along the first axis only, at the y grid points
+    table_x = interp.interp_x(x)
+    assert table_x.shape == (3, len(x), len(y_grid))
+    for j, y in enumerate(y_grid):
+        np.testing.assert_allclose(table_x[:, :, j], interp(x, y),
+                                   rtol=1e-12)
+
+
+def test_bilinear_interpolator_y_slope():
+    x_grid, y_grid, table = get_test_grid()
+    interp = _BilinearInterpolator(x_grid, y_grid, table)
+
+    x = np.array([1000., 1100., 2000., 9487., 30001., 500., 40000.])
+    # inside cells and outside of the grid, where the interpolation is
+    # linear in y on both sides of the point
+    for y in [0.3, 0.75, 5.0, 20.0, 0.1, 60.]:
+        step = 1e-4
+        num_slope = (interp(x, y + step) - interp(x, y - step)) / (2 * step)
+        np.testing.assert_allclose(interp.y_slope(x, y), num_slope,
+                                   rtol=1e-8)
+
+    # on the grid points, slope of the cell below
+    for k in range(1, len(y_grid)):
+        cell_slope = ((interp(x, y_grid[k]) - interp(x, y_grid[k] - 1e-3))
+                      / 1e-3)
+        np.testing.assert_allclose(interp.y_slope(x, y_grid[k]), cell_slope,
+                                   rtol=1e-8)
+
+
+def test_linear_interpolator_tabular_model():
+    x_grid, y_grid, table = get_test_grid()
+
+    tab = tabular_model(1, name='Tabular1D')
+    tmodel = tab(x_grid, lookup_table=table[:, 0], bounds_error=False,
+                 fill_value=None, method='linear')
+    interp = _LinearInterpolator(x_grid, table[:, 0])
+
+    x = np.array([1000., 1100., 1142., 2000., 9487., 20000., 30001.,
+                  500., 40000.])
+    np.testing.assert_allclose(interp(x), tmodel(x), rtol=1e-12)
+
+
+def test_convert_x_to_microns():
+    x = np.array([0.1, 0.55, 2.2])
+
+    # plain numbers are assumed in microns
+    np.testing.assert_equal(_convert_x_to_microns(x), x)
+    np.testing.assert_equal(_convert_x_to_microns(list(x)), x)
+    assert _convert_x_to_microns(x.astype(np.float32)).dtype == np.float64
+
+    np.testing.assert_allclose(_convert_x_to_microns(x * 1e4 * u.angstrom), x)
+    np.testing.assert_allclose(_convert_x_to_microns(1 / x / u.micron), x)
+
+
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+def test_valid_x_range(dtype):
+    x_range = [0.12, 2.2]
+    # several blocks, the limits rounded to float32 are valid
+    x = np.linspace(0.12, 2.2, 3 * _x_range_block_size + 14).astype(dtype)
+    _test_valid_x_range(x, x_range, 'C00')
+    _test_valid_x_range(x.reshape(-1, 2)[::2], x_range, 'C00')
+    _test_valid_x_range(x[:0], x_range, 'C00')
+
+    # invalid values in any block, also with NaN values
+    for indx in [0, _x_range_block_size + 10, len(x) - 1]:
+        for value in [0.1, 2.3]:
+            x_invalid = x.copy()
+            x_invalid[indx] = value
+            with pytest.raises(ValueError) as exc:
+                _test_valid_x_range(x_invalid, x_range, 'C00')
+            assert 'C00 [0.12 <= x <= 2.2' in str(exc.value)
+
+            x_invalid[indx + 1 if indx == 0 else indx - 1] = np.nan
+            with pytest.raises(ValueError):
+                _test_valid_x_range(x_invalid, x_range, 'C00')
+
+    # NaN values alone are not out of range
+    x_nan = x.copy()
+    x_nan[5] = np.nan
+    _test_valid_x_range(x_nan, x_range, 'C00')
+
+
+def test_skip_x_range_check():
+    x = np.array([0.05, 0.5])
+    with pytest.raises(ValueError):
+        _test_valid_x_range(x, [0.12, 2.2], 'C00')
+
+    with conf.set_temp('check_x_range', False):
+        _test_valid_x_range(x, [0.12, 2.2], 'C00')
+
+    errors = []
+
+    def other_thread():
+        try:
+            _test_valid_x_range(x, [0.12, 2.2], 'C00')
+        except ValueError as exc:
+            errors.append(exc)
+
+    with skip_x_range_check():
+        _test_valid_x_range(x, [0.12, 2.2], 'C00')
+
+        # only skipped in the thread of the context
+        thread = threading.Thread(target=other_thread)
+        thread.start()
+        thread.join()
+        assert len(errors) == 1
+
+    with pytest.raises(ValueError):
+        _test_valid_x_range(x, [0.12, 2.2], 'C00')
@@ -0,0 +1,59 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import dust_attenuation
+
+
+def import_times(statement):
+    """
+    Run the import statement in a new interpreter with ``-X importtime``
+    and return the cumulative import times in microseconds by module.
+    """
+    env = dict(os.environ)
+    package_dir = os.path.dirname(os.path.dirname(dust_attenuation.__file__))
+    env['PYTHONPATH'] = os.pathsep.join(
+        [package_dir] + [p for p in [env.get('PYTHONPATH')] if p])
+
+    proc = subprocess.Popen([sys.executable, '-X', 'importtime', '-c',
+                             statement], stderr=subprocess.PIPE, env=env,
+                            universal_newlines=True)
+    stderr = proc.communicate()[1]
+    assert proc.returncode == 0, stderr
+
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_time, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+
+    return times
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7),
+                    reason='-X importtime requires python 3.7')
+@pytest.mark.parametrize("module", ['dust_attenuation.averages',
+                                    'dust_attenuation.shapes'])
+def test_import_no_WG00(module):
+    # the models without tables do not load the WG00 table module
+    times = import_times('import ' + module)
+    assert module in times
+    assert 'dust_attenuation.radiative_transfer' not in times
+    assert 'dust_attenuation.utils.WG00_tables' not in times
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7),
+                    reason='-X importtime requires python 3.7')
+def test_import_WG00_no_tables():
+    # the WG00 tables are only located and read on the first WG00 use
+    module = 'dust_attenuation.radiative_transfer'
+    times = import_times('import %s as rt; '
+                         'assert not rt._WG00_binary and not rt._WG00_cache'
+                         % module)
+    assert module in times
+
+    import_times('import %s as rt; rt.WG00(1.0); assert rt._WG00_cache'
+                 % module)
@@ -0,0 +1,88 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from astropy.modeling import InputParameterError
+from astropy.modeling.fitting import (LinearLSQFitter, LevMarLSQFitter,
+                                      ModelLinearityError)
+
+from ..averages import C00, L02
+
+
+def set_params(model_case):
+    # parameters of a set of 3 models around the parameters of the case
+    model = model_case.model()
+    return dict((name, [factor * getattr(model, name).value
+                        for factor in [0.5, 1.0, 1.5]])
+                for name in model.param_names)
+
+
+def test_model_set_values(model_case):
+    model_class, config = model_case.model_class, model_case.config
+    x = model_case.x(30)
+    params = set_params(model_case)
+    n_models = 3
+    kwargs = dict(config)
+    kwargs.update(params)
+    tmodel = model_class(n_models=n_models, **kwargs)
+
+    # same x for all the models
+    att = tmodel(x, model_set_axis=False)
+    frac_att = tmodel.attenuate(x, model_set_axis=False)
+    # one x per model
+    att_x = tmodel(np.tile(x, (n_models, 1)))
+
+    assert att.shape == (n_models, len(x))
+    for k in range(n_models):
+        kwargs = dict(config)
+        kwargs.update((name, values[k]) for name, values in params.items())
+        single = model_class(**kwargs)
+        np.testing.assert_allclose(att[k], single(x), rtol=1e-12)
+        np.testing.assert_allclose(frac_att[k], single.attenuate(x),
+                                   rtol=1e-12)
+        np.testing.assert_allclose(att_x[k], single(x), rtol=1e-12)
+
+
+def test_model_set_invalid_parameters(model_case):
+    model_class, config = model_case.model_class, model_case.config
+    params = set_params(model_case)
+    for name, values in params.items():
+        kwargs = dict(config)
+        kwargs.update(params)
+        kwargs[name] = list(values[:-1]) + [-10.0]
+        with pytest.raises(InputParameterError):
+            model_class(n_models=3, **kwargs)
+
+
+@pytest.mark.parametrize("model_class, x_range", [(C00, [0.12, 2.2]),
+                                                  (L02, [0.097, 0.18])])
+def test_model_set_linear_fit(model_class, x_range):
+    x = np.linspace(x_range[0], x_range[1], 30)
+    Avs = np.array([0.1, 0.5, 1.0, 2.4, 5.0])
+    att = model_class(Av=Avs, n_models=len(Avs))(x, model_set_axis=False)
+
+    # the linear fitter does not support bounds
+    init_model = model_class(Av=np.ones(len(Avs)), n_models=len(Avs),
+                             bounds={'Av': (None, None)})
+    with pytest.raises(ModelLinearityError):
+        LinearLSQFitter()(init_model, x, att)
+
+    # the models are only marked linear for the linear fitter
+    init_model.linear = True
+    fit_model = LinearLSQFitter()(init_model, x, att)
+
+    np.testing.assert_allclose(fit_model.Av.value, Avs, rtol=1e-10)
+
+
+@pytest.mark.parametrize("model_class, x_range", [(C00, [0.12, 2.2]),
+                                                  (L02, [0.097, 0.18])])
+def test_nonlinear_fit_no_linearity_warning(model_class, x_range):
+    x = np.linspace(x_range[0], x_range[1], 30)
+    att = model_class(Av=1.3)(x)
+
+    with warnings.catch_warnings(record=True) as record:
+        warnings.simplefilter('always')
+        fit_model = LevMarLSQFitter()(model_class(), x, att)
+    assert not [w for w in record if 'linear' in str(w.message)]
+    np.testing.assert_allclose(fit_model.Av.value, 1.3, rtol=1e-6)
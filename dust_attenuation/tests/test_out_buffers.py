@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+import astropy.units as u
+
+from .. import conf
+
+
+def test_out_model(model_case):
+    x = model_case.x(1000)
+    tmodel = model_case.model()
+    param_values = [getattr(tmodel, name).value
+                    for name in tmodel.param_names]
+
+    out = np.empty(len(x))
+    res = tmodel.evaluate(x, *param_values, out=out)
+    assert res is out
+    np.testing.assert_allclose(out, tmodel(x), rtol=1e-12)
+
+    out = np.empty(len(x))
+    res = tmodel.attenuate(x * u.micron, out=out)
+    assert res is out
+    np.testing.assert_allclose(out, tmodel.attenuate(x), rtol=1e-12)
+
+    if hasattr(tmodel, 'k_lambda'):
+        out = np.empty(len(x))
+        res = tmodel.k_lambda(x, *param_values[:-1], out=out)
+        assert res is out
+        np.testing.assert_allclose(out, tmodel.k_lambda(x, *param_values[:-1]),
+                                   rtol=1e-12)
+
+
+def test_out_plan(model_case):
+    x = model_case.x(1000)
+    params = model_case.params
+    plan = model_case.model().prepare(x)
+
+    out = np.empty(len(x))
+    work = np.empty(len(x))
+    res = plan(out=out, work=work, **params)
+    assert res is out
+    np.testing.assert_allclose(out, plan(**params), rtol=1e-12)
+
+    res = plan.attenuate(out=out, **params)
+    assert res is out
+    np.testing.assert_allclose(out, plan.attenuate(**params), rtol=1e-12)
+
+
+def test_out_plan_no_allocation(model_case):
+    tracemalloc = pytest.importorskip('tracemalloc')
+
+    x = model_case.x(1000)
+    params = model_case.params
+    plan = model_case.model().prepare(x)
+    out = np.empty(len(x))
+    work = np.empty(len(x))
+    plan.attenuate(out=out, work=work, **params)
+
+    tracemalloc.start()
+    for k in range(10):
+        plan.attenuate(out=out, work=work, **params)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    # no array of the size of the grid allocated
+    assert peak < out.nbytes
+
+
+def test_out_model_allocation(model_case):
+    # out only saves the allocation of the result of the direct evaluations
+    tracemalloc = pytest.importorskip('tracemalloc')
+
+    x = model_case.x(10000)
+    tmodel = model_case.model()
+    out = np.empty(len(x))
+
+    with conf.set_temp('result_cache_size', 0):
+        tmodel.attenuate(x, out=out)
+        sizes = []
+        for out_arg in [out, None]:
+            tracemalloc.start()
+            res = tmodel.attenuate(x, out=out_arg)
+            size, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            sizes.append(size)
+
+            # the curve is still computed in a new array
+            assert peak >= out.nbytes
+            del res
+
+    assert sizes[0] < out.nbytes
+    assert sizes[1] >= out.nbytes
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+import astropy.units as u
+
+from ..averages import C00
+from ..shapes import N09
+from ..radiative_transfer import WG00
+from ..baseclasses import AttModelPlan
+
+
+def test_prepare_values(model_case):
+    x = model_case.x(30) * u.micron
+    model = model_case.model()
+    plan = model.prepare(x)
+    assert isinstance(plan, AttModelPlan)
+
+    other_params = dict((name, 0.5 * getattr(model, name).value)
+                        for name in model.param_names)
+    params_list = [model_case.params, other_params]
+    for params in params_list:
+        for name, value in params.items():
+            setattr(model, name, value)
+
+        # default parameters are the ones of the model
+        np.testing.assert_allclose(plan(), model(x), rtol=1e-12)
+        np.testing.assert_allclose(plan.attenuate(), model.attenuate(x),
+                                   rtol=1e-12)
+
+    # parameters given by name or position
+    model_vals = model(x)
+    reset = dict((name, 1.0 if name in ['Av', 'tau_V'] else 0.1)
+                 for name in model.param_names)
+    for name, value in reset.items():
+        setattr(model, name, value)
+    np.testing.assert_allclose(plan(**params_list[-1]), model_vals,
+                               rtol=1e-12)
+    pos_params = [params_list[-1].get(name, reset[name])
+                  for name in model.param_names]
+    np.testing.assert_allclose(plan(*pos_params), model_vals, rtol=1e-12)
+
+
+def test_prepare_broadcast_Av():
+    x = np.linspace(0.12, 2.2, 30)
+    plan = C00().prepare(x)
+    Avs = np.array([0.1, 1.0, 2.5])
+    att = plan(Av=Avs[:, np.newaxis])
+    assert att.shape == (3, len(x))
+    for k, Av in enumerate(Avs):
+        np.testing.assert_allclose(att[k], C00(Av=Av)(x), rtol=1e-12)
+
+
+@pytest.mark.parametrize("model, x", [
+    (C00(Av=[0.5, 1.0, 2.0], n_models=3), np.linspace(0.12, 2.2, 30)),
+    (N09(Av=[0.5, 1.0, 2.0], x0=[0.2175] * 3, gamma=[0.035] * 3,
+         ampl=[0.0, 1.0, 3.0], slope=[-0.5, 0., 0.5], n_models=3),
+     np.linspace(0.1, 2.2, 30)),
+    (WG00(tau_V=[0.5, 1.0, 2.0], n_models=3), np.linspace(0.1, 3.0, 30))])
+def test_prepare_model_set(model, x):
+    # one curve per model of the set, as with model_set_axis=False
+    ref = model(x, model_set_axis=False)
+    plan = model.prepare(x)
+    np.testing.assert_allclose(plan(), ref, rtol=1e-12)
+    np.testing.assert_allclose(plan.attenuate(), 10 ** (-0.4 * ref),
+                               rtol=1e-12)
+
+    # same when a parameter is given with the axis of the models
+    name = model.param_names[-1]
+    value = getattr(model, name).value[:, np.newaxis]
+    np.testing.assert_allclose(plan(**{name: value}), ref, rtol=1e-12)
+
+
+def test_prepare_invalid_x(model_case):
+    model = model_case.model()
+    with pytest.raises(ValueError) as exc:
+        model.prepare([0.01, 0.5] * u.micron)
+    assert exc.value.args[0] == 'Input x outside of range defined for ' \
+                                + model.__class__.__name__ \
+                                + ' [' \
+                                + str(model.x_range[0]) \
+                                + ' <= x <= ' \
+                                + str(model.x_range[1]) \
+                                + ', x has units micron]'
+
+
+def test_prepare_invalid_parameters():
+    plan = N09().prepare(np.linspace(0.12, 2.2, 30))
+    with pytest.raises(TypeError):
+        plan(1, 2, 3, 4, 5, 6)
+    with pytest.raises(TypeError):
+        plan(Rv=3.1)
@@ -0,0 +1,154 @@
+import numpy as np
+import pytest
+
+import astropy.units as u
+from astropy.config import reload_config
+
+from .. import conf
+from ..baseclasses import (result_cache_info, clear_result_cache,
+                           skip_x_range_check)
+from ..averages import C00
+from ..radiative_transfer import WG00
+
+
+@pytest.fixture
+def result_cache():
+    clear_result_cache()
+    with conf.set_temp('result_cache_size', 4):
+        yield
+    clear_result_cache()
+
+
+def test_result_cache_disabled(model_case):
+    x = model_case.x()
+    model = model_case.model()
+
+    clear_result_cache()
+    model(x)
+    model(x)
+    assert result_cache_info() == (0, 0, 0, 0)
+
+
+def test_result_cache_hits(result_cache, model_case):
+    x = model_case.x()
+    model = model_case.model()
+
+    res = model(x)
+    assert result_cache_info() == (0, 1, 4, 1)
+
+    res_cached = model(x)
+    assert result_cache_info() == (1, 1, 4, 1)
+    np.testing.assert_array_equal(res_cached, res)
+
+    # the cached result is not shared with the callers
+    res_cached *= 2.0
+    np.testing.assert_array_equal(model(x), res)
+    assert result_cache_info().hits == 2
+
+    # same values in a new array
+    np.testing.assert_array_equal(model(x.copy()), res)
+    assert result_cache_info().hits == 3
+
+    att = model.attenuate(x)
+    np.testing.assert_array_equal(model.attenuate(x), att)
+    out = np.empty(len(x))
+    assert model.attenuate(x, out=out) is out
+    np.testing.assert_array_equal(out, att)
+    assert result_cache_info() == (5, 2, 4, 2)
+
+
+def test_result_cache_misses(result_cache, model_case):
+    x = model_case.x()
+    model = model_case.model()
+
+    res = model(x)
+
+    # other parameters
+    name = model.param_names[-1]
+    res_params = model_case.model(
+        **dict(model_case.params, **{name: 0.5}))(x)
+    assert not np.allclose(res_params, res)
+
+    # other x values, the same array modified in place after a hit
+    x_mod = x.copy()
+    model(x_mod)
+    assert result_cache_info().hits == 1
+    x_mod[10] = x[20]
+    np.testing.assert_array_equal(model(x_mod)[10], res[20])
+
+    # other units and type
+    res_micron = model(x[1:-1] * u.micron)
+    res_angstrom = model(x[1:-1] * 1e4 * u.angstrom)
+    np.testing.assert_allclose(res_micron, res[1:-1], rtol=1e-12)
+    np.testing.assert_allclose(res_angstrom, res[1:-1], rtol=1e-12)
+    assert model(x, model_set_axis=False) is not None
+    assert model.attenuate(x, dtype=np.float32).dtype == np.float32
+
+    assert result_cache_info().hits == 1
+
+
+def test_result_cache_WG00_configuration(result_cache):
+    x = np.linspace(0.1, 3.0, 100)
+    res = WG00(3.3, geometry='shell')(x)
+    res_cloudy = WG00(3.3, geometry='cloudy')(x)
+    assert not np.allclose(res_cloudy, res)
+    np.testing.assert_array_equal(WG00(3.3, geometry='shell')(x), res)
+    assert result_cache_info()[:2] == (1, 2)
+
+
+def test_result_cache_eviction(result_cache):
+    x = np.linspace(0.12, 2.2, 100)
+    for Av in [0.1, 0.2, 0.3, 0.4, 0.5]:
+        C00(Av=Av)(x)
+    assert result_cache_info() == (0, 5, 4, 4)
+
+    # the least recently used result is evicted
+    C00(Av=0.2)(x)
+    assert result_cache_info().hits == 1
+    C00(Av=0.1)(x)
+    assert result_cache_info().hits == 1
+    C00(Av=0.3)(x)
+    assert result_cache_info().hits == 1
+
+    clear_result_cache()
+    assert result_cache_info() == (0, 0, 4, 0)
+
+
+def test_result_cache_errors(result_cache):
+    x = np.linspace(0.01, 2.2, 100)
+    with pytest.raises(ValueError):
+        C00()(x)
+    assert result_cache_info().currsize == 0
+
+
+def test_result_cache_x_range_check(result_cache):
+    # results computed without the range check are not given out when
+    # the check is enabled
+    x = np.array([0.05, 0.5])
+    with skip_x_range_check():
+        C00()(x)
+    with conf.set_temp('check_x_range', False):
+        C00().attenuate(x)
+    with pytest.raises(ValueError):
+        C00()(x)
+    with pytest.raises(ValueError):
+        C00().attenuate(x)
+    assert result_cache_info().hits == 0
+
+
+def test_result_cache_reload_config():
+    # the size follows the configuration when it is reloaded
+    x = np.linspace(0.12, 2.2, 10)
+    clear_result_cache()
+    try:
+        conf.result_cache_size = 5
+        C00(Av=1.0)(x)
+        assert result_cache_info().currsize == 1
+
+        reload_config('dust_attenuation')
+        assert conf.result_cache_size == 0
+        C00(Av=2.0)(x)
+        assert result_cache_info().currsize == 1
+    finally:
+        conf.reset('result_cache_size')
+        clear_result_cache()
@@ -0,0 +1,99 @@
+import numpy as np
+
+import astropy.units as u
+from astropy.modeling.fitting import LevMarLSQFitter
+
+from ..averages import C00
+
+
+def get_spectra(model, x, Avs):
+    # power law intrinsic spectra, attenuated by the model
+    flux_int = np.outer(np.linspace(1., 2., len(Avs)), x**-1.5)
+    flux_obs = np.empty(flux_int.shape)
+    for k, Av in enumerate(Avs):
+        model.Av = Av
+        flux_obs[k] = flux_int[k] * model.attenuate(x)
+    model.Av = 1.0
+    return flux_obs, flux_int
+
+
+def test_solve_Av_exact(av_model_case):
+    x = av_model_case.x(40)
+    model = av_model_case.model()
+    Avs = np.array([0.0, 0.1, 1.0, 2.4, 5.0])
+    flux_obs, flux_int = get_spectra(model, x, Avs)
+
+    Av, Av_unc = model.solve_Av(x, flux_obs, flux_int,
+                                flux_unc=0.01 * flux_obs)
+    assert Av.shape == Avs.shape
+    np.testing.assert_allclose(Av, Avs, atol=1e-12)
+
+    # without uncertainties, the residuals are zero
+    Av, Av_unc = model.solve_Av(x * u.micron, flux_obs, flux_int)
+    np.testing.assert_allclose(Av, Avs, atol=1e-12)
+    np.testing.assert_allclose(Av_unc, 0, atol=1e-10)
+
+    # single spectrum
+    Av, Av_unc = model.solve_Av(x, flux_obs[2], flux_int[2])
+    np.testing.assert_allclose(Av, Avs[2], atol=1e-12)
+
+
+def test_solve_Av_noise(av_model_case):
+    x = av_model_case.x(40)
+    model = av_model_case.model()
+    Avs = np.full(2000, 1.3)
+    flux_obs, flux_int = get_spectra(model, x, Avs)
+
+    rng = np.random.RandomState(1234)
+    flux_unc = 0.02 * flux_obs * rng.uniform(0.5, 2.0, flux_obs.shape)
+    flux_obs = flux_obs + rng.normal(size=flux_obs.shape) * flux_unc
+
+    Av, Av_unc = model.solve_Av(x, flux_obs, flux_int, flux_unc=flux_unc)
+
+    # the uncertainties match the scatter of the solutions
+    np.testing.assert_allclose(np.mean(Av), 1.3, atol=0.01)
+    np.testing.assert_allclose(np.std(Av), np.mean(Av_unc), rtol=0.1)
+
+    # same solution as the weighted fit of the attenuation in magnitudes
+    att = -2.5 * np.log10(flux_obs[0] / flux_int[0])
+    att_unc = 2.5 / np.log(10) * flux_unc[0] / flux_obs[0]
+    init_model = model.copy()
+    for name in init_model.param_names:
+        getattr(init_model, name).fixed = name != 'Av'
+    fit_model = LevMarLSQFitter()(init_model, x, att, weights=1. / att_unc)
+    np.testing.assert_allclose(Av[0], fit_model.Av.value, rtol=1e-6)
+
+
+def test_solve_Av_invalid_points():
+    model = C00()
+    x = np.linspace(0.12, 2.2, 40)
+    Avs = np.array([0.5, 1.0])
+    flux_obs, flux_int = get_spectra(model, x, Avs)
+
+    flux_obs[0, 3] = 0.
+    flux_obs[1, 5] = np.nan
+    flux_obs[1, 7] = -1.
+
+    Av, Av_unc = model.solve_Av(x, flux_obs, flux_int,
+                                flux_unc=0.01 * np.abs(flux_obs))
+    np.testing.assert_allclose(Av, Avs, atol=1e-12)
+    assert np.all(np.isfinite(Av_unc))
+
+
+def test_solve_Av_x_range_policy():
+    # the wavelengths out of range are ignored with the 'nan' policy
+    model = C00()
+    x = np.linspace(0.12, 2.2, 40)
+    Avs = np.array([0.5, 1.0])
+    flux_obs, flux_int = get_spectra(model, x, Avs)
+
+    x_ext = np.concatenate([[0.1, 0.11], x])
+    flux_obs = np.concatenate([np.ones((2, 2)), flux_obs], axis=1)
+    flux_int = np.concatenate([np.ones((2, 2)), flux_int], axis=1)
+
+    model_nan = C00(x_range_policy='nan')
+    for flux_unc in [None, 0.01 * flux_obs]:
+        Av, Av_unc = model_nan.solve_Av(x_ext, flux_obs, flux_int,
+                                        flux_unc=flux_unc)
+        np.testing.assert_allclose(Av, Avs, atol=1e-12)
+        assert np.all(np.isfinite(Av_unc))
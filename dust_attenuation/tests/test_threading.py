@@ -0,0 +1,94 @@
+import threading
+
+import numpy as np
+import pytest
+
+import astropy.units as u
+
+from ..radiative_transfer import clear_WG00_cache
+from .helpers import model_cases
+
+
+def get_models_inputs():
+    # wavelengths with several units, to go through the unit conversions
+    x = np.linspace(0.12, 0.17, 50)
+    inputs = [x, x * u.micron, x * 1e4 * u.angstrom, 1 / x / u.micron,
+              (x * u.micron).to(u.Hz, equivalencies=u.spectral())]
+    models = [case.model() for case in model_cases]
+    return models, inputs
+
+
+@pytest.mark.parametrize("n_threads", [8])
+def test_threaded_evaluation(n_threads):
+    models, inputs = get_models_inputs()
+    expected = [[model(x) for x in inputs] for model in models]
+
+    registry = u.get_current_unit_registry()
+    equivalencies = list(registry.equivalencies)
+
+    # start with an empty table cache to also exercise its initialisation
+    clear_WG00_cache()
+
+    errors = []
+    barrier = threading.Barrier(n_threads)
+
+    def worker(seed):
+        rng = np.random.RandomState(seed)
+        barrier.wait()
+        try:
+            for k in range(50):
+                i = rng.randint(len(models))
+                j = rng.randint(len(inputs))
+                # new WG00 models also use the shared tables
+                if i == len(models) - 1 and rng.randint(2):
+                    model = model_cases[-1].model()
+                else:
+                    model = models[i]
+                np.testing.assert_allclose(model(inputs[j]),
+                                           expected[i][j], rtol=1e-12)
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=worker, args=(seed,))
+               for seed in range(n_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+
+    # the unit conversions do not leave equivalencies enabled
+    assert u.get_current_unit_registry() is registry
+    assert list(registry.equivalencies) == equivalencies
+
+
+@pytest.mark.parametrize("n_threads", [8])
+def test_threaded_dtype(n_threads):
+    # the type requested for a call does not leak to the other threads
+    models, inputs = get_models_inputs()
+    x = inputs[0]
+
+    errors = []
+    barrier = threading.Barrier(n_threads)
+
+    def worker(seed):
+        rng = np.random.RandomState(seed)
+        barrier.wait()
+        try:
+            for k in range(50):
+                model = models[rng.randint(len(models))]
+                dtype = [np.float32, np.float64][seed % 2]
+                assert model.attenuate(x, dtype=dtype).dtype == dtype
+                assert model(x).dtype == np.float64
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=worker, args=(seed,))
+               for seed in range(n_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
@@ -0,0 +1,124 @@
+import numpy as np
+import pytest
+
+from .. import conf
+from ..baseclasses import clear_result_cache
+from ..averages import C00, L02
+from ..shapes import N09, SBL18
+from ..radiative_transfer import WG00
+
+
+def get_x(x_range):
+    # values inside the range surrounded by values below and above it
+    x_in = np.linspace(x_range[0], x_range[1], 20)[1:-1]
+    x_below = x_range[0] * np.array([0.5, 0.9])
+    x_above = x_range[1] * np.array([1.1, 1.5])
+    x = np.concatenate([x_below, x_in, x_above])
+    below = np.arange(len(x)) < 2
+    above = np.arange(len(x)) >= len(x) - 2
+    return x, x_in, below, above
+
+
+def test_x_range_policy_raise(model_case):
+    x, x_in, below, above = get_x(model_case.model_class.x_range)
+    model = model_case.model()
+    assert model.x_range_policy == 'raise'
+
+    with pytest.raises(ValueError):
+        model(x)
+    with pytest.raises(ValueError):
+        model.prepare(x)
+
+    with pytest.raises(ValueError) as exc:
+        model_case.model(x_range_policy='ignore', **model_case.params)
+    assert 'x_range_policy must be one of' in str(exc.value)
+    with pytest.raises(ValueError):
+        model.x_range_policy = 'ignore'
+
+
+@pytest.mark.parametrize("policy", ['nan', 'clip', 'extrapolate'])
+def test_x_range_policy(model_case, policy):
+    x_range = model_case.model_class.x_range
+    params = model_case.params
+    x, x_in, below, above = get_x(x_range)
+    ref_model = model_case.model()
+    model = model_case.model(x_range_policy=policy, **params)
+    assert model.x_range_policy == policy
+    assert model.copy().x_range_policy == policy
+
+    res = model(x)
+    inside = ~(below | above)
+    np.testing.assert_allclose(res[inside], ref_model(x_in), rtol=1e-12)
+
+    if policy == 'nan':
+        assert np.all(np.isnan(res[below | above]))
+    elif policy == 'clip':
+        np.testing.assert_allclose(res[below],
+                                   ref_model(np.full(2, x_range[0])))
+        np.testing.assert_allclose(res[above],
+                                   ref_model(np.full(2, x_range[1])))
+    else:
+        assert np.all(np.isfinite(res))
+        assert np.all(res[below] > res[inside][0])
+
+    # the policy holds for all the evaluations of the model
+    att = 10 ** (-0.4 * res)
+    np.testing.assert_allclose(model.attenuate(x), att, rtol=1e-12)
+    np.testing.assert_allclose(model.prepare(x)(**params), res, rtol=1e-12)
+
+    name = model.param_names[-1]
+    cube = model.attenuate_cube(x, **{name: np.full((2, 3), params[name])})
+    np.testing.assert_allclose(cube, np.tile(att, (2, 3, 1)), rtol=1e-12)
+
+    derivs = model.fit_deriv(x, *model.parameters)
+    for deriv in derivs:
+        assert np.all(np.isnan(deriv[below | above])) == (policy == 'nan')
+
+
+def test_x_range_policy_clip_upper_limit(model_case):
+    # the curve at the upper limit is the one of the defined range, not 0
+    x_range = model_case.model_class.x_range
+    model = model_case.model(x_range_policy='clip', **model_case.params)
+    limit = model(np.array([x_range[1] * (1 - 1e-12)]))
+    assert np.all(limit > 0)
+
+    res = model(x_range[1] * np.array([1.0, 1.1, 1.5]))
+    np.testing.assert_allclose(res, np.full(3, limit[0]), rtol=1e-9)
+
+
+def test_x_range_policy_k_lambda():
+    x, x_in, below, above = get_x([0.097, 2.2])
+    model = N09(ampl=2.5, slope=-0.4, x_range_policy='nan')
+    k = model.k_lambda(x, 0.2175, 0.035, 2.5, -0.4)
+    assert np.all(np.isnan(k[below | above]))
+    assert np.all(np.isfinite(k[~(below | above)]))
+
+    x, x_in, below, above = get_x([0.12, 2.2])
+    k = C00(x_range_policy='clip').k_lambda(x)
+    np.testing.assert_allclose(k[below], C00().k_lambda(0.12))
+
+
+def test_x_range_policy_WG00_quantities():
+    x, x_in, below, above = get_x([0.1, 3.0001])
+    model = WG00(1.0, x_range_policy='nan')
+
+    quantities = model.get_all_quantities(x, 1.0)
+    for name in quantities.dtype.names:
+        assert np.all(np.isnan(quantities[name][below | above]))
+        assert np.all(np.isfinite(quantities[name][~(below | above)]))
+
+    assert np.all(np.isnan(model.get_albedo(x)[below | above]))
+    grid = model.evaluate_tau_V_grid(x, [1.0, 2.0])
+    assert np.all(np.isnan(grid[:, below | above]))
+
+
+def test_x_range_policy_result_cache():
+    x, x_in, below, above = get_x([0.12, 2.2])
+    clear_result_cache()
+    with conf.set_temp('result_cache_size', 4):
+        res_nan = C00(x_range_policy='nan')(x)
+        res_clip = C00(x_range_policy='clip')(x)
+    clear_result_cache()
+
+    assert np.all(np.isnan(res_nan[below]))
+    assert np.all(np.isfinite(res_clip))
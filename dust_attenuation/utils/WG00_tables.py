@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+Conversion of the Witt & Gordon (2000) text tables to a packed binary
+array.
+
+The text files in ``data/WG00`` are the reference version of the tables.
+The binary version is generated from them when the package is built or
+installed in develop mode, and can be regenerated with::
+
+    python -m dust_attenuation.utils.WG00_tables
+"""
+import hashlib
+import os
+import sys
+import warnings
+
+import numpy as np
+
+from astropy import log
+from astropy.utils.exceptions import AstropyUserWarning
+
+__all__ = ['read_WG00_text', 'write_WG00_binary', 'load_WG00_binary']
+
+# Order of the axes in the packed array
+geometries = ('shell', 'cloudy', 'dusty')
+dust_types = ('mw', 'smc')
+dust_distributions = ('homogeneous', 'clumpy')
+quantities = ('tau_att', 'tau', 'fsca', 'fdir', 'fesc')
+
+# Number of wavelengths and tau_V in each table
+n_wvl = 25
+n_tau_V = 26
+
+data_path = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'data', 'WG00')
+
+tables_filename = 'WG00_tables.npy'
+wavelengths_filename = 'WG00_wavelengths.npy'
+checksum_filename = 'WG00_tables.sha256'
+
+
+def _text_checksum(path=data_path):
+    """
+    SHA-256 checksum of the text tables, stored with the binary tables to
+    check that they were generated from the same text tables.
+
+    Parameters
+    ----------
+    path: string
+       directory containing the text tables
+
+    Returns
+    -------
+    checksum: string
+       hexadecimal digest
+    """
+    checksum = hashlib.sha256()
+    for geometry in geometries:
+        with open(os.path.join(path, geometry + '.txt'), 'rb') as f:
+            checksum.update(f.read())
+
+    return checksum.hexdigest()
+
+
+def read_WG00_text(geometry, path=data_path):
+    """
+    Read the text table of one geometry.
+
+    Parameters
+    ----------
+    geometry: string
+       'shell', 'cloudy' or 'dusty'
+
+    path: string
+       directory containing the text tables
+
+    Returns
+    -------
+    wvl: np array (float)
+       wavelength grid [Angstrom]
+
+    tables: np array (float)
+       tables with shape (dust_type, dust_distribution, quantity,
+       wavelength, tau_V), the axes following the order of
+       `dust_types`, `dust_distributions` and `quantities`
+    """
+    # Columns: lambda, tau, then tau_att, f(sca), f(dir), f(esc) for the
+    # homogeneous and the clumpy distributions
+    data = np.loadtxt(os.path.join(path, geometry + '.txt'), comments='#',
+                      skiprows=5)
+
+    # Models are listed by tau_V, and for each tau_V first MW then SMC
+    data = data.reshape(n_tau_V, len(dust_types), n_wvl, data.shape[1])
+
+    wvl = data[0, 0, :, 0]
+
+    tables = np.empty((len(dust_types), len(dust_distributions),
+                       len(quantities), n_wvl, n_tau_V))
+    for k, first_col in enumerate([2, 6]):
+        tables[:, k, 0] = data[..., first_col].transpose(1, 2, 0)
+        tables[:, k, 1] = data[..., 1].transpose(1, 2, 0)
+        tables[:, k, 2:] = data[..., first_col+1:first_col+4].transpose(
+            1, 3, 2, 0)
+
+    return wvl, tables
+
+
+def write_WG00_binary(path=data_path, outpath=None):
+    """
+    Write the binary version of the tables.
+
+    The tables of all the configurations are packed in a single array of
+    shape (geometry, dust_type, dust_distribution, quantity, wavelength,
+    tau_V) so that they can be memory mapped with a single ``np.load``.
+    The checksum of the text tables is written with them.
+
+    Parameters
+    ----------
+    path: string
+       directory containing the text tables
+
+    outpath: string
+       directory where the binary files are written, defaults to path
+
+    Returns
+    -------
+    filenames: list of strings
+       names of the files written
+    """
+    if outpath is None:
+        outpath = path
+
+    all_tables = []
+    for geometry in geometries:
+        wvl, tables = read_WG00_text(geometry, path=path)
+        all_tables.append(tables)
+
+    filenames = [os.path.join(outpath, tables_filename),
+                 os.path.join(outpath, wavelengths_filename),
+                 os.path.join(outpath, checksum_filename)]
+    np.save(filenames[0], np.array(all_tables))
+    np.save(filenames[1], wvl)
+    with open(filenames[2], 'w') as f:
+        f.write(_text_checksum(path) + '\n')
+
+    return filenames
+
+
+def load_WG00_binary(path=data_path):
+    """
+    Memory map the binary version of the tables.
+
+    The binary tables are only used if they have the expected shape and
+    type, and were generated from the text tables in path.  Otherwise a
+    warning is issued and None is returned, so that the text tables are
+    read instead.
+
+    Parameters
+    ----------
+    path: string
+       directory containing the binary and text tables
+
+    Returns
+    -------
+    wvl, tables: np arrays (float)
+       wavelength grid and packed tables (see `write_WG00_binary`),
+       None if the binary files are missing or invalid
+    """
+    filenames = [os.path.join(path, tables_filename),
+                 os.path.join(path, wavelengths_filename),
+                 os.path.join(path, checksum_filename)]
+    if not all([os.path.exists(f) for f in filenames]):
+        log.info('WG00 binary tables not found in ' + path
+                 + ', reading the text tables')
+        return None, None
+
+    shape = (len(geometries), len(dust_types), len(dust_distributions),
+             len(quantities), n_wvl, n_tau_V)
+    try:
+        wvl = np.load(filenames[1])
+        tables = np.load(filenames[0], mmap_mode='r')
+        with open(filenames[2]) as f:
+            checksum = f.read().strip()
+    except (OSError, ValueError) as err:
+        problem = 'cannot be read ({})'.format(err)
+    else:
+        if (tables.shape != shape or tables.dtype != np.float64
+                or wvl.shape != (n_wvl,) or wvl.dtype != np.float64):
+            problem = 'do not have the expected shape or type'
+        elif checksum != _text_checksum(path):
+            problem = 'were not generated from the current text tables'
+        else:
+            return wvl, tables
+
+    warnings.warn('The WG00 binary tables in ' + path + ' ' + problem
+                  + ', reading the text tables instead. Regenerate them '
+                  'with "python -m dust_attenuation.utils.WG00_tables".',
+                  AstropyUserWarning)
+    return None, None
+
+
+def main(args=None):
+    if args is None:
+        args = sys.argv[1:]
+    outpath = args[0] if args else None
+    for filename in write_WG00_binary(outpath=outpath):
+        print('wrote ' + filename)
+
+
+if __name__ == '__main__':
+    main()
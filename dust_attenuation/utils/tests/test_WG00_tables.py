@@ -0,0 +1,74 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+from astropy.io import ascii
+from astropy.utils.exceptions import AstropyUserWarning
+
+from ..WG00_tables import (read_WG00_text, write_WG00_binary,
+                           load_WG00_binary, data_path, geometries)
+
+
+def test_read_WG00_text():
+    # compare with a direct read of the columns of the text table
+    data = ascii.read(os.path.join(data_path, 'dusty.txt'), header_start=0)
+    wvl, tables = read_WG00_text('dusty')
+
+    np.testing.assert_equal(wvl, data['lambda'][0:25])
+    # SMC, clumpy, tau_att at the 3rd tau_V of the grid
+    np.testing.assert_equal(tables[1, 1, 0, :, 2],
+                            data['tau_att_c'][125:150])
+    # MW, homogeneous, f(esc) at the last tau_V of the grid
+    np.testing.assert_equal(tables[0, 0, 4, :, -1],
+                            data['f(esc)_h'][1250:1275])
+
+
+def test_write_load_WG00_binary(tmpdir):
+    path = str(tmpdir)
+    for geometry in geometries:
+        shutil.copy(os.path.join(data_path, geometry + '.txt'), path)
+
+    # no binary tables yet
+    assert load_WG00_binary(path) == (None, None)
+
+    write_WG00_binary(path)
+    wvl, packed_tables = load_WG00_binary(path)
+    assert isinstance(packed_tables, np.memmap)
+    assert packed_tables.shape == (3, 2, 2, 5, 25, 26)
+
+    for i, geometry in enumerate(geometries):
+        text_wvl, text_tables = read_WG00_text(geometry)
+        np.testing.assert_equal(wvl, text_wvl)
+        np.testing.assert_equal(packed_tables[i], text_tables)
+
+    # the binary tables do not depend on the file times
+    binary_time = os.path.getmtime(os.path.join(path, 'WG00_tables.npy'))
+    os.utime(os.path.join(path, 'shell.txt'),
+             (binary_time + 10, binary_time + 10))
+    assert load_WG00_binary(path)[1] is not None
+
+
+def test_load_WG00_binary_invalid(tmpdir):
+    path = str(tmpdir)
+    for geometry in geometries:
+        shutil.copy(os.path.join(data_path, geometry + '.txt'), path)
+    write_WG00_binary(path)
+
+    # binary tables generated from other text tables
+    with open(os.path.join(path, 'shell.txt'), 'a') as f:
+        f.write('\n')
+    with pytest.warns(AstropyUserWarning, match='current text tables'):
+        assert load_WG00_binary(path) == (None, None)
+
+    # binary tables with a wrong shape
+    write_WG00_binary(path)
+    np.save(os.path.join(path, 'WG00_tables.npy'), np.zeros((3, 2)))
+    with pytest.warns(AstropyUserWarning, match='expected shape'):
+        assert load_WG00_binary(path) == (None, None)
+
+    # unreadable binary tables
+    with open(os.path.join(path, 'WG00_tables.npy'), 'w') as f:
+        f.write('not a npy file')
+    with pytest.warns(AstropyUserWarning, match='cannot be read'):
+        assert load_WG00_binary(path) == (None, None)
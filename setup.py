@@ -107,6 +107,47 @@ package_info = get_package_info()
 package_info['package_data'].setdefault(PACKAGENAME, [])
 package_info['package_data'][PACKAGENAME].append('data/*')
 
+# Generate the binary version of the WG00 tables from the text files in the
+# build directory when the package is built, and in the source tree for
+# develop installs (regenerate them in the source tree with
+# "python -m dust_attenuation.utils.WG00_tables")
+from distutils import log
+from setuptools.command.build_py import build_py as _setuptools_build_py
+from setuptools.command.develop import develop as _setuptools_develop
+_build_py_base = cmdclassd.get('build_py', _setuptools_build_py)
+_develop_base = cmdclassd.get('develop', _setuptools_develop)
+
+
+def write_WG00_tables(cmd, outpath):
+    # numpy is only needed here, not for the other setup.py commands
+    from dust_attenuation.utils.WG00_tables import write_WG00_binary
+    cmd.mkpath(outpath)
+    for filename in write_WG00_binary(outpath=outpath):
+        log.info('wrote ' + filename)
+
+
+class BuildPyWithWG00Tables(_build_py_base):
+    def run(self):
+        _build_py_base.run(self)
+        if self.dry_run:
+            return
+
+        write_WG00_tables(self, os.path.join(self.build_lib, PACKAGENAME,
+                                             'data', 'WG00'))
+
+
+class DevelopWithWG00Tables(_develop_base):
+    def run(self):
+        _develop_base.run(self)
+        if self.dry_run or self.uninstall:
+            return
+
+        write_WG00_tables(self, os.path.join(PACKAGENAME, 'data', 'WG00'))
+
+
+cmdclassd['build_py'] = BuildPyWithWG00Tables
+cmdclassd['develop'] = DevelopWithWG00Tables
+
 # Define entry points for command-line scripts
 entry_points = {'console_scripts': []}
 
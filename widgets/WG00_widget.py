@@ -129,15 +129,17 @@ class WG00_widget:
         self.update_att_curve()
 
     def update_att_curve(self):
-        self.att = self.att_model(1/self.x)
+        quantities = self.att_model.get_all_quantities(1/self.x,
+                                                       self.param['tau_V'])
+        self.att = quantities['att']
         self.att_V = self.att_model(self.x_Vband)
-        self.ext = self.att_model.get_extinction(1/self.x, self.param['tau_V'])
+        self.ext = quantities['ext']
         self.ext_V = self.param['tau_V'] * 1.086
-        self.fsca = self.att_model.get_fsca(1/self.x, self.param['tau_V'])
-        self.fdir = self.att_model.get_fdir(1/self.x, self.param['tau_V'])
-        self.fesc = self.att_model.get_fesc(1/self.x, self.param['tau_V'])
-        self.alb = self.att_model.get_albedo(1/self.x)
-        self.g = self.att_model.get_scattering_phase_function(1/self.x)
+        self.fsca = quantities['fsca']
+        self.fdir = quantities['fdir']
+        self.fesc = quantities['fesc']
+        self.alb = quantities['albedo']
+        self.g = quantities['g']
         self.update_plot()
 
 